@@ -4,23 +4,80 @@
 
 const byte rxPin = 3;
 const byte txPin = 2;
-int buttonValidCount = 0;
-int buttonInvalidCount = 0;
 SoftwareSerial mySerial(rxPin, txPin);
 LCM Lcm(mySerial);
 
 LcmVar buttonValid(0);
 LcmVar buttonInvalid(1);  // Cria uma variável para o buttonInvalid
+LcmVar seriesDisplay(2);  // Série atual (apenas no protocolo em quadros)
+
+// Protocolo em quadros: 0xAA, válidos (2 bytes), inválidos (2 bytes), série (1 byte), XOR do conteúdo.
+// Os contadores são absolutos: um quadro perdido ou corrompido é corrigido pelo seguinte.
+const byte FRAME_START = 0xAA;
+const byte FRAME_PAYLOAD = 5;
+
+// Quadros com canal (várias estações na mesma porta): 0xAB, canal (1 byte) e o mesmo conteúdo.
+// O canal N é exibido nas variáveis 3N, 3N+1 e 3N+2 do display; o canal 0 usa as mesmas do modo simples.
+const byte CHANNEL_FRAME_START = 0xAB;
+const byte CHANNEL_FRAME_PAYLOAD = 6;
+const byte MAX_CHANNELS = 4;
+LcmVar channelValid[MAX_CHANNELS] = {LcmVar(0), LcmVar(3), LcmVar(6), LcmVar(9)};
+LcmVar channelInvalid[MAX_CHANNELS] = {LcmVar(1), LcmVar(4), LcmVar(7), LcmVar(10)};
+LcmVar channelSeries[MAX_CHANNELS] = {LcmVar(2), LcmVar(5), LcmVar(8), LcmVar(11)};
+
+// Contadores de cada canal. Os comandos legados 'A', 'B' e 'C' usam os do canal 0, que
+// aparecem nas mesmas variáveis do display; um quadro de outro canal não os altera.
+int validCount[MAX_CHANNELS] = {0};
+int invalidCount[MAX_CHANNELS] = {0};
+int seriesCount[MAX_CHANNELS] = {0};
+
+byte frameBuffer[CHANNEL_FRAME_PAYLOAD + 1];
+byte framePayload = FRAME_PAYLOAD;
+byte frameChannel = 0;
+int frameIndex = -1;  // -1: fora de um quadro
 
 enum State {
   WAITING,
   PROCESSING_A,
   PROCESSING_B,
-  RESET
+  RESET,
+  FRAME_RECEIVED
 };
 
 State currentState = WAITING;
 
+// Acumula um byte do quadro atual; retorna true quando um quadro válido foi aplicado
+bool readFrameByte(byte value) {
+  frameBuffer[frameIndex++] = value;
+  if (frameIndex < framePayload + 1) {
+    return false;
+  }
+  frameIndex = -1;
+
+  byte checksum = 0;
+  for (int i = 0; i < framePayload; i++) {
+    checksum ^= frameBuffer[i];
+  }
+  if (checksum != frameBuffer[framePayload]) {
+    return false;  // Quadro corrompido: descartado, o próximo traz o estado completo
+  }
+
+  byte *counters = frameBuffer;
+  frameChannel = 0;
+  if (framePayload == CHANNEL_FRAME_PAYLOAD) {
+    if (frameBuffer[0] >= MAX_CHANNELS) {
+      return false;  // Canal sem variáveis no display
+    }
+    frameChannel = frameBuffer[0];
+    counters = frameBuffer + 1;
+  }
+
+  validCount[frameChannel] = (counters[0] << 8) | counters[1];
+  invalidCount[frameChannel] = (counters[2] << 8) | counters[3];
+  seriesCount[frameChannel] = counters[4];
+  return true;
+}
+
 void setup() {
   Lcm.begin();
   mySerial.begin(115200);
@@ -28,13 +85,20 @@ void setup() {
 
   buttonValid.write(0);
   buttonInvalid.write(0);
+  seriesDisplay.write(0);
 }
 
 void loop() {
   if (Serial.available() > 0) {
-    char input = Serial.read();
+    byte input = Serial.read();
 
-    switch (input) {
+    if (frameIndex >= 0) {
+      currentState = readFrameByte(input) ? FRAME_RECEIVED : WAITING;
+    } else if (input == FRAME_START || input == CHANNEL_FRAME_START) {
+      frameIndex = 0;
+      framePayload = (input == FRAME_START) ? FRAME_PAYLOAD : CHANNEL_FRAME_PAYLOAD;
+      currentState = WAITING;
+    } else switch (input) {
       case 'A':
         currentState = PROCESSING_A;
         break;
@@ -52,22 +116,29 @@ void loop() {
 
   switch (currentState) {
     case PROCESSING_A:
-      buttonValidCount++;
-      buttonValid.write(buttonValidCount);  // Atualiza o valor no display para buttonValid
+      validCount[0]++;
+      buttonValid.write(validCount[0]);  // Atualiza o valor no display para buttonValid
       currentState = WAITING;
       break;
 
     case PROCESSING_B:
-      buttonInvalidCount++;
-      buttonInvalid.write(buttonInvalidCount);  // Atualiza o valor no display para buttonInvalid
+      invalidCount[0]++;
+      buttonInvalid.write(invalidCount[0]);  // Atualiza o valor no display para buttonInvalid
       currentState = WAITING;
       break;
 
     case RESET:
-      buttonValidCount = 0;
-      buttonInvalidCount = 0;
-      buttonValid.write(buttonValidCount);  // Zera o valor no display para buttonValid
-      buttonInvalid.write(buttonInvalidCount);  // Zera o valor no display para buttonInvalid
+      validCount[0] = 0;
+      invalidCount[0] = 0;
+      buttonValid.write(validCount[0]);  // Zera o valor no display para buttonValid
+      buttonInvalid.write(invalidCount[0]);  // Zera o valor no display para buttonInvalid
+      currentState = WAITING;
+      break;
+
+    case FRAME_RECEIVED:
+      channelValid[frameChannel].write(validCount[frameChannel]);
+      channelInvalid[frameChannel].write(invalidCount[frameChannel]);
+      channelSeries[frameChannel].write(seriesCount[frameChannel]);
       currentState = WAITING;
       break;
 
@@ -1,27 +1,40 @@
 import os
 import logging
 import cv2
-import mediapipe as mp
 import time
 import serial
 import serial.tools.list_ports
 import tkinter as tk
 from tkinter import messagebox
 from tkinter import ttk
-import numpy as np
-import matplotlib.pyplot as plt
-from fpdf import FPDF
+import argparse
+from pipeline import PipelinePose, EstatisticasEtapa
+from agendador import AgendadorInferencia, COMPLETA, PULAR
+from roi import RecorteROI, etapa_resolucao
+from captura import (CHAVES_CAPTURA, ETAPA_IDADE, criar_captura, idade_quadro, imprimir_sondagem, ler_captura,
+                     mesclar, sondar)
+from exibicao import CamadaTexto, ConversorCor, LimitadorExibicao, MedidorAlocacoes, desenhar_pose
+from contador import ContadorRepeticoes
+from cinematica import AnalisadorRepeticoes
+from lote import medir_resolucoes, pontuar_diretorio, varrer_arquivo, varrer_landmarks
+from serial_arduino import PROTOCOLOS
+from runtime import RuntimeExercicio
+from filtros import FILTRO_PADRAO, criar_filtro
+from estimadores import AUTOMATICO, ESTIMADOR_PADRAO, ESTIMADORES, ORCAMENTO_PADRAO, PRECISAO_ONNX_PADRAO, PRECISOES_ONNX
+from regras import REGRA_PADRAO, criar_regra
+from metricas import Metricas
+from historico import Historico
+from estacoes import Supervisor, carregar_estacoes
+from painel import PORTA_PADRAO, DestinoPainel, EmissorPainel, PainelWeb
+from relatorio import GeradorRelatorios, gerar_relatorio_pdf, gerar_relatorios_lote, sessoes_do_resumo_lote
 
 # Suprimir avisos do TensorFlow
 os.environ['TF_CPP_MIN_LOG_LEVEL'] = '3'
 logging.getLogger('tensorflow').setLevel(logging.FATAL)
 
-def enviar_comando_arduino(comando, ser):
+def enviar_comando_arduino(comando, ser, origem=None):
     if ser:
-        try:
-            ser.write(comando.encode())  # Envia o comando como bytes
-        except serial.SerialException as e:
-            print(f"Erro ao escrever na porta serial: {e}")
+        ser.enviar(comando, origem)  # Enfileira o comando; a escrita acontece na thread do EscritorSerial
 
 def load_exercises(filename='exercicios.txt'):
     script_dir = os.path.dirname(os.path.abspath(__file__))
@@ -33,14 +46,49 @@ def load_exercises(filename='exercicios.txt'):
                 line = line.strip()
                 if line and not line.startswith('#'):
                     parts = line.split(';')
-                    if len(parts) == 6:
-                        nome, repeticoes, series, descanso, offset_verde, offset_vermelho = parts
+                    if len(parts) >= 6:
+                        nome, repeticoes, series, descanso, offset_verde, offset_vermelho = parts[:6]
+                        # Campos opcionais: o filtro temporal (ver filtros.criar_filtro), a regra
+                        # do exercício em chave=valor (ver regras.criar_regra) e a configuração da
+                        # câmera (fourcc, resolucao, fps, buffer; ver captura.criar_captura)
+                        filtro = FILTRO_PADRAO
+                        regra = {}
+                        captura = {}
+                        for campo in (p.strip() for p in parts[6:]):
+                            if '=' in campo:
+                                chave, valor = (c.strip() for c in campo.split('=', 1))
+                                if chave == 'filtro':
+                                    filtro = valor
+                                elif chave in CHAVES_CAPTURA:
+                                    captura[chave] = valor
+                                else:
+                                    regra[chave] = valor
+                            elif campo:
+                                filtro = campo
+                        try:
+                            criar_filtro(filtro)
+                        except ValueError as e:
+                            print(f"Exercício '{nome}': {e}. Usando o filtro padrão.")
+                            filtro = FILTRO_PADRAO
+                        try:
+                            regra = criar_regra(regra).definicao
+                        except ValueError as e:
+                            print(f"Exercício '{nome}': {e}. Usando a regra padrão.")
+                            regra = dict(REGRA_PADRAO)
+                        try:
+                            captura = criar_captura(captura)
+                        except ValueError as e:
+                            print(f"Exercício '{nome}': {e}. Usando a configuração de câmera padrão.")
+                            captura = {}
                         exercises[nome] = {
                             'repeticoes': int(repeticoes),
                             'series': int(series),
                             'descanso': int(descanso),
                             'offset_verde': float(offset_verde),
-                            'offset_vermelho': float(offset_vermelho)
+                            'offset_vermelho': float(offset_vermelho),
+                            'filtro': filtro,
+                            'regra': regra,
+                            'captura': captura
                         }
     except FileNotFoundError:
         messagebox.showerror("Erro", f"Arquivo '{file_path}' não encontrado.")
@@ -170,325 +218,498 @@ def get_exercise_config():
 
     return nSerie, rSerie, timeActive, green_line_offset, red_line_offset, serial_port, selected_exercise
 
-def run_exercise(nSerie, rSerie, timeActive, green_line_offset, red_line_offset, serial_port, selected_exercise):
-    # Configurar a porta serial
-    try:
-        ser = serial.Serial(serial_port, 9600, timeout=1)
+def run_exercise(nSerie, rSerie, timeActive, green_line_offset, red_line_offset, serial_port, selected_exercise,
+                 modo_pipeline=False, protocolo_serial='legado', filtro=FILTRO_PADRAO, arquivo_metricas=None,
+                 gerador_relatorios=None, runtime=None, historico=None, regra=REGRA_PADRAO, nome_janela='Exercicio',
+                 agendar_inferencia=True, roi_ativo=False, lado_inferencia=None, fps_exibicao=30, medir_alocacoes=False,
+                 captura=None, painel=None, avisar_erro=None):
+    # `avisar_erro(mensagem)` recebe os erros que não interrompem a sessão; sem ele (interface gráfica)
+    # aparece uma caixa de diálogo
+    inicio_sessao = time.perf_counter()
+
+    # Pose, câmera e serial persistentes entre sessões; sem runtime, são criados e fechados nesta sessão
+    runtime_proprio = runtime is None
+    if runtime_proprio:
+        runtime = RuntimeExercicio()
+    partida_quente = runtime.preparar()
+    runtime.aplicar_captura(captura)  # Configuração da câmera pedida pelo exercício ou pela estação
+
+    # Tempos por etapa do loop, exportados periodicamente se houver arquivo de métricas
+    metricas = Metricas(arquivo=arquivo_metricas)
+
+    # Configurar a porta serial (escrita em thread própria, com reconexão automática)
+    ser, e = runtime.obter_serial(serial_port, protocolo_serial, metricas)
+    if e is None:
         print(f"Conectado ao Arduino na porta {serial_port}")
-    except serial.SerialException as e:
+    else:
         print(f"Erro ao abrir a porta serial: {e}")
-        ser = None
-        messagebox.showerror("Erro de conexão", f"Não foi possível conectar à porta serial {serial_port}.\nErro: {e}")
+        mensagem = (f"Não foi possível conectar à porta serial {serial_port}.\nErro: {e}\n"
+                    "Novas tentativas serão feitas em segundo plano.")
+        if avisar_erro:
+            avisar_erro(mensagem)
+        else:
+            messagebox.showerror("Erro de conexão", mensagem)
 
-    mp_drawing = mp.solutions.drawing_utils
-    mp_pose = mp.solutions.pose
+    # Com a porta mantida aberta o Arduino não reinicia entre sessões: zerar o display explicitamente
+    enviar_comando_arduino('C', ser)
+    ser.definir_serie(1)
 
-    cap = cv2.VideoCapture(0)  # Ajuste para o índice correto da câmera
+    pose = runtime.pose
+    cap = runtime.cap
+    tempo_primeiro_quadro = None
 
     # Configuração do contador e status do exercício
     contador = 0
     contador_erro = 0
     serie = 1
-    estado = 'esperando_levantar'
-    erro_ocorrido = False  # Variável para evitar múltiplos incrementos de erro
-    acerto_recentemente_contabilizado = False  # Flag para evitar erro imediatamente após acerto
     timer_ativo = False
     start_time_descanso = None
     exercicio_concluido = False
     end_time = None  # Inicializa end_time
 
-    # Variáveis para suavizar a altura dos ombros
-    buffer_tamanho = 10  # Número de quadros para a média móvel
-    buffer_altura_ombro = []
+    # Eventos da contagem para o painel web (painel.EmissorPainel), com os contadores atuais
+    def notificar_painel(tipo, **dados):
+        if painel:
+            painel.evento(tipo, exercicio=selected_exercise, serie=serie, contador=contador, erros=contador_erro, **dados)
+
+    notificar_painel('inicio', repeticoes=nSerie, series=rSerie)
 
-    # Variáveis para sincronização com tolerância temporal
-    tolerancia_tempo = 1.0  # 1 segundo de tolerância
-    tempo_regiao_esquerdo = {'acima_verde': None, 'abaixo_vermelha': None}
-    tempo_regiao_direito = {'acima_verde': None, 'abaixo_vermelha': None}
+    # Máquina de estados da contagem (filtro dos landmarks e sincronização dos braços)
+    contador_reps = ContadorRepeticoes(green_line_offset, red_line_offset, filtro=filtro, regra=regra)
 
     # Adição: Lista para armazenar resultados das repetições (1 = acerto, 0 = erro)
     repetition_results = []
 
-    with mp_pose.Pose(min_detection_confidence=0.3, min_tracking_confidence=0.3) as pose:
-        # Loop principal do exercício
-        while cap.isOpened():
-            ret, frame = cap.read()
+    # Amplitude, tempos, velocidade e assimetria de cada repetição, acumulados quadro a quadro
+    analisador = AnalisadorRepeticoes(contador_reps.regra)
+
+    # Gravação dos landmarks e eventos da sessão no histórico
+    gravador = None
+    if historico:
+        gravador = historico.nova_sessao(selected_exercise, {
+            'repeticoes': nSerie, 'series': rSerie, 'descanso': timeActive,
+            'offset_verde': green_line_offset, 'offset_vermelho': red_line_offset, 'filtro': filtro,
+            'regra': contador_reps.regra.definicao, 'estimador': pose.nome,
+        })
+
+    # Inferência reduzida ou suspensa no descanso, na conclusão e sem ninguém diante da câmera
+    agendador = AgendadorInferencia(ativo=agendar_inferencia)
+
+    # Recorte em torno da pessoa e limite de resolução da imagem entregue ao modelo
+    roi = RecorteROI(ativo=roi_ativo, lado_maximo=lado_inferencia)
+
+    # Modo pipeline: captura e inferência em threads, exibição/contagem nesta thread
+    pipeline = PipelinePose(cap, pose, metricas=metricas, agendador=agendador, roi=roi).iniciar() if modo_pipeline else None
+    stats_serial = EstatisticasEtapa('serial')
+
+    # Desenho direto no quadro da câmera, textos rasterizados só quando mudam e exibição limitada a fps_exibicao
+    conversor = ConversorCor()
+    camada_texto = CamadaTexto()
+    limitador = LimitadorExibicao(fps_exibicao)
+    medidor = MedidorAlocacoes() if medir_alocacoes else None
+    frame = None  # No modo serial, cada leitura reaproveita o array do quadro anterior
+
+    # Loop principal do exercício
+    while cap.isOpened():
+        if pipeline:
+            item = pipeline.proximo(timeout=1.0)
+            if item is None:
+                if pipeline.encerrado.is_set():
+                    break
+                continue
+            image, landmarks, inferido, t_captura = item
+            inicio_quadro = time.perf_counter()
+            if medidor:
+                medidor.iniciar_quadro()
+        else:
+            inicio = time.perf_counter()
+            ret, frame = cap.read(frame)
+            t_captura = inicio_quadro = metricas.registrar('captura', inicio)
+            idade = idade_quadro(cap)
+            if idade is not None:
+                metricas.registrar_duracao(ETAPA_IDADE, idade)
+            if medidor:
+                medidor.iniciar_quadro()
             if not ret:
                 print("Falha ao capturar imagem da câmera.")
                 break
 
-            # Converter a imagem para RGB
-            image = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            image.flags.writeable = False
-
-            # Processar a imagem para encontrar a pose
-            results = pose.process(image)
-
-            # Converter a imagem de volta para BGR
-            image.flags.writeable = True
-            image = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
-
-            # Verificar se os landmarks foram detectados
-            if results.pose_landmarks and not timer_ativo and not exercicio_concluido:
-                landmarks = results.pose_landmarks.landmark
-
-                # Obter coordenadas dos ombros e cotovelos
-                ombro_esquerdo = landmarks[mp_pose.PoseLandmark.LEFT_SHOULDER.value]
-                ombro_direito = landmarks[mp_pose.PoseLandmark.RIGHT_SHOULDER.value]
-                cotovelo_esquerdo = landmarks[mp_pose.PoseLandmark.LEFT_ELBOW.value]
-                cotovelo_direito = landmarks[mp_pose.PoseLandmark.RIGHT_ELBOW.value]
-
-                # Calcular a altura média dos ombros
-                altura_ombro_media = (ombro_esquerdo.y + ombro_direito.y) / 2
-
-                # Adicionar a altura atual dos ombros ao buffer
-                buffer_altura_ombro.append(altura_ombro_media)
-                if len(buffer_altura_ombro) > buffer_tamanho:
-                    buffer_altura_ombro.pop(0)
-
-                # Calcular a média móvel
-                altura_ombro_suavizada = np.mean(buffer_altura_ombro)
-
-                # Calcular os limites atualizados
-                limite_superior = max(0, altura_ombro_suavizada + green_line_offset)
-                limite_inferior = min(1, altura_ombro_suavizada + red_line_offset)
-
-                # Desenhar as linhas limite na imagem
-                altura_imagem = image.shape[0]
-                cv2.line(image, (0, int(limite_superior * altura_imagem)), (image.shape[1], int(limite_superior * altura_imagem)), (0, 255, 0), 2)
-                cv2.line(image, (0, int(limite_inferior * altura_imagem)), (image.shape[1], int(limite_inferior * altura_imagem)), (0, 0, 255), 2)
-
-                # Verificar as posições dos cotovelos
-                cotovelo_esquerdo_y = cotovelo_esquerdo.y
-                cotovelo_direito_y = cotovelo_direito.y
-
-                # Determinar a região de cada cotovelo
-                def get_regiao(cotovelo_y):
-                    if cotovelo_y < limite_superior:
-                        return 'acima_verde'
-                    elif cotovelo_y > limite_inferior:
-                        return 'abaixo_vermelha'
-                    else:
-                        return 'entre_linhas'
-
-                regiao_esquerdo = get_regiao(cotovelo_esquerdo_y)
-                regiao_direito = get_regiao(cotovelo_direito_y)
-
-                # Atualizar tempos das regiões
-                tempo_atual = time.time()
-
-                # Atualizar tempo de entrada nas regiões para o braço esquerdo
-                if regiao_esquerdo in ['acima_verde', 'abaixo_vermelha']:
-                    tempo_regiao_esquerdo[regiao_esquerdo] = tempo_atual
-                else:
-                    tempo_regiao_esquerdo = {'acima_verde': None, 'abaixo_vermelha': None}
-
-                # Atualizar tempo de entrada nas regiões para o braço direito
-                if regiao_direito in ['acima_verde', 'abaixo_vermelha']:
-                    tempo_regiao_direito[regiao_direito] = tempo_atual
-                else:
-                    tempo_regiao_direito = {'acima_verde': None, 'abaixo_vermelha': None}
-
-                # Verificar sincronização com tolerância temporal apenas para 'acima_verde'
-                def braços_sincronizados(regiao):
-                    tempo_esquerdo = tempo_regiao_esquerdo.get(regiao)
-                    tempo_direito = tempo_regiao_direito.get(regiao)
-                    if tempo_esquerdo and tempo_direito:
-                        return abs(tempo_esquerdo - tempo_direito) <= tolerancia_tempo
-                    else:
-                        return False
-
-                # Logs de depuração aprimorados
-                print(f"Estado: {estado}, Regiões - Esquerdo: {regiao_esquerdo}, Direito: {regiao_direito}")
-                if regiao_esquerdo == regiao_direito and regiao_esquerdo in ['acima_verde', 'abaixo_vermelha']:
-                    print(f"Tempo esquerda {regiao_esquerdo}: {tempo_regiao_esquerdo.get(regiao_esquerdo)}, Tempo direita {tempo_regiao_direito.get(regiao_direito)}")
-                    sincronizados = braços_sincronizados(regiao_esquerdo)
-                    print(f"Sincronizados: {sincronizados}")
+            decisao = agendador.decidir(frame, t_captura)
+            image, landmarks, inferido = frame, None, decisao != PULAR
+            if inferido:
+                # Recortar em torno da pessoa (ou reduzir, na verificação de presença) e converter para RGB
+                if decisao == COMPLETA:
+                    entrada, caixa = roi.recortar(frame)
                 else:
-                    print("Braços entre as linhas ou em regiões não monitoradas.")
-                    sincronizados = False
-                    print(f"Sincronizados: {sincronizados}")
-
-                # Lógica de transição de estado corrigida
-                if regiao_esquerdo == regiao_direito:
-                    if regiao_esquerdo == 'abaixo_vermelha':
-                        if estado in ['esperando_levantar', 'esperando_baixar', 'erro']:
-                            estado = 'braços_abaixados'
-                            erro_ocorrido = False  # Resetar o erro
-                            acerto_recentemente_contabilizado = False  # Resetar a flag de acerto
-                            print("Braços abaixados - Pronto para levantar")
-                    elif regiao_esquerdo == 'acima_verde':
-                        if estado == 'braços_abaixados' and sincronizados:
-                            contador += 1
-                            repetition_results.append(1)  # Acerto
-                            enviar_comando_arduino('A', ser)
-                            estado = 'esperando_baixar'
-                            erro_ocorrido = False
-                            acerto_recentemente_contabilizado = True  # Indica que um acerto foi contabilizado
-                            print("Repetição correta contabilizada")
-                        elif estado == 'esperando_baixar' and not erro_ocorrido:
-                            contador_erro += 1
-                            repetition_results.append(0)  # Erro
-                            enviar_comando_arduino('B', ser)
-                            erro_ocorrido = True
-                            estado = 'esperando_baixar'
-                            print("Levantou sem abaixar - Erro contabilizado")
-                else:
-                    # Verificar se os braços entraram na mesma região dentro da tolerância de tempo
-                    if regiao_esquerdo in ['acima_verde', 'abaixo_vermelha'] and regiao_direito in ['acima_verde', 'abaixo_vermelha']:
-                        if braços_sincronizados(regiao_esquerdo):
-                            sincronizados = True
-                        else:
-                            sincronizados = False
-                    else:
-                        sincronizados = False
-
-                    if not sincronizados and estado == 'esperando_baixar' and not erro_ocorrido:
-                        contador_erro += 1
-                        repetition_results.append(0)  # Erro
-                        enviar_comando_arduino('B', ser)
-                        erro_ocorrido = True
-                        estado = 'esperando_baixar'
-                        print("Braços desincronizados - Erro contabilizado")
-
-                # Exibir o contador e o contador de erros na tela
-                cv2.putText(image, f'Exercicio: {selected_exercise}', (50, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2, cv2.LINE_AA)
-                cv2.putText(image, f'Serie: {serie} Repeticao: {contador}', (50, 70), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 255), 2, cv2.LINE_AA)
-                cv2.putText(image, f'Erros: {contador_erro}', (50, 110), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2, cv2.LINE_AA)
-
-                # Checar se a série foi completada
-                if contador >= nSerie:
-                    timer_ativo = True
-                    start_time_descanso = time.time()  # Iniciar o timer de descanso
-
-            # Se o timer estiver ativo, mostrar o tempo restante
-            if timer_ativo:
-                elapsed_time = time.time() - start_time_descanso
-                remaining_time = timeActive - int(elapsed_time)
-
-                if remaining_time > 0:
-                    cv2.putText(image, f'Descanso: {remaining_time}s', (50, 150), cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 0), 2, cv2.LINE_AA)
+                    entrada, caixa = agendador.entrada(frame, decisao), None
+                rgb = conversor.converter(entrada)
+                inicio = time.perf_counter()
+                metricas.registrar_duracao('conversao', inicio - t_captura)
+
+                # Processar a imagem para encontrar a pose e levar os landmarks ao quadro inteiro;
+                # o desenho é feito no próprio quadro BGR, sem converter a imagem RGB de volta
+                landmarks = pose.processar(rgb)
+                fim = metricas.registrar('inferencia', inicio)
+                metricas.registrar_duracao(etapa_resolucao(rgb), fim - inicio)
+                roi.mapear(landmarks, caixa)
+                agendador.registrar(landmarks is not None, fim)
+            stats_serial.registrar(latencia=time.perf_counter() - t_captura)
+
+        duracao_desenho = 0.0
+        # Desenho, imshow e waitKey só nos quadros exibidos; contagem e serial em todos
+        exibir = limitador.devido(inicio_quadro)
+
+        # Verificar se os landmarks foram detectados
+        inicio = time.perf_counter()
+        tempo_quadro = time.time()
+        # Só os quadros que a contagem usa: descanso e conclusão ficam fora do histórico
+        if gravador and inferido and not timer_ativo and not exercicio_concluido:
+            gravador.gravar_quadro(tempo_quadro, landmarks)
+
+        if landmarks is not None and not timer_ativo and not exercicio_concluido:
+            eventos = contador_reps.processar(landmarks, tempo_quadro)
+            analisador.atualizar(contador_reps.suavizados, contador_reps.regioes, tempo_quadro,
+                                 image.shape[1] / image.shape[0])
+            inicio = metricas.registrar('contagem', inicio)
+
+            # Desenhar as linhas limite na imagem
+            if exibir:
+                altura_imagem = image.shape[0]
+                limite_verde = contador_reps.limite_verde
+                limite_vermelho = contador_reps.limite_vermelho
+                cv2.line(image, (0, int(limite_verde * altura_imagem)), (image.shape[1], int(limite_verde * altura_imagem)), (0, 255, 0), 2)
+                cv2.line(image, (0, int(limite_vermelho * altura_imagem)), (image.shape[1], int(limite_vermelho * altura_imagem)), (0, 0, 255), 2)
+                duracao_desenho += time.perf_counter() - inicio
+
+            inicio = time.perf_counter()
+            for evento in eventos:
+                if evento.comando == 'A':
+                    contador += 1
+                    repetition_results.append(1)  # Acerto
                 else:
-                    # Resetar após o descanso
-                    contador = 0
-                    serie += 1
-                    timer_ativo = False
-                    start_time_descanso = None
-                    estado = 'esperando_levantar'
-                    erro_ocorrido = False
-                    acerto_recentemente_contabilizado = False
-
-                    if serie > rSerie:
-                        exercicio_concluido = True
-                        end_time = time.time()
-
-            # Se o exercício foi concluído, mostrar a mensagem e esperar 5 segundos
-            if exercicio_concluido:
-                if end_time is None:
+                    contador_erro += 1
+                    repetition_results.append(0)  # Erro
+                repeticao = analisador.finalizar(evento, len(repetition_results))
+                enviar_comando_arduino(evento.comando, ser, t_captura)
+                notificar_painel('repeticao' if evento.comando == 'A' else 'erro', motivo=evento.motivo)
+                if gravador:
+                    gravador.gravar_evento(evento.tempo, evento.comando, motivo=evento.motivo, serie=serie,
+                                           cinematica=repeticao)
+            if eventos:
+                metricas.registrar('serial', inicio)
+
+            # Exibir o contador e o contador de erros na tela (rasterizados de novo só quando mudam)
+            if exibir:
+                inicio = time.perf_counter()
+                camada_texto.desenhar(image, f'Exercicio: {selected_exercise}', (50, 30), (255, 255, 255))
+                camada_texto.desenhar(image, f'Serie: {serie} Repeticao: {contador}', (50, 70), (0, 255, 255))
+                camada_texto.desenhar(image, f'Erros: {contador_erro}', (50, 110), (0, 0, 255))
+                duracao_desenho += time.perf_counter() - inicio
+
+            # Checar se a série foi completada
+            if contador >= nSerie:
+                timer_ativo = True
+                start_time_descanso = time.time()  # Iniciar o timer de descanso
+                notificar_painel('descanso', segundos=timeActive)
+
+        # Se o timer estiver ativo, mostrar o tempo restante
+        if timer_ativo:
+            elapsed_time = time.time() - start_time_descanso
+            remaining_time = timeActive - int(elapsed_time)
+
+            if remaining_time > 0:
+                if exibir:
+                    camada_texto.desenhar(image, f'Descanso: {remaining_time}s', (50, 150), (255, 255, 0))
+            else:
+                # Resetar após o descanso
+                contador = 0
+                serie += 1
+                ser.definir_serie(serie)
+                if gravador:
+                    gravador.gravar_evento(time.time(), 'S', serie=serie)
+                timer_ativo = False
+                start_time_descanso = None
+                contador_reps.reiniciar_serie()
+                analisador.reiniciar()
+
+                if serie > rSerie:
+                    exercicio_concluido = True
                     end_time = time.time()
-                elapsed_time_concluido = time.time() - end_time
-                if elapsed_time_concluido < 5:
-                    cv2.putText(image, 'Exercicio Completo!', (50, 200), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 255), 2, cv2.LINE_AA)
+                    notificar_painel('concluido')
                 else:
-                    # Finalizar o exercício
-                    break
+                    notificar_painel('serie')
+
+        # Se o exercício foi concluído, mostrar a mensagem e esperar 5 segundos
+        if exercicio_concluido:
+            if end_time is None:
+                end_time = time.time()
+            elapsed_time_concluido = time.time() - end_time
+            if elapsed_time_concluido < 5:
+                if exibir:
+                    camada_texto.desenhar(image, 'Exercicio Completo!', (50, 200), (0, 255, 255))
+            else:
+                # Finalizar o exercício
+                break
 
-            # Desenhar as landmarks na imagem se disponíveis
-            if results.pose_landmarks:
-                mp_drawing.draw_landmarks(image, results.pose_landmarks, mp_pose.POSE_CONNECTIONS)
+        # No descanso e na tela de conclusão a pose é inferida só em parte dos quadros
+        agendador.em_pausa = timer_ativo or exercicio_concluido
 
-            # Mostrar o vídeo em uma janela padrão
-            cv2.imshow('Exercicio', image)
+        # Desenhar as landmarks na imagem se disponíveis
+        if landmarks is not None and exibir:
+            inicio = time.perf_counter()
+            desenhar_pose(image, landmarks)
+            duracao_desenho += time.perf_counter() - inicio
 
-            # Capturar teclas pressionadas
-            key = cv2.waitKey(10) & 0xFF
-            if key == ord('t'):  # Pressione 't' para terminar o exercício
-                break
-            elif key == ord('l'):
-                contador = 0
-                serie = 1
-                contador_erro = 0
-                estado = 'esperando_levantar'
-                erro_ocorrido = False
-                acerto_recentemente_contabilizado = False
-                repetition_results.clear()  # Resetar os resultados das repetições
-                enviar_comando_arduino('C', ser)  # Enviar comando 'C' ao Arduino para resetar
-
-    cap.release()
-    cv2.destroyAllWindows()
-    if ser:
-        ser.close()  # Fechar a porta serial ao finalizar
-
-    # Adição: Gerar relatório em PDF após o exercício
-    gerar_relatorio_pdf(selected_exercise, nSerie, rSerie, timeActive, green_line_offset, red_line_offset, contador, contador_erro, repetition_results)
-
-def gerar_relatorio_pdf(exercicio, nSerie, rSerie, tempo_descanso, offset_verde, offset_vermelho, total_acertos, total_erros, repetition_results):
-    # Calcular resultados cumulativos
-    acumulado_acertos = []
-    acumulado_erros = []
-    acertos = 0
-    erros = 0
-    for resultado in repetition_results:
-        if resultado == 1:
-            acertos += 1
-        else:
-            erros += 1
-        acumulado_acertos.append(acertos)
-        acumulado_erros.append(erros)
-
-    # Plotar o gráfico
-    plt.figure(figsize=(10, 6))
-    plt.plot(range(1, len(acumulado_acertos) + 1), acumulado_acertos, label='Acertos', marker='o')
-    plt.plot(range(1, len(acumulado_erros) + 1), acumulado_erros, label='Erros', marker='x')
-    plt.title('Acertos e Erros por Repetição')
-    plt.xlabel('Número de Repetições')
-    plt.ylabel('Quantidade')
-    plt.legend()
-    plt.grid(True)
-    plot_filename = 'relatorio_plot.png'
-    plt.savefig(plot_filename)
-    plt.close()
-
-    # Criar o PDF
-    pdf = FPDF()
-    pdf.add_page()
-
-    # Título
-    pdf.set_font("Arial", 'B', 16)
-    pdf.cell(0, 10, "Relatório de Exercício", ln=True, align='C')
-
-    pdf.ln(10)
-
-    # Dados do exercício
-    pdf.set_font("Arial", size=12)
-    pdf.cell(0, 10, f"Exercício: {exercicio}", ln=True)
-    pdf.cell(0, 10, f"Número de Repetições por Série: {nSerie}", ln=True)
-    pdf.cell(0, 10, f"Número de Séries: {rSerie}", ln=True)
-    pdf.cell(0, 10, f"Tempo de Descanso entre Séries: {tempo_descanso} segundos", ln=True)
-    pdf.cell(0, 10, f"Offset da Linha Verde: {offset_verde}", ln=True)
-    pdf.cell(0, 10, f"Offset da Linha Vermelha: {offset_vermelho}", ln=True)
-    pdf.cell(0, 10, f"Total de Acertos: {total_acertos}", ln=True)
-    pdf.cell(0, 10, f"Total de Erros: {total_erros}", ln=True)
-
-    pdf.ln(10)
-
-    # Inserir o gráfico
-    if os.path.exists(plot_filename):
-        pdf.image(plot_filename, x=10, w=190)
-        # Remover o arquivo de plot após a inserção
-        os.remove(plot_filename)
-    else:
-        pdf.cell(0, 10, "Gráfico não disponível.", ln=True)
+        key = 0xFF
+        if exibir:
+            metricas.registrar_duracao('desenho', duracao_desenho)
 
-    # Salvar o PDF
-    report_filename = f"Relatorio_{exercicio}_{int(time.time())}.pdf"
-    pdf.output(report_filename)
-    print(f"Relatório gerado: {report_filename}")
+            # Mostrar o vídeo em uma janela padrão (e no painel web, se houver espectadores)
+            inicio = time.perf_counter()
+            if painel:
+                painel.quadro(image)
+            cv2.imshow(nome_janela, image)
 
-# Loop principal
-while True:
-    # Obter a configuração do usuário
-    nSerie, rSerie, timeActive, green_line_offset, red_line_offset, serial_port, selected_exercise = get_exercise_config()
+            # Capturar teclas pressionadas
+            key = cv2.waitKey(1) & 0xFF
+            metricas.registrar('exibicao', inicio)
+            if tempo_primeiro_quadro is None:
+                tempo_primeiro_quadro = time.perf_counter() - inicio_sessao
+        metricas.registrar('quadro', inicio_quadro)
+        if medidor:
+            medidor.encerrar_quadro()
+        metricas.exportar_periodico()
+        if key == ord('t'):  # Pressione 't' para terminar o exercício
+            break
+        elif key == ord('l'):
+            contador = 0
+            serie = 1
+            contador_erro = 0
+            contador_reps.reiniciar_serie()
+            repetition_results.clear()  # Resetar os resultados das repetições
+            analisador.reiniciar()
+            analisador.repeticoes.clear()
+            enviar_comando_arduino('C', ser)  # Enviar comando 'C' ao Arduino para resetar
+            ser.definir_serie(serie)
+            if gravador:
+                gravador.gravar_evento(time.time(), 'C', serie=serie)
+            notificar_painel('reinicio')
+
+    notificar_painel('fim', acertos=repetition_results.count(1))
+
+    # Relatório de desempenho das etapas
+    if pipeline:
+        pipeline.parar()
+        for linha in pipeline.resumo():
+            print(linha)
+    else:
+        print(stats_serial.resumo())
 
-    # Executar o exercício com a configuração fornecida
-    run_exercise(nSerie, rSerie, timeActive, green_line_offset, red_line_offset, serial_port, selected_exercise)
+    cv2.destroyAllWindows()
+    print(ser.resumo())
+    if gravador:
+        sessao_id = gravador.finalizar(repetition_results.count(1), contador_erro)
+        if sessao_id is not None:  # No modo multiestação a sessão é gravada pelo supervisor
+            print(f"Sessão gravada no histórico: {sessao_id} ({gravador.quadros} quadros)")
+    if runtime_proprio:
+        runtime.encerrar()  # Liberar a câmera, o modelo e a porta serial
+
+    # Percentis por etapa, latência captura→Arduino e tempo até o primeiro quadro
+    metricas.exportar()
+    desempenho = metricas.resumo()
+    print(analisador.resumo())
+    desempenho.extend(runtime.calibracao)
+    desempenho.extend(runtime.resumo_captura())
+    desempenho.append(agendador.resumo())
+    desempenho.append(limitador.resumo())
+    if medidor:
+        medidor.parar()
+        desempenho.append(medidor.resumo())
+    if painel:
+        desempenho.append(painel.resumo())
+    if roi_ativo or lado_inferencia:
+        desempenho.append(roi.resumo())
+    if tempo_primeiro_quadro is not None:
+        desempenho.append(f"tempo até o primeiro quadro (partida {'a quente' if partida_quente else 'a frio'}): "
+                          f"{1000 * tempo_primeiro_quadro:.0f} ms")
+    if not partida_quente:
+        desempenho.extend(runtime.resumo_inicializacao())
+    for linha in desempenho:
+        print(linha)
+
+    # Adição: Gerar relatório em PDF após o exercício (em segundo plano, se houver gerador)
+    dados_relatorio = (selected_exercise, nSerie, rSerie, timeActive, green_line_offset, red_line_offset, contador, contador_erro,
+                       list(repetition_results), desempenho)
+    if gerador_relatorios:
+        gerador_relatorios.enviar(*dados_relatorio, repeticoes=analisador.repeticoes)
+    else:
+        gerar_relatorio_pdf(*dados_relatorio, repeticoes=analisador.repeticoes)
+    return desempenho
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Contador de repetições com MediaPipe Pose")
+    parser.add_argument('--pipeline', action='store_true',
+                        help="captura, inferência e exibição em threads separadas, descartando quadros atrasados")
+    parser.add_argument('--protocolo', choices=PROTOCOLOS, default='legado',
+                        help="'legado': comandos A/B/C; 'quadro': quadros com contadores absolutos (requer o funcComm.ino atualizado)")
+    parser.add_argument('--sem-agendador', action='store_true',
+                        help="infere a pose em todos os quadros, inclusive no descanso e sem ninguém na câmera")
+    parser.add_argument('--roi', action='store_true',
+                        help="infere a pose só em um recorte em torno da pessoa, atualizado a cada quadro")
+    parser.add_argument('--lado-inferencia', type=int, metavar='PIXELS',
+                        help="reduz a imagem entregue ao modelo para que o maior lado não passe deste valor")
+    parser.add_argument('--pose', choices=(AUTOMATICO,) + ESTIMADORES, default=AUTOMATICO,
+                        help="estimador de pose; 'auto' mede os disponíveis ao iniciar e usa o mais preciso que cabe no orçamento")
+    parser.add_argument('--orcamento-pose', type=float, default=ORCAMENTO_PADRAO, metavar='MS',
+                        help="tempo máximo de inferência por quadro (p95) na escolha automática do estimador")
+    parser.add_argument('--modelo-onnx', metavar='ARQUIVO',
+                        help="modelo de landmarks do BlazePose em ONNX, para o estimador 'onnx' (requer onnxruntime)")
+    parser.add_argument('--precisao-onnx', choices=tuple(PRECISOES_ONNX), default=PRECISAO_ONNX_PADRAO,
+                        help="variante do BlazePose do modelo ONNX, que o compara aos MediaPipe na escolha automática")
+    parser.add_argument('--fps-exibicao', type=float, default=30, metavar='FPS',
+                        help="taxa máxima de atualização da janela; os demais quadros só são contados (0: todos)")
+    parser.add_argument('--captura', type=ler_captura, default={}, metavar='CHAVE=VALOR,...',
+                        help="configuração da câmera, por exemplo fourcc=MJPG,resolucao=1280x720,fps=30,buffer=1; "
+                             "exercicios.txt e estacoes.txt podem sobrepor")
+    parser.add_argument('--sondar-camera', nargs='?', const='0', metavar='CAMERA',
+                        help="mede fps entregue e idade dos quadros em cada modo da câmera (índice ou URL) e encerra")
+    parser.add_argument('--segundos-sondagem', type=float, default=2.0, metavar='S',
+                        help="duração da medição de fps de cada modo em --sondar-camera")
+    parser.add_argument('--painel', nargs='?', type=int, const=PORTA_PADRAO, metavar='PORTA',
+                        help=f"serve na rede local o vídeo anotado e os eventos da contagem (porta padrão {PORTA_PADRAO})")
+    parser.add_argument('--fps-painel', type=float, default=15, metavar='FPS',
+                        help="quadros por segundo máximos enviados ao painel")
+    parser.add_argument('--medir-alocacoes', action='store_true',
+                        help="mede com tracemalloc a memória alocada em cada quadro (deixa o loop mais lento)")
+    parser.add_argument('--medir-roi', metavar='VIDEO',
+                        help="mede a latência da inferência em um vídeo com e sem ROI em várias resoluções e encerra")
+    parser.add_argument('--metricas', metavar='ARQUIVO',
+                        help="exporta periodicamente os tempos por etapa (CSV, ou formato Prometheus se terminar em .prom)")
+    parser.add_argument('--nivel-log', default='INFO', choices=['DEBUG', 'INFO', 'WARNING'],
+                        help="DEBUG mostra o estado de cada quadro; INFO, apenas as transições; WARNING desliga ambos")
+    parser.add_argument('--lote', metavar='DIRETORIO',
+                        help="pontua os vídeos gravados no diretório, sem janela, e encerra")
+    parser.add_argument('--exercicio', default='Elevacao Lateral',
+                        help="exercício de exercicios.txt usado no modo --lote")
+    parser.add_argument('--saida', default='resumo_lote.json', help="arquivo de resumo do modo --lote")
+    parser.add_argument('--processos', type=int, default=None,
+                        help="número de processos do modo --lote (padrão: núcleos da CPU)")
+    parser.add_argument('--salvar-landmarks', action='store_true',
+                        help="no modo --lote, grava os landmarks de cada vídeo em <video>.landmarks.npz")
+    parser.add_argument('--varrer', metavar='ARQUIVO_NPZ',
+                        help="repontua landmarks salvos com uma grade de offsets em torno dos do exercício")
+    parser.add_argument('--historico', default='historico', metavar='DIRETORIO',
+                        help="diretório onde landmarks e eventos de cada sessão são gravados")
+    parser.add_argument('--sem-historico', action='store_true', help="não grava as sessões")
+    parser.add_argument('--listar-historico', action='store_true', help="lista as sessões gravadas e encerra")
+    parser.add_argument('--reanalisar', type=int, metavar='ID',
+                        help="repontua uma sessão do histórico com uma grade de offsets e encerra")
+    parser.add_argument('--estacoes', nargs='?', const='estacoes.txt', metavar='ARQUIVO',
+                        help="roda as estações de estacoes.txt em paralelo, um processo por câmera")
+    parser.add_argument('--relatorios', metavar='RESUMO_JSON',
+                        help="gera em paralelo um PDF por vídeo de um resumo do modo --lote e encerra")
+    args = parser.parse_args()
+    logging.basicConfig(level=args.nivel_log, format='%(asctime)s %(name)s: %(message)s')
+
+    if args.listar_historico:
+        for sessao in Historico(args.historico).sessoes():
+            print(f"{sessao['id']:5d}  {time.strftime('%Y-%m-%d %H:%M', time.localtime(sessao['inicio']))}  "
+                  f"{sessao['exercicio']:<20} {sessao['quadros']:7d} quadros  {sessao['acertos']} acertos  {sessao['erros']} erros")
+        raise SystemExit
+
+    if args.reanalisar is not None:
+        historico = Historico(args.historico)
+        sessao = historico.sessao(args.reanalisar)
+        landmarks, tempos = historico.carregar(args.reanalisar)
+        varrer_landmarks(landmarks, tempos, sessao['parametros'], eventos=historico.eventos(args.reanalisar))
+        raise SystemExit
+
+    if args.sondar_camera is not None:
+        origem = int(args.sondar_camera) if args.sondar_camera.isdigit() else args.sondar_camera
+        print(f"Sondando os modos da câmera {origem}...")
+        imprimir_sondagem(sondar(origem, segundos=args.segundos_sondagem))
+        raise SystemExit
+
+    # O modo em lote e a medição de ROI não têm orçamento por quadro: 'auto' usa o estimador padrão
+    estimador_lote = ESTIMADOR_PADRAO if args.pose == AUTOMATICO else args.pose
+
+    if args.medir_roi:
+        medir_resolucoes(args.medir_roi, estimador=estimador_lote, modelo_onnx=args.modelo_onnx)
+        raise SystemExit
+
+    if args.relatorios:
+        gerar_relatorios_lote(sessoes_do_resumo_lote(args.relatorios), args.processos)
+        raise SystemExit
+
+    if args.lote or args.varrer:
+        exercises = load_exercises()
+        if args.exercicio not in exercises:
+            parser.error(f"exercício '{args.exercicio}' não encontrado em exercicios.txt")
+        if args.lote:
+            pontuar_diretorio(args.lote, args.exercicio, exercises[args.exercicio], args.saida, args.processos,
+                              args.salvar_landmarks, estimador=estimador_lote, modelo_onnx=args.modelo_onnx)
+        else:
+            varrer_arquivo(args.varrer, exercises[args.exercicio])
+        raise SystemExit
+
+    if args.estacoes:
+        exercises = load_exercises()
+        estacoes = carregar_estacoes(args.estacoes)
+        for estacao in estacoes:
+            if estacao['exercicio'] not in exercises:
+                parser.error(f"estação '{estacao['nome']}': exercício '{estacao['exercicio']}' não encontrado em exercicios.txt")
+        gerador_relatorios = GeradorRelatorios()
+        painel_web = PainelWeb(args.painel).iniciar() if args.painel else None
+        if painel_web:
+            print(f"Painel: {painel_web.endereco_local()}")
+        try:
+            Supervisor(estacoes, exercises, protocolo=args.protocolo, modo_pipeline=args.pipeline, nivel_log=args.nivel_log,
+                       agendar_inferencia=not args.sem_agendador, roi_ativo=args.roi, lado_inferencia=args.lado_inferencia,
+                       fps_exibicao=args.fps_exibicao, estimador=args.pose, orcamento_pose=args.orcamento_pose,
+                       modelo_onnx=args.modelo_onnx, precisao_onnx=args.precisao_onnx, captura=args.captura,
+                       historico=None if args.sem_historico else Historico(args.historico),
+                       gerador_relatorios=gerador_relatorios, painel=painel_web, fps_painel=args.fps_painel).executar()
+        finally:
+            gerador_relatorios.encerrar()
+            if painel_web:
+                print(painel_web.resumo())
+                painel_web.parar()
+        raise SystemExit
+
+    # Relatórios gerados em segundo plano; os pendentes são concluídos ao sair
+    gerador_relatorios = GeradorRelatorios()
+
+    # Modelo e câmera são carregados enquanto o diálogo está aberto e mantidos entre sessões
+    runtime = RuntimeExercicio(estimador=args.pose, orcamento_ms=args.orcamento_pose,
+                               modelo_onnx=args.modelo_onnx, precisao_onnx=args.precisao_onnx,
+                               captura=args.captura).preaquecer()
+    historico = None if args.sem_historico else Historico(args.historico)
+
+    # Painel web opcional: o loop só copia o quadro; a codificação e o envio ficam em outras threads
+    painel_web = emissor_painel = None
+    if args.painel:
+        painel_web = PainelWeb(args.painel).iniciar()
+        emissor_painel = EmissorPainel(DestinoPainel(painel_web, 'Exercicio'), fps_maximo=args.fps_painel)
+        print(f"Painel: {painel_web.endereco_local()}")
+    try:
+        # Loop principal
+        while True:
+            # Obter a configuração do usuário
+            nSerie, rSerie, timeActive, green_line_offset, red_line_offset, serial_port, selected_exercise = get_exercise_config()
+            definicao = load_exercises()[selected_exercise]
+
+            # Executar o exercício com a configuração fornecida
+            run_exercise(nSerie, rSerie, timeActive, green_line_offset, red_line_offset, serial_port, selected_exercise,
+                         modo_pipeline=args.pipeline, protocolo_serial=args.protocolo, filtro=definicao['filtro'],
+                         arquivo_metricas=args.metricas, gerador_relatorios=gerador_relatorios, runtime=runtime,
+                         historico=historico, regra=definicao['regra'], agendar_inferencia=not args.sem_agendador,
+                         roi_ativo=args.roi, lado_inferencia=args.lado_inferencia, fps_exibicao=args.fps_exibicao,
+                         medir_alocacoes=args.medir_alocacoes,
+                         captura=mesclar(args.captura, definicao['captura']), painel=emissor_painel)
+    finally:
+        runtime.encerrar()
+        gerador_relatorios.encerrar()
+        if painel_web:
+            emissor_painel.fechar()
+            painel_web.parar()
@@ -0,0 +1,106 @@
+import cv2
+import numpy as np
+
+from exibicao import redimensionar
+
+# Decisão para cada quadro: inferência na imagem inteira, na imagem reduzida ou nenhuma
+COMPLETA, REDUZIDA, PULAR = 'completa', 'reduzida', 'pular'
+
+# Tamanho da miniatura em tons de cinza usada na detecção de movimento
+TAMANHO_MINIATURA = (64, 48)
+
+
+class AgendadorInferencia:
+    """Decide, a cada quadro, se a pose é inferida.
+
+    Com alguém diante da câmera a inferência roda em todos os quadros, exceto durante o
+    descanso e a tela de conclusão (`em_pausa`), em que roda em um a cada `intervalo_pausa`.
+    Sem ninguém detectado por `tempo_ausencia` segundos, passa a uma verificação de presença
+    na imagem reduzida por `escala_presenca`, a cada `intervalo_presenca` segundos, e compara
+    miniaturas de quadros consecutivos; movimento ou uma pessoa detectada voltam à taxa
+    completa no quadro seguinte. Com `ativo=False` todos os quadros são inferidos, como antes.
+    """
+
+    def __init__(self, ativo=True, intervalo_pausa=5, intervalo_presenca=0.5, escala_presenca=0.25,
+                 tempo_ausencia=2.0, limiar_movimento=6.0):
+        self.ativo = ativo
+        self.intervalo_pausa = intervalo_pausa
+        self.intervalo_presenca = intervalo_presenca
+        self.escala_presenca = escala_presenca
+        self.tempo_ausencia = tempo_ausencia
+        self.limiar_movimento = limiar_movimento
+
+        # Atualizado pelo loop principal: descanso ou exercício concluído
+        self.em_pausa = False
+        self.ausente = False
+        self._quadros_pausa = 0
+        self._ultima_pessoa = None
+        self._proxima_presenca = 0.0
+        self._miniatura = None
+        # Buffers reaproveitados: imagem reduzida, miniatura colorida, as duas últimas em cinza e a diferença
+        self._reduzida = None
+        self._colorida = np.empty(TAMANHO_MINIATURA[::-1] + (3,), dtype=np.uint8)
+        self._cinzas = [np.empty(TAMANHO_MINIATURA[::-1], dtype=np.uint8) for _ in range(2)]
+        self._diferenca = np.empty(TAMANHO_MINIATURA[::-1], dtype=np.uint8)
+
+        self.decisoes = {COMPLETA: 0, REDUZIDA: 0, PULAR: 0}
+        self.retomadas_movimento = 0
+
+    def decidir(self, frame, agora):
+        # `frame` em BGR e `agora` em time.perf_counter
+        if not self.ativo:
+            decisao = COMPLETA
+        elif self.ausente:
+            if self._movimento(frame):
+                # Taxa completa por mais `tempo_ausencia` segundos, à espera de alguém entrar em quadro
+                self.ausente = False
+                self._ultima_pessoa = agora
+                self.retomadas_movimento += 1
+                decisao = COMPLETA
+            elif agora >= self._proxima_presenca:
+                self._proxima_presenca = agora + self.intervalo_presenca
+                decisao = REDUZIDA
+            else:
+                decisao = PULAR
+        elif self.em_pausa:
+            self._quadros_pausa += 1
+            decisao = COMPLETA if self._quadros_pausa % self.intervalo_pausa == 0 else PULAR
+        else:
+            decisao = COMPLETA
+        self.decisoes[decisao] += 1
+        return decisao
+
+    def entrada(self, frame, decisao):
+        # Imagem entregue ao modelo: reduzida na verificação de presença (coordenadas normalizadas não mudam)
+        if decisao == REDUZIDA:
+            self._reduzida = redimensionar(frame, self.escala_presenca, self._reduzida)
+            return self._reduzida
+        return frame
+
+    def registrar(self, pessoa, agora):
+        # Resultado de uma inferência: uma pessoa detectada mantém (ou devolve) a taxa completa
+        if not self.ativo:
+            return
+        if pessoa or self._ultima_pessoa is None:
+            self._ultima_pessoa = agora
+        if pessoa:
+            self.ausente = False
+        elif not self.ausente and agora - self._ultima_pessoa > self.tempo_ausencia:
+            self.ausente = True
+            self._miniatura = None
+            self._proxima_presenca = agora + self.intervalo_presenca
+
+    def _movimento(self, frame):
+        cv2.resize(frame, TAMANHO_MINIATURA, dst=self._colorida, interpolation=cv2.INTER_AREA)
+        miniatura = self._cinzas[1] if self._miniatura is self._cinzas[0] else self._cinzas[0]
+        cv2.cvtColor(self._colorida, cv2.COLOR_BGR2GRAY, dst=miniatura)
+        anterior, self._miniatura = self._miniatura, miniatura
+        return anterior is not None and cv2.absdiff(miniatura, anterior, dst=self._diferenca).mean() > self.limiar_movimento
+
+    def resumo(self):
+        total = sum(self.decisoes.values())
+        if not total:
+            return "agendador: nenhum quadro"
+        return (f"agendador: {self.decisoes[COMPLETA]} inferências completas, {self.decisoes[REDUZIDA]} reduzidas, "
+                f"{self.decisoes[PULAR]} quadros sem inferência ({100 * self.decisoes[PULAR] / total:.0f}%), "
+                f"{self.retomadas_movimento} retomadas por movimento")
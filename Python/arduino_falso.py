@@ -0,0 +1,166 @@
+"""Arduino simulado em um pseudo-terminal (Linux), para medir o envio serial sem hardware.
+
+Executado diretamente, mede o tempo gasto pelo loop da câmera em cada envio, a latência
+até o "Arduino" aplicar o comando e a vazão, comparando a escrita síncrona original com o
+EscritorSerial nos dois protocolos:
+
+    python arduino_falso.py --comandos 2000 --rajada 5
+"""
+import argparse
+import os
+import threading
+import time
+import tty
+
+import serial
+
+from serial_arduino import EscritorSerial, QUADRO_INICIO, TAMANHO_QUADRO, QUADRO_CANAL_INICIO, TAMANHO_QUADRO_CANAL
+
+
+class ArduinoFalso:
+    # Mesma lógica de recepção do funcComm.ino: comandos 'A'/'B'/'C' e quadros com contadores absolutos,
+    # com ou sem canal; o estado de cada canal fica em `canais` (o canal 0 é o próprio validos/invalidos/serie)
+    def __init__(self):
+        self._mestre, self._escravo = os.openpty()
+        tty.setraw(self._escravo)
+        self.porta = os.ttyname(self._escravo)
+        self.validos = 0
+        self.invalidos = 0
+        self.serie = 0
+        self.canais = {}
+        self.quadros_invalidos = 0
+        self.leituras = 0
+        self.atualizacoes = []  # (instante, válidos) a cada mudança do contador de válidos
+        self._quadro = None
+        self._tamanho_quadro = TAMANHO_QUADRO
+        self._rodando = True
+        self._thread = threading.Thread(target=self._loop, name='arduino_falso', daemon=True)
+        self._thread.start()
+
+    def _aplicar(self, byte):
+        if self._quadro is not None:
+            self._quadro.append(byte)
+            if len(self._quadro) == self._tamanho_quadro - 1:
+                conteudo, checksum = self._quadro[:-1], self._quadro[-1]
+                self._quadro = None
+                calculado = 0
+                for b in conteudo:
+                    calculado ^= b
+                if calculado != checksum:
+                    self.quadros_invalidos += 1
+                    return
+                canal = conteudo.pop(0) if self._tamanho_quadro == TAMANHO_QUADRO_CANAL else 0
+                estado = ((conteudo[0] << 8) | conteudo[1], (conteudo[2] << 8) | conteudo[3], conteudo[4])
+                self.canais[canal] = estado
+                if canal == 0:
+                    self.validos, self.invalidos, self.serie = estado
+        elif byte in (QUADRO_INICIO, QUADRO_CANAL_INICIO):
+            self._quadro = []
+            self._tamanho_quadro = TAMANHO_QUADRO if byte == QUADRO_INICIO else TAMANHO_QUADRO_CANAL
+        elif byte == ord('A'):
+            self.validos += 1
+        elif byte == ord('B'):
+            self.invalidos += 1
+        elif byte == ord('C'):
+            self.validos = 0
+            self.invalidos = 0
+
+    def _loop(self):
+        while self._rodando:
+            try:
+                dados = os.read(self._mestre, 4096)
+            except OSError:
+                break
+            agora = time.perf_counter()
+            self.leituras += 1
+            anterior = self.validos
+            for byte in dados:
+                self._aplicar(byte)
+            if self.validos != anterior:
+                self.atualizacoes.append((agora, self.validos))
+
+    def aguardar_validos(self, total, timeout=5.0):
+        limite = time.perf_counter() + timeout
+        while self.validos < total and time.perf_counter() < limite:
+            time.sleep(0.001)
+        return self.validos >= total
+
+    def fechar(self):
+        self._rodando = False
+        for fd in (self._escravo, self._mestre):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+
+def _latencias(envios, atualizacoes):
+    # Para cada comando k, tempo até o Arduino exibir pelo menos k válidos
+    latencias = []
+    j = 0
+    for k, instante in enumerate(envios, start=1):
+        while j < len(atualizacoes) and atualizacoes[j][1] < k:
+            j += 1
+        if j < len(atualizacoes):
+            latencias.append(atualizacoes[j][0] - instante)
+    return sorted(latencias)
+
+
+def _relatorio(nome, custo_envio, envios, arduino, duracao):
+    latencias = _latencias(envios, arduino.atualizacoes)
+    custo_envio.sort()
+    p50 = 1000 * latencias[len(latencias) // 2] if latencias else float('nan')
+    p99 = 1000 * latencias[int(len(latencias) * 0.99)] if latencias else float('nan')
+    print(f"{nome:>16}: envio p50 {1e6 * custo_envio[len(custo_envio) // 2]:7.1f} us "
+          f"(máx. {1e6 * custo_envio[-1]:8.1f} us), latência p50 {p50:6.2f} ms p99 {p99:6.2f} ms, "
+          f"{len(envios) / duracao:8.0f} comandos/s, {arduino.leituras} leituras no Arduino")
+    return {'p50_ms': 1000 * custo_envio[len(custo_envio) // 2], 'p95_ms': 1000 * custo_envio[int(len(custo_envio) * 0.95)],
+            'max_ms': 1000 * custo_envio[-1], 'latencia_p50_ms': p50, 'latencia_p99_ms': p99,
+            'comandos_s': len(envios) / duracao, 'amostras': len(envios)}
+
+
+def medir(modo, comandos, rajada, intervalo):
+    # Imprime e retorna o custo de cada envio no loop (ms), a latência até o Arduino e a vazão
+    arduino = ArduinoFalso()
+    custo_envio = []
+    envios = []
+    try:
+        if modo == 'sincrono':
+            # Comportamento original: ser.write direto do loop de vídeo
+            ser = serial.Serial(arduino.porta, 9600, timeout=1)
+            enviar = lambda comando: ser.write(comando.encode())
+        else:
+            escritor = EscritorSerial(arduino.porta, protocolo=modo, tamanho_fila=comandos)
+            escritor.iniciar()
+            enviar = escritor.enviar
+
+        inicio = time.perf_counter()
+        for i in range(comandos):
+            t0 = time.perf_counter()
+            enviar('A')
+            t1 = time.perf_counter()
+            custo_envio.append(t1 - t0)
+            envios.append(t0)
+            if (i + 1) % rajada == 0:
+                time.sleep(intervalo)
+        arduino.aguardar_validos(comandos)
+        duracao = time.perf_counter() - inicio
+
+        if modo == 'sincrono':
+            ser.close()
+        else:
+            escritor.fechar()
+        return _relatorio(modo, custo_envio, envios, arduino, duracao)
+    finally:
+        arduino.fechar()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark do envio serial contra um Arduino simulado")
+    parser.add_argument('--comandos', type=int, default=2000)
+    parser.add_argument('--rajada', type=int, default=5, help="comandos enviados em sequência antes de cada pausa")
+    parser.add_argument('--intervalo', type=float, default=0.001, help="pausa entre rajadas (s)")
+    args = parser.parse_args()
+
+    for modo in ('sincrono', 'legado', 'quadro'):
+        medir(modo, args.comandos, args.rajada, args.intervalo)
@@ -0,0 +1,475 @@
+"""Benchmarks dos caminhos críticos, sem câmera, Arduino nem pessoa diante da câmera.
+
+Gera trajetórias sintéticas de elevação lateral (com ruído, atraso entre os braços e
+quadros sem pose) e um vídeo sintético (ou usa um vídeo gravado, `--video`), e mede
+separadamente a contagem quadro a quadro e em lote, a cinemática das repetições, os filtros de suavização, a inferência
+de cada estimador de pose, o desenho do quadro, o envio serial para um Arduino simulado em
+um pseudo-terminal e a geração do PDF. O resultado vai para um JSON; se houver uma base
+salva, cada medida é comparada com ela e as que pioraram além de `--limiar` são marcadas.
+O grupo de contagem também confere os resultados (por exemplo, que repontuar uma sessão
+gravada no histórico reproduz a contagem ao vivo) e falha com AssertionError se divergirem:
+
+    python benchmark.py --salvar-base          # grava benchmark_base.json
+    python benchmark.py --saida depois.json    # compara com a base
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+from cinematica import AnalisadorRepeticoes
+from contador import ContadorRepeticoes, pontuar_lote
+from estimadores import COMPLEXIDADES_MEDIAPIPE, criar_estimador
+from exibicao import CONEXOES_POSE, CamadaTexto, ConversorCor, desenhar_pose
+from filtros import FILTRO_PADRAO, criar_filtro
+from historico import Historico
+from lote import varrer_arquivo, varrer_landmarks
+
+# Grupos de benchmarks, na ordem em que rodam
+GRUPOS = ('contagem', 'suavizacao', 'inferencia', 'desenho', 'serial', 'relatorio')
+
+FILTROS_MEDIDOS = ('media:10', 'ema:0.5', 'oneeuro:1.0:0.01')
+
+# Filtro da contagem quadro a quadro e em lote: nenhum, para separá-las do custo da suavização (medido à parte)
+FILTRO_CONTAGEM = 'nenhum'
+
+# Parâmetros da Elevação Lateral em exercicios.txt
+OFFSET_VERDE, OFFSET_VERMELHO = -0.1, 0.15
+
+# Pose em pé, de frente, com os braços abaixados (x, y normalizados); os braços são animados
+POSE_BASE = {
+    0: (0.50, 0.20), 1: (0.49, 0.185), 2: (0.485, 0.185), 3: (0.48, 0.185), 4: (0.51, 0.185),
+    5: (0.515, 0.185), 6: (0.52, 0.185), 7: (0.47, 0.19), 8: (0.53, 0.19), 9: (0.49, 0.225),
+    10: (0.51, 0.225), 11: (0.58, 0.35), 12: (0.42, 0.35), 23: (0.555, 0.60), 24: (0.445, 0.60),
+    25: (0.555, 0.75), 26: (0.445, 0.75), 27: (0.555, 0.90), 28: (0.445, 0.90), 29: (0.56, 0.92),
+    30: (0.44, 0.92), 31: (0.57, 0.95), 32: (0.43, 0.95),
+}
+
+# Ombro, cotovelo, punho e pontos da mão de cada braço, com o lado para onde ele abre na imagem
+BRACOS = ((11, 13, 15, (17, 19, 21), 1), (12, 14, 16, (18, 20, 22), -1))
+BRACO, ANTEBRACO = 0.2, 0.17
+
+# Abdução máxima dos braços na trajetória sintética (graus)
+ANGULO_MAXIMO = 125.0
+
+
+def gerar_trajetoria(segundos=60.0, fps=30.0, periodo=3.0, angulo_maximo=ANGULO_MAXIMO, ruido=0.005, dessincronia=0.0,
+                     perdas=0.0, semente=0):
+    """Landmarks (n, 33, 4) de elevações laterais repetidas a cada `periodo` segundos.
+
+    O ângulo dos braços segue um cosseno elevado de 0 (abaixados) a `angulo_maximo` graus;
+    o braço direito se atrasa `dessincronia` segundos. `ruido` é o desvio padrão somado a x,
+    y e z, e uma fração `perdas` dos quadros fica sem pose (NaN). Retorna (landmarks,
+    tempos, repetições que chegam ao alto).
+    """
+    gerador = np.random.default_rng(semente)
+    tempos = np.arange(int(segundos * fps)) / fps
+    landmarks = np.zeros((len(tempos), 33, 4), dtype=np.float32)
+    landmarks[:, :, 3] = 0.99
+    for indice, (x, y) in POSE_BASE.items():
+        landmarks[:, indice, 0] = x
+        landmarks[:, indice, 1] = y
+
+    for ombro, cotovelo, punho, mao, lado in BRACOS:
+        atraso = dessincronia if lado < 0 else 0.0
+        fase = np.clip(tempos - atraso, 0, None) / periodo
+        angulo = np.radians(angulo_maximo) * (1 - np.cos(2 * np.pi * fase)) / 2
+        direcao = np.stack((lado * np.sin(angulo), np.cos(angulo)), axis=-1)
+        origem = landmarks[:, ombro, :2]
+        landmarks[:, cotovelo, :2] = origem + BRACO * direcao
+        landmarks[:, punho, :2] = origem + (BRACO + ANTEBRACO) * direcao
+        for k, ponto in enumerate(mao):
+            landmarks[:, ponto, :2] = origem + (BRACO + ANTEBRACO + 0.02 * (k + 1)) * direcao
+
+    landmarks[:, :, :3] += gerador.normal(0, ruido, (len(tempos), 33, 3)).astype(np.float32)
+    landmarks[gerador.random(len(tempos)) < perdas] = np.nan
+    return landmarks, tempos, int((segundos - dessincronia) / periodo + 0.5)
+
+
+def gerar_video(landmarks, largura=640, altura=480, quadros=90):
+    # Boneco desenhado a partir dos landmarks (BGR); não é uma pessoa real, mas tem o custo de um quadro de câmera
+    video = []
+    for pontos in landmarks[:quadros]:
+        frame = np.full((altura, largura, 3), 90, dtype=np.uint8)
+        if not np.isnan(pontos[0, 0]):
+            xy = (pontos[:, :2] * (largura, altura)).astype(np.int32)
+            cv2.polylines(frame, list(xy[CONEXOES_POSE]), False, (150, 180, 220), 14)
+            cv2.circle(frame, tuple(int(v) for v in xy[0]), 28, (150, 180, 220), -1)
+        video.append(frame)
+    return video
+
+
+def ler_video(caminho, quadros=90):
+    cap = cv2.VideoCapture(caminho)
+    video = []
+    while len(video) < quadros:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        video.append(frame)
+    cap.release()
+    if not video:
+        raise ValueError(f"não foi possível ler quadros de {caminho}")
+    return video
+
+
+def _estatisticas(tempos, **extras):
+    # Tempos em segundos por item -> milissegundos
+    tempos = 1000 * np.asarray(tempos)
+    return {'p50_ms': float(np.percentile(tempos, 50)), 'p95_ms': float(np.percentile(tempos, 95)),
+            'media_ms': float(tempos.mean()), 'amostras': len(tempos), **extras}
+
+
+def medir_contagem(landmarks, tempos):
+    # Máquina de estados quadro a quadro e o lote vetorizado, com o mesmo filtro; os dois devem gerar os mesmos eventos
+    contador_reps = ContadorRepeticoes(OFFSET_VERDE, OFFSET_VERMELHO, filtro=FILTRO_CONTAGEM)
+    analisador = AnalisadorRepeticoes(contador_reps.regra)
+    medidas = []
+    medidas_cinematica = []
+    todos = []
+    for pontos, tempo in zip(landmarks, tempos):
+        if np.isnan(pontos[0, 0]):
+            continue
+        inicio = time.perf_counter()
+        eventos = contador_reps.processar(pontos, tempo)
+        meio = time.perf_counter()
+        analisador.atualizar(contador_reps.suavizados, contador_reps.regioes, tempo)
+        for evento in eventos:
+            analisador.finalizar(evento)
+        medidas.append(meio - inicio)
+        medidas_cinematica.append(time.perf_counter() - meio)
+        todos += eventos
+    acertos = sum(e.comando == 'A' for e in todos)
+    amplitude = float(np.mean([r['amplitude'] for r in analisador.repeticoes]))
+    resultados = {'contagem': _estatisticas(medidas, filtro=FILTRO_CONTAGEM, acertos=acertos,
+                                            erros=len(todos) - acertos),
+                  'cinematica': _estatisticas(medidas_cinematica, repeticoes=len(analisador.repeticoes),
+                                              amplitude_media=amplitude)}
+
+    medidas = []
+    for _ in range(5):
+        inicio = time.perf_counter()
+        lote = pontuar_lote(landmarks, tempos, OFFSET_VERDE, OFFSET_VERMELHO, filtro=FILTRO_CONTAGEM)
+        medidas.append(time.perf_counter() - inicio)
+    resultados['contagem_lote'] = _estatisticas(medidas, quadros=len(tempos), filtro=FILTRO_CONTAGEM,
+                                                acertos=lote['acertos'], erros=lote['erros'])
+    conferir([tuple(e) for e in lote['eventos']] == [tuple(e) for e in todos],
+             f"contagem em lote: {lote['acertos']} acertos e {lote['erros']} erros, "
+             f"quadro a quadro {acertos} e {len(todos) - acertos}")
+    return resultados
+
+
+def conferir(condicao, mensagem):
+    # Verificação de corretude dentro de um benchmark (não some com python -O, ao contrário de assert)
+    if not condicao:
+        raise AssertionError(mensagem)
+
+
+def conferir_cinematica(segundos=30.0):
+    # Sessão sintética de 10 elevações de 0° a ANGULO_MAXIMO: o 'B' de um quadro que a contagem gera logo após
+    # cada acerto não pode virar repetição nem puxar a amplitude média para baixo
+    landmarks, tempos, geradas = gerar_trajetoria(segundos, dessincronia=0.2, perdas=0.02)
+    contador_reps = ContadorRepeticoes(OFFSET_VERDE, OFFSET_VERMELHO)
+    analisador = AnalisadorRepeticoes(contador_reps.regra)
+    for pontos, tempo in zip(landmarks, tempos):
+        if np.isnan(pontos[0, 0]):
+            continue
+        eventos = contador_reps.processar(pontos, tempo)
+        analisador.atualizar(contador_reps.suavizados, contador_reps.regioes, tempo)
+        for evento in eventos:
+            analisador.finalizar(evento)
+    amplitude = float(np.mean([r['amplitude'] for r in analisador.repeticoes]))
+    conferir(len(analisador.repeticoes) <= geradas + 1,
+             f"cinemática: {len(analisador.repeticoes)} repetições em {geradas} elevações")
+    conferir(abs(amplitude - ANGULO_MAXIMO) < 0.1 * ANGULO_MAXIMO,
+             f"cinemática: amplitude média {amplitude:.0f}°, gerada {ANGULO_MAXIMO:.0f}°")
+
+
+def simular_sessao(landmarks, tempos, historico, params, gravar_descanso=False):
+    # O loop de run_exercise sem câmera: contagem, descanso e séries, gravando no histórico como ao vivo
+    # (com `gravar_descanso`, como as versões que gravavam também os quadros do descanso)
+    contador_reps = ContadorRepeticoes(params['offset_verde'], params['offset_vermelho'], filtro=params['filtro'])
+    gravador = historico.nova_sessao('Elevacao Lateral', params)
+    contador = acertos = erros = 0
+    serie = 1
+    inicio_descanso = None
+    for pontos, tempo in zip(landmarks, tempos):
+        if serie > params['series']:
+            break
+        if inicio_descanso is not None:
+            if tempo - inicio_descanso < params['descanso']:
+                if gravar_descanso:
+                    gravador.gravar_quadro(tempo, None if np.isnan(pontos[0, 0]) else pontos)
+                continue
+            contador = 0
+            serie += 1
+            gravador.gravar_evento(float(tempo), 'S', serie=serie)
+            inicio_descanso = None
+            contador_reps.reiniciar_serie()
+            continue
+        sem_pose = np.isnan(pontos[0, 0])
+        gravador.gravar_quadro(tempo, None if sem_pose else pontos)
+        if sem_pose:
+            continue
+        for evento in contador_reps.processar(pontos, tempo):
+            gravador.gravar_evento(evento.tempo, evento.comando, motivo=evento.motivo, serie=serie)
+            if evento.comando == 'A':
+                contador += 1
+                acertos += 1
+            else:
+                erros += 1
+        if contador >= params['repeticoes']:
+            inicio_descanso = tempo
+    return gravador.finalizar(acertos, erros), acertos, erros, serie - 1
+
+
+def medir_reanalise(landmarks, tempos, repeticoes=5, series=3, descanso=2.5):
+    # Repontua nos próprios offsets uma sessão de várias séries gravada no histórico e confere com a contagem
+    # ao vivo; o descanso termina com os braços no alto, então o estado não pode passar de uma série à outra
+    params = {'repeticoes': repeticoes, 'series': series, 'descanso': descanso, 'offset_verde': OFFSET_VERDE,
+              'offset_vermelho': OFFSET_VERMELHO, 'filtro': FILTRO_PADRAO}
+    medidas = []
+    with tempfile.TemporaryDirectory() as diretorio:
+        historico = Historico(diretorio)
+        try:
+            for gravar_descanso in (False, True):
+                sessao_id, acertos, erros, concluidas = simular_sessao(landmarks, tempos, historico, params,
+                                                                       gravar_descanso)
+                gravados, tempos_gravados = historico.carregar(sessao_id)
+                eventos = historico.eventos(sessao_id)
+                for _ in range(1 if gravar_descanso else 5):
+                    inicio = time.perf_counter()
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        r = varrer_landmarks(gravados, tempos_gravados, params, passos=1, amplitude=0,
+                                             eventos=eventos)[0]
+                    if not gravar_descanso:
+                        medidas.append(time.perf_counter() - inicio)
+                conferir((r['acertos'], r['erros']) == (acertos, erros),
+                         f"reanálise do histórico{' com o descanso gravado' if gravar_descanso else ''}: "
+                         f"{r['acertos']} acertos e {r['erros']} erros, ao vivo {acertos} e {erros}")
+                if not gravar_descanso:
+                    # O mesmo pelo arquivo de landmarks do modo lote, que guarda só os eventos 'S'
+                    caminho = os.path.join(diretorio, 'sessao.landmarks.npz')
+                    series_gravadas = [e for e in eventos if e['comando'] == 'S']
+                    np.savez_compressed(caminho, landmarks=gravados, tempos=tempos_gravados,
+                                        eventos=np.array(json.dumps(series_gravadas)))
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        r = varrer_arquivo(caminho, params, passos=1, amplitude=0)[0]
+                    conferir((r['acertos'], r['erros']) == (acertos, erros),
+                             f"varredura do arquivo de landmarks: {r['acertos']} acertos e {r['erros']} erros, "
+                             f"ao vivo {acertos} e {erros}")
+                del gravados, tempos_gravados
+        finally:
+            historico.fechar()
+    return {'reanalise': _estatisticas(medidas, series=concluidas, acertos=acertos, erros=erros)}
+
+
+def medir_suavizacao(landmarks, tempos):
+    resultados = {}
+    for especificacao in FILTROS_MEDIDOS:
+        filtro = criar_filtro(especificacao)
+        medidas = []
+        for pontos, tempo in zip(landmarks, tempos):
+            if np.isnan(pontos[0, 0]):
+                continue
+            inicio = time.perf_counter()
+            filtro.atualizar(pontos, tempo)
+            medidas.append(time.perf_counter() - inicio)
+        resultados[f"suavizacao_{especificacao.split(':')[0]}"] = _estatisticas(medidas, filtro=especificacao)
+    return resultados
+
+
+def medir_inferencia(video, estimadores, modelo_onnx=None, quadros=60):
+    imagens = [cv2.cvtColor(frame, cv2.COLOR_BGR2RGB) for frame in video]
+    resultados = {}
+    for nome in estimadores:
+        try:
+            estimador = criar_estimador(nome, modelo_onnx)
+        except Exception as e:
+            resultados[f'inferencia_{nome}'] = {'erro': str(e)}
+            continue
+        medidas = []
+        deteccoes = 0
+        try:
+            estimador.processar(imagens[0])  # Aquecimento
+            for i in range(quadros):
+                inicio = time.perf_counter()
+                landmarks = estimador.processar(imagens[i % len(imagens)])
+                medidas.append(time.perf_counter() - inicio)
+                deteccoes += landmarks is not None
+        finally:
+            estimador.fechar()
+        resultados[f'inferencia_{nome}'] = _estatisticas(medidas, deteccoes=deteccoes / quadros,
+                                                         resolucao=f"{imagens[0].shape[1]}x{imagens[0].shape[0]}")
+    return resultados
+
+
+def medir_desenho(video, landmarks, quadros=300):
+    # O que o loop faz em cada quadro exibido: conversão para o modelo, linhas, textos e esqueleto
+    conversor = ConversorCor()
+    camada = CamadaTexto()
+    frame = np.empty_like(video[0])
+    medidas = []
+    for i in range(quadros):
+        np.copyto(frame, video[i % len(video)])
+        pontos = landmarks[i % len(landmarks)]
+        inicio = time.perf_counter()
+        conversor.converter(frame)
+        for limite, cor in ((0.25, (0, 255, 0)), (0.5, (0, 0, 255))):
+            y = int(limite * frame.shape[0])
+            cv2.line(frame, (0, y), (frame.shape[1], y), cor, 2)
+        camada.desenhar(frame, 'Exercicio: Elevacao Lateral', (50, 30), (255, 255, 255))
+        camada.desenhar(frame, f'Serie: 1 Repeticao: {i // 90}', (50, 70), (0, 255, 255))
+        camada.desenhar(frame, f'Erros: {i // 360}', (50, 110), (0, 0, 255))
+        if not np.isnan(pontos[0, 0]):
+            desenhar_pose(frame, pontos)
+        medidas.append(time.perf_counter() - inicio)
+    return {'desenho': _estatisticas(medidas, resolucao=f"{frame.shape[1]}x{frame.shape[0]}",
+                                     rasterizacoes=camada.rasterizacoes)}
+
+
+def medir_serial(comandos=1000, rajada=5, intervalo=0.001):
+    # Custo de cada envio no loop e latência até o Arduino simulado, nos dois protocolos de um só Arduino
+    try:
+        from arduino_falso import medir
+    except ImportError as e:  # O Arduino simulado usa pseudo-terminais (Linux)
+        return {'serial': {'erro': str(e)}}
+    return {f'serial_{modo}': medir(modo, comandos, rajada, intervalo) for modo in ('legado', 'quadro')}
+
+
+def medir_relatorio(repeticoes=5):
+    from relatorio import gerar_relatorio_pdf
+    resultados = [1, 1, 0, 1, 1, 1, 0, 1, 1, 1]
+    desempenho = [f"etapa {i}: p50 1.00 ms, p95 2.00 ms, p99 3.00 ms (100 amostras)" for i in range(8)]
+    medidas = []
+    diretorio_original = os.getcwd()
+    with tempfile.TemporaryDirectory() as diretorio:
+        os.chdir(diretorio)  # O PDF é gravado no diretório atual
+        try:
+            for _ in range(repeticoes):
+                inicio = time.perf_counter()
+                with contextlib.redirect_stdout(io.StringIO()):
+                    gerar_relatorio_pdf('Elevacao Lateral', 10, 1, 1, OFFSET_VERDE, OFFSET_VERMELHO, 8, 2,
+                                        resultados, desempenho)
+                medidas.append(time.perf_counter() - inicio)
+        finally:
+            os.chdir(diretorio_original)
+    # A primeira geração inclui a importação do fpdf e do matplotlib
+    return {'relatorio_pdf': _estatisticas(medidas[1:] or medidas, primeira_ms=1000 * medidas[0])}
+
+
+def comparar(resultados, base, limiar=10.0):
+    # Variação percentual do p50 e do p95 de cada medida presente nas duas execuções
+    comparacao = {}
+    for nome, atual in resultados.items():
+        anterior = base.get(nome)
+        if not anterior or 'erro' in atual or 'erro' in anterior:
+            continue
+        variacao = {chave: 100 * (atual[chave] - anterior[chave]) / anterior[chave]
+                    for chave in ('p50_ms', 'p95_ms') if anterior.get(chave)}
+        comparacao[nome] = {**{f'base_{chave}': anterior[chave] for chave in variacao},
+                            **{f'variacao_{chave}': v for chave, v in variacao.items()},
+                            'regressao': variacao.get('p50_ms', 0) > limiar}
+    return comparacao
+
+
+def imprimir(resultados, comparacao):
+    print(f"{'medida':<26}{'p50 (ms)':>11}{'p95 (ms)':>11}{'vs base p50':>13}")
+    for nome, r in resultados.items():
+        if 'erro' in r:
+            print(f"{nome:<26}  indisponível: {r['erro']}")
+            continue
+        c = comparacao.get(nome)
+        variacao = f"{c['variacao_p50_ms']:+.1f}%" if c and 'variacao_p50_ms' in c else '-'
+        marca = '  REGRESSÃO' if c and c['regressao'] else ''
+        print(f"{nome:<26}{r['p50_ms']:11.4f}{r['p95_ms']:11.4f}{variacao:>13}{marca}")
+
+
+def maquina():
+    return {'sistema': platform.platform(), 'processador': platform.processor() or platform.machine(),
+            'nucleos': os.cpu_count(), 'python': platform.python_version(), 'numpy': np.__version__,
+            'opencv': cv2.__version__}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmarks da contagem, filtros, inferência, desenho, serial e PDF")
+    parser.add_argument('--grupos', default=','.join(GRUPOS), help=f"grupos a medir, separados por vírgula ({', '.join(GRUPOS)})")
+    parser.add_argument('--segundos', type=float, default=120, help="duração da trajetória sintética")
+    parser.add_argument('--ruido', type=float, default=0.005, help="desvio padrão do ruído nos landmarks")
+    parser.add_argument('--dessincronia', type=float, default=0.2, help="atraso do braço direito (s)")
+    parser.add_argument('--perdas', type=float, default=0.02, help="fração de quadros sem pose")
+    parser.add_argument('--semente', type=int, default=0)
+    parser.add_argument('--video', metavar='ARQUIVO', help="vídeo gravado para inferência e desenho, em vez do sintético")
+    parser.add_argument('--largura', type=int, default=640)
+    parser.add_argument('--altura', type=int, default=480)
+    parser.add_argument('--pose', default=','.join(COMPLEXIDADES_MEDIAPIPE),
+                        help="estimadores medidos, separados por vírgula")
+    parser.add_argument('--modelo-onnx', metavar='ARQUIVO', help="modelo para o estimador 'onnx'")
+    parser.add_argument('--saida', default='benchmark.json')
+    parser.add_argument('--base', default='benchmark_base.json', help="resultado anterior para comparação")
+    parser.add_argument('--salvar-base', action='store_true', help="grava este resultado também como a nova base")
+    parser.add_argument('--limiar', type=float, default=10.0, help="piora do p50 (%%) marcada como regressão")
+    args = parser.parse_args()
+
+    grupos = [g.strip() for g in args.grupos.split(',') if g.strip()]
+    for grupo in grupos:
+        if grupo not in GRUPOS:
+            parser.error(f"grupo desconhecido: '{grupo}'")
+
+    landmarks, tempos, repeticoes = gerar_trajetoria(args.segundos, ruido=args.ruido, dessincronia=args.dessincronia,
+                                                     perdas=args.perdas, semente=args.semente)
+    video = None
+    if 'inferencia' in grupos or 'desenho' in grupos:
+        video = ler_video(args.video) if args.video else gerar_video(landmarks, args.largura, args.altura)
+
+    resultados = {}
+    for grupo in grupos:
+        print(f"Medindo {grupo}...")
+        if grupo == 'contagem':
+            resultados.update(medir_contagem(landmarks, tempos))
+            resultados.update(medir_reanalise(landmarks, tempos))
+            conferir_cinematica()
+        elif grupo == 'suavizacao':
+            resultados.update(medir_suavizacao(landmarks, tempos))
+        elif grupo == 'inferencia':
+            nomes = [n.strip() for n in args.pose.split(',') if n.strip()]
+            resultados.update(medir_inferencia(video, nomes, args.modelo_onnx))
+        elif grupo == 'desenho':
+            resultados.update(medir_desenho(video, landmarks))
+        elif grupo == 'serial':
+            resultados.update(medir_serial())
+        elif grupo == 'relatorio':
+            resultados.update(medir_relatorio())
+
+    base = {}
+    if args.base and os.path.exists(args.base):
+        with open(args.base, encoding='utf-8') as f:
+            base = json.load(f)['resultados']
+    comparacao = comparar(resultados, base, args.limiar)
+
+    saida = {
+        'instante': time.time(),
+        'maquina': maquina(),
+        'parametros': {'segundos': args.segundos, 'ruido': args.ruido, 'dessincronia': args.dessincronia,
+                       'perdas': args.perdas, 'semente': args.semente, 'repeticoes_geradas': repeticoes,
+                       'video': args.video or f"sintético {args.largura}x{args.altura}"},
+        'resultados': resultados,
+        'comparacao': comparacao,
+    }
+    with open(args.saida, 'w', encoding='utf-8') as f:
+        json.dump(saida, f, ensure_ascii=False, indent=2)
+    if args.salvar_base:
+        with open(args.base, 'w', encoding='utf-8') as f:
+            json.dump(saida, f, ensure_ascii=False, indent=2)
+
+    imprimir(resultados, comparacao)
+    regressoes = [nome for nome, c in comparacao.items() if c['regressao']]
+    print(f"{repeticoes} repetições geradas. Resultado: {args.saida}" +
+          (f"; comparado com {args.base}: {len(regressoes)} regressões acima de {args.limiar:.0f}%" if base else ""))
@@ -0,0 +1,224 @@
+"""Configuração da câmera (codec, resolução, fps e buffer do driver) e sondagem de latência.
+
+Uma configuração é um dicionário com as chaves de `CHAVES_CAPTURA`, escrito em
+exercicios.txt, estacoes.txt e `--captura` como campos chave=valor, por exemplo
+`fourcc=MJPG,resolucao=1280x720,fps=30,buffer=1`. Chaves ausentes ficam com o padrão do
+driver. O driver pode recusar ou arredondar o pedido: `configurar` lê de volta o que foi
+aceito. `sondar` mede, para cada modo, a taxa de quadros entregue e a idade dos quadros
+quando o loop demora a ler, para escolher o modo de menor latência de cada câmera.
+"""
+import logging
+import time
+
+import cv2
+import numpy as np
+
+CHAVES_CAPTURA = ('fourcc', 'resolucao', 'fps', 'buffer')
+
+# Modos testados por `sondar`: o padrão do driver e combinações comuns em webcams USB
+MODOS_SONDAGEM = [{}] + [
+    {'fourcc': fourcc, 'resolucao': resolucao, 'fps': fps, 'buffer': 1}
+    for fourcc in ('MJPG', 'YUYV') for resolucao in ('640x480', '1280x720') for fps in (30.0, 60.0)
+]
+
+# Carimbos de tempo do driver mais antigos que isto são considerados inválidos (outro relógio)
+IDADE_MAXIMA_PLAUSIVEL = 10.0
+
+# Etapa das métricas com a idade de cada quadro ao ser lido, quando o driver informa o carimbo
+ETAPA_IDADE = 'idade_quadro'
+
+logger = logging.getLogger('captura')
+
+
+def criar_captura(definicao=None):
+    """Valida e normaliza uma configuração (dicionário de chave -> texto ou número).
+
+    Levanta ValueError com chaves desconhecidas ou valores inválidos.
+    """
+    definicao = definicao or {}
+    desconhecidas = set(definicao) - set(CHAVES_CAPTURA)
+    if desconhecidas:
+        raise ValueError(f"Campos desconhecidos na captura: {', '.join(sorted(desconhecidas))}")
+    normalizada = {}
+    try:
+        if definicao.get('fourcc'):
+            fourcc = str(definicao['fourcc']).strip().upper()
+            if len(fourcc) != 4:
+                raise ValueError("fourcc deve ter 4 caracteres")
+            normalizada['fourcc'] = fourcc
+        if definicao.get('resolucao'):
+            partes = str(definicao['resolucao']).lower().split('x')
+            if len(partes) != 2:
+                raise ValueError("resolucao deve ser <largura>x<altura>")
+            largura, altura = (int(v) for v in partes)
+            normalizada['resolucao'] = f"{largura}x{altura}"
+        if definicao.get('fps'):
+            normalizada['fps'] = float(definicao['fps'])
+        if definicao.get('buffer') not in (None, ''):
+            normalizada['buffer'] = int(definicao['buffer'])
+    except ValueError as e:
+        raise ValueError(f"Captura inválida {definicao}: {e}") from None
+    return normalizada
+
+
+def ler_captura(texto):
+    # 'fourcc=MJPG,resolucao=1280x720,...' (formato de --captura) -> configuração validada
+    definicao = {}
+    for campo in (c.strip() for c in (texto or '').split(',')):
+        if campo:
+            chave, _, valor = campo.partition('=')
+            definicao[chave.strip()] = valor.strip()
+    return criar_captura(definicao)
+
+
+def mesclar(*configuracoes):
+    # As posteriores têm precedência: global, exercício, estação
+    resultado = {}
+    for configuracao in configuracoes:
+        resultado.update(configuracao or {})
+    return resultado
+
+
+def descrever(configuracao):
+    if not configuracao:
+        return "padrão do driver"
+    return ', '.join(f"{chave}={configuracao[chave]}" for chave in CHAVES_CAPTURA if configuracao.get(chave) is not None)
+
+
+def ler_configuracao(cap):
+    # O que o driver está usando de fato (None onde a propriedade não é suportada)
+    fourcc = int(cap.get(cv2.CAP_PROP_FOURCC))
+    fourcc = fourcc.to_bytes(4, 'little').decode('ascii', 'replace').strip('\x00 ') if fourcc > 0 else ''
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    buffer = int(cap.get(cv2.CAP_PROP_BUFFERSIZE))
+    return {
+        'fourcc': fourcc or None,
+        'resolucao': f"{int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))}x{int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))}",
+        'fps': round(fps, 2) if fps > 0 else None,
+        'buffer': buffer if buffer > 0 else None,
+    }
+
+
+def configurar(cap, configuracao):
+    """Aplica a configuração na câmera aberta e retorna a que o driver aceitou.
+
+    O codec vem antes da resolução e a resolução antes do fps, porque os modos que o
+    driver oferece dependem dos anteriores. Cada diferença entre o pedido e o aceito é
+    registrada no log.
+    """
+    if configuracao.get('fourcc'):
+        cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*configuracao['fourcc']))
+    if configuracao.get('resolucao'):
+        largura, altura = (int(v) for v in configuracao['resolucao'].split('x'))
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH, largura)
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, altura)
+    if configuracao.get('fps'):
+        cap.set(cv2.CAP_PROP_FPS, configuracao['fps'])
+    if configuracao.get('buffer') is not None:
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, configuracao['buffer'])
+
+    aceita = ler_configuracao(cap)
+    for chave, pedido in configuracao.items():
+        valor = aceita[chave]
+        igual = (valor is not None and abs(valor - pedido) < 0.5) if chave == 'fps' else valor == pedido
+        if not igual:
+            logger.warning("câmera: %s pedido %s, aceito %s", chave, pedido, valor)
+    return aceita
+
+
+def idade_quadro(cap):
+    # Idade (s) do último quadro lido, pelo carimbo de tempo do driver (V4L2: relógio monotônico);
+    # None se o backend não fornece um carimbo comparável
+    carimbo = cap.get(cv2.CAP_PROP_POS_MSEC)
+    if carimbo <= 0:
+        return None
+    idade = time.monotonic() - carimbo / 1000
+    return idade if 0 <= idade < IDADE_MAXIMA_PLAUSIVEL else None
+
+
+def _medir_modo(origem, modo, segundos, carga, amostras=10):
+    cap = cv2.VideoCapture(origem)
+    if not cap.isOpened():
+        return None
+    try:
+        aceita = configurar(cap, modo)
+        for _ in range(5):  # Negociação e primeiros quadros, às vezes escuros ou atrasados
+            cap.read()
+
+        # Taxa entregue: leituras seguidas, o loop nunca é o gargalo
+        quadros = 0
+        inicio = time.perf_counter()
+        while time.perf_counter() - inicio < segundos:
+            if not cap.read()[0]:
+                break
+            quadros += 1
+        fps = quadros / (time.perf_counter() - inicio)
+
+        # Com um loop que leva `carga` s por quadro (inferência lenta): idade do quadro lido e
+        # quantos quadros antigos ainda estavam no buffer (leituras que voltam imediatamente)
+        idades = []
+        enfileirados = []
+        for _ in range(amostras):
+            time.sleep(carga)
+            cap.read()
+            idade = idade_quadro(cap)
+            if idade is not None:
+                idades.append(idade)
+            antigos = 0
+            while antigos < 10:
+                inicio = time.perf_counter()
+                cap.read()
+                if time.perf_counter() - inicio > 0.25 / max(fps, 1.0):
+                    break
+                antigos += 1
+            enfileirados.append(antigos)
+    finally:
+        cap.release()
+    return {
+        'pedido': modo, 'aceita': aceita, 'fps': fps,
+        'idade_p50_ms': 1000 * float(np.median(idades)) if idades else None,
+        'enfileirados': float(np.mean(enfileirados)),
+    }
+
+
+def _atraso_estimado(medicao):
+    # Idade medida pelo carimbo do driver ou, sem ele, quadros antigos no buffer × intervalo entre quadros
+    if medicao['idade_p50_ms'] is not None:
+        return medicao['idade_p50_ms']
+    return 1000 * medicao['enfileirados'] / max(medicao['fps'], 1.0)
+
+
+def sondar(origem=0, modos=None, segundos=2.0, carga=0.05):
+    """Mede cada modo da câmera e retorna as medições, da menor latência para a maior.
+
+    Modos que o driver converte no mesmo modo aceito são medidos uma vez só. Empates na
+    latência ficam com a maior taxa de quadros.
+    """
+    medicoes = []
+    aceitas = []
+    for modo in MODOS_SONDAGEM if modos is None else modos:
+        medicao = _medir_modo(origem, criar_captura(modo), segundos, carga)
+        if medicao is None:
+            print(f"Não foi possível abrir a câmera {origem}.")
+            break
+        if medicao['aceita'] in aceitas:
+            continue
+        aceitas.append(medicao['aceita'])
+        medicoes.append(medicao)
+        print(f"  {descrever(medicao['pedido']):<52} -> {descrever(medicao['aceita'])}: {medicao['fps']:.1f} fps, "
+              f"atraso {_atraso_estimado(medicao):.0f} ms")
+    medicoes.sort(key=lambda m: (round(_atraso_estimado(m)), -m['fps']))
+    return medicoes
+
+
+def imprimir_sondagem(medicoes):
+    print("fps entregue  idade p50 (ms)  quadros no buffer  modo aceito")
+    for m in medicoes:
+        idade = f"{m['idade_p50_ms']:14.0f}" if m['idade_p50_ms'] is not None else f"{'-':>14}"
+        print(f"{m['fps']:12.1f}  {idade}  {m['enfileirados']:17.1f}  {descrever(m['aceita'])}")
+    if medicoes:
+        melhor = medicoes[0]['aceita']
+        campos = [f"{chave}={melhor[chave]}" for chave in CHAVES_CAPTURA if melhor.get(chave) is not None]
+        # --captura separa os campos por vírgula; estacoes.txt e exercicios.txt, por ponto e vírgula
+        print(f"Menor latência: --captura {','.join(campos)}")
+        print(f"  no fim da linha em estacoes.txt ou exercicios.txt: ;{';'.join(campos)}")
@@ -0,0 +1,148 @@
+"""Cinemática de cada repetição calculada quadro a quadro, sem guardar a sessão.
+
+`AnalisadorRepeticoes` recebe os mesmos landmarks suavizados e regiões usados na contagem
+e mantém, para a repetição em andamento, só acumuladores de tamanho fixo por lado: mínimo
+e máximo do ângulo, média e variância pelo método de Welford, velocidade de pico, tempos
+de ida e volta e tempo entre as linhas. Cada evento A/B da contagem fecha a repetição em um
+resumo. A janela de uma repetição vai do evento anterior (ou do início da série) até o
+dela, então contém a volta da repetição anterior e a ida desta. Um evento cuja janela tem
+menos de `QUADROS_MINIMOS` quadros não vira repetição (é o 'B' de "levantou sem abaixar"
+que a contagem gera no quadro seguinte a um acerto, com os braços ainda no alto): os
+quadros dele continuam na janela da próxima.
+
+O ângulo de cada lado é o do segmento referência→alvo da regra com a vertical para baixo,
+em graus. Na elevação lateral é a abdução do ombro: 0° com o braço junto ao corpo e 90° na
+horizontal. Ida é o movimento no sentido da regra (a subida na elevação lateral, a descida
+no agachamento) e volta, o contrário.
+"""
+import numpy as np
+
+from regras import ENTRE_LINHAS, criar_regra
+
+# Intervalos maiores entre quadros (pose perdida, inferência suspensa) não entram na velocidade nem nos tempos
+LACUNA_MAXIMA = 0.5
+
+# Velocidade angular média dos dois lados (°/s) abaixo da qual o movimento não é ida nem volta
+VELOCIDADE_PARADO = 15.0
+
+# Quadros mínimos na janela de um evento para ele ser resumido como repetição
+QUADROS_MINIMOS = 2
+
+
+class AnalisadorRepeticoes:
+    """Estatísticas de cada repetição a partir do fluxo de landmarks da contagem.
+
+    `atualizar` recebe, a cada quadro contado, os landmarks suavizados (33, 4), os códigos
+    de região dos alvos esquerdo e direito, o instante em segundos e a proporção
+    largura/altura da imagem (as coordenadas x e y são normalizadas por lados diferentes).
+    `finalizar` recebe o evento A/B e o número dele entre os eventos contados e retorna o
+    resumo da repetição, também guardado em `repeticoes`, ou None se a janela for curta
+    demais para ser uma repetição. Como esses eventos ficam de fora, `repeticoes` pode ter
+    menos itens que a contagem; o campo 'numero' do resumo liga cada um ao seu evento.
+    `reiniciar` descarta a repetição em andamento (nova série ou contagem zerada).
+    """
+
+    def __init__(self, regra):
+        regra = criar_regra(regra)
+        referencias = regra.indices[:regra.n_referencias]
+        # Referência do mesmo lado do alvo; com uma referência só (nariz), a mesma para os dois
+        self._referencias = np.array([referencias[0], referencias[-1]], dtype=np.intp)
+        self._alvos = regra.indices[regra.n_referencias:]
+        self.sinal = regra.sinal
+        self.repeticoes = []
+        self._anterior = np.zeros(2)
+        self._tempo_anterior = None
+        self.reiniciar()
+
+    def reiniciar(self):
+        self._inicio = None
+        self._tempo_anterior = None
+        self._zerar()
+
+    def _zerar(self):
+        self._quadros = 0
+        self._media = np.zeros(2)
+        self._m2 = np.zeros(2)
+        self._minimo = np.full(2, np.inf)
+        self._maximo = np.full(2, -np.inf)
+        self._entre_linhas = np.zeros(2)
+        self._velocidade_pico = 0.0
+        self._ida = 0.0
+        self._volta = 0.0
+        self._soma_assimetria = 0.0
+        self._assimetria_maxima = 0.0
+
+    def angulos(self, landmarks, proporcao=1.0):
+        # Ângulo (2,) de cada segmento referência→alvo com a vertical para baixo, em graus
+        dx = (landmarks[self._alvos, 0] - landmarks[self._referencias, 0]) * proporcao
+        dy = landmarks[self._alvos, 1] - landmarks[self._referencias, 1]
+        return np.degrees(np.arctan2(np.abs(dx), dy))
+
+    def atualizar(self, landmarks, regioes, tempo, proporcao=1.0):
+        angulos = self.angulos(landmarks, proporcao)
+        if self._inicio is None:
+            self._inicio = tempo
+
+        # Média e variância do ângulo pelo método de Welford, mínimo e máximo
+        self._quadros += 1
+        delta = angulos - self._media
+        self._media += delta / self._quadros
+        self._m2 += delta * (angulos - self._media)
+        np.minimum(self._minimo, angulos, out=self._minimo)
+        np.maximum(self._maximo, angulos, out=self._maximo)
+        assimetria = abs(float(angulos[0] - angulos[1]))
+        self._soma_assimetria += assimetria
+        self._assimetria_maxima = max(self._assimetria_maxima, assimetria)
+
+        # Velocidade e tempos pelo intervalo desde o quadro anterior
+        if self._tempo_anterior is not None:
+            intervalo = tempo - self._tempo_anterior
+            if 0 < intervalo <= LACUNA_MAXIMA:
+                velocidades = (angulos - self._anterior) / intervalo
+                self._velocidade_pico = max(self._velocidade_pico, float(np.abs(velocidades).max()))
+                sentido = self.sinal * float(velocidades.mean())
+                if sentido > VELOCIDADE_PARADO:
+                    self._ida += intervalo
+                elif sentido < -VELOCIDADE_PARADO:
+                    self._volta += intervalo
+                self._entre_linhas += intervalo * (np.asarray(regioes) == ENTRE_LINHAS)
+        self._anterior[:] = angulos
+        self._tempo_anterior = tempo
+
+    def finalizar(self, evento, numero=None):
+        # Fecha a repetição no evento; a próxima começa no quadro seguinte
+        if self._quadros < QUADROS_MINIMOS or evento.tempo <= self._inicio:
+            return None
+        desvios = np.sqrt(self._m2 / (self._quadros - 1)) if self._quadros > 1 else np.zeros(2)
+        amplitudes = self._maximo - self._minimo
+        repeticao = {
+            'numero': numero if numero is not None else len(self.repeticoes) + 1,
+            'resultado': 1 if evento.comando == 'A' else 0,
+            'motivo': evento.motivo,
+            'duracao': evento.tempo - self._inicio,
+            'quadros': self._quadros,
+            'amplitude': amplitudes.tolist(),
+            'minimo': self._minimo.tolist(),
+            'maximo': self._maximo.tolist(),
+            'media': self._media.tolist(),
+            'desvio': desvios.tolist(),
+            'velocidade_pico': self._velocidade_pico,
+            'tempo_ida': self._ida,
+            'tempo_volta': self._volta,
+            'entre_linhas': self._entre_linhas.tolist(),
+            'assimetria_media': self._soma_assimetria / self._quadros,
+            'assimetria_maxima': self._assimetria_maxima,
+            'assimetria_amplitude': abs(float(amplitudes[0] - amplitudes[1])),
+        }
+        self.repeticoes.append(repeticao)
+        self._inicio = evento.tempo
+        self._zerar()
+        return repeticao
+
+    def resumo(self):
+        if not self.repeticoes:
+            return "cinemática: nenhuma repetição"
+        amplitudes = np.mean([r['amplitude'] for r in self.repeticoes], axis=0)
+        assimetria = np.mean([r['assimetria_amplitude'] for r in self.repeticoes])
+        return (f"cinemática: {len(self.repeticoes)} repetições, amplitude média E {amplitudes[0]:.0f}° / "
+                f"D {amplitudes[1]:.0f}°, diferença média entre os lados {assimetria:.0f}°")
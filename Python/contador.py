@@ -0,0 +1,275 @@
+import logging
+from collections import namedtuple
+
+import numpy as np
+
+from filtros import FILTRO_PADRAO, criar_filtro, filtrar_lote
+from regras import REGRA_PADRAO, ACIMA_VERDE, ENTRE_LINHAS, ABAIXO_VERMELHA, NOMES_REGIOES, criar_regra
+
+REGIOES_MONITORADAS = ('acima_verde', 'abaixo_vermelha')
+
+# Transições de estado em INFO; o detalhe de cada quadro em DEBUG
+logger = logging.getLogger('contador')
+
+# Evento gerado pela contagem: comando 'A' (acerto) ou 'B' (erro), instante e motivo
+Evento = namedtuple('Evento', ['comando', 'tempo', 'motivo'])
+
+
+class ContadorRepeticoes:
+    """Máquina de estados da contagem de repetições (alvo em relação à linha de referência).
+
+    Quais landmarks são o alvo e a referência, o sentido do movimento e a tolerância de
+    sincronização vêm da regra do exercício (`regras.criar_regra`; por padrão cotovelos e
+    ombros). Os 33 landmarks passam antes pelo filtro temporal do exercício
+    (`filtros.criar_filtro`), então tanto a referência quanto os alvos são suavizados.
+
+    `processar` recebe os landmarks de um quadro e o instante em segundos e retorna a
+    lista de eventos gerados. Para sessões inteiras já extraídas, `pontuar_lote` faz a
+    mesma contagem de forma vetorizada.
+    """
+
+    def __init__(self, offset_verde, offset_vermelho, filtro=FILTRO_PADRAO, regra=REGRA_PADRAO):
+        self.offset_verde = offset_verde
+        self.offset_vermelho = offset_vermelho
+        self.offsets = np.array([offset_verde, offset_vermelho], dtype=np.float64)
+
+        # Regra compilada: índices dos landmarks e limites das linhas, avaliados de uma vez por quadro
+        self.regra = criar_regra(regra)
+        self.tolerancia_tempo = self.regra.tolerancia
+
+        # Filtro temporal aplicado a todos os landmarks
+        self.filtro = criar_filtro(filtro)
+        self.landmarks_suavizados = self.filtro.saida
+
+        # Limites atuais (coordenadas normalizadas), usados também para desenhar as linhas
+        self.limite_verde = None
+        self.limite_vermelho = None
+
+        # Landmarks suavizados e códigos de região dos alvos do último quadro (para a cinemática)
+        self.suavizados = None
+        self.regioes = None
+
+        # Variáveis para sincronização com tolerância temporal
+        self.tempo_regiao_esquerdo = {'acima_verde': None, 'abaixo_vermelha': None}
+        self.tempo_regiao_direito = {'acima_verde': None, 'abaixo_vermelha': None}
+
+        self.reiniciar_serie()
+
+    def reiniciar_serie(self):
+        self.estado = 'esperando_levantar'
+        self.erro_ocorrido = False  # Variável para evitar múltiplos incrementos de erro
+        self.acerto_recentemente_contabilizado = False  # Flag para evitar erro imediatamente após acerto
+
+    def braços_sincronizados(self, regiao):
+        tempo_esquerdo = self.tempo_regiao_esquerdo.get(regiao)
+        tempo_direito = self.tempo_regiao_direito.get(regiao)
+        if tempo_esquerdo is not None and tempo_direito is not None:
+            return abs(tempo_esquerdo - tempo_direito) <= self.tolerancia_tempo
+        else:
+            return False
+
+    def processar(self, landmarks, tempo_atual):
+        eventos = []
+
+        # Suavizar os landmarks e avaliar a regra: linhas e região de cada alvo em um passo
+        suavizados = self.filtro.atualizar(landmarks, tempo_atual)
+        alturas = suavizados[self.regra.indices, 1]
+        limites = self.regra.limites(alturas, self.offsets)
+        codigo_esquerdo, codigo_direito = self.regra.regioes(alturas, limites)
+        self.limite_verde, self.limite_vermelho = limites
+        self.suavizados = suavizados
+        self.regioes = (codigo_esquerdo, codigo_direito)
+
+        regiao_esquerdo = NOMES_REGIOES[codigo_esquerdo]
+        regiao_direito = NOMES_REGIOES[codigo_direito]
+
+        # Atualizar tempo de entrada nas regiões para cada braço
+        if regiao_esquerdo in REGIOES_MONITORADAS:
+            self.tempo_regiao_esquerdo[regiao_esquerdo] = tempo_atual
+        else:
+            self.tempo_regiao_esquerdo = {'acima_verde': None, 'abaixo_vermelha': None}
+        if regiao_direito in REGIOES_MONITORADAS:
+            self.tempo_regiao_direito[regiao_direito] = tempo_atual
+        else:
+            self.tempo_regiao_direito = {'acima_verde': None, 'abaixo_vermelha': None}
+
+        if regiao_esquerdo == regiao_direito and regiao_esquerdo in REGIOES_MONITORADAS:
+            sincronizados = self.braços_sincronizados(regiao_esquerdo)
+        else:
+            sincronizados = False
+
+        # Logs de depuração por quadro (formatados só com o nível DEBUG ativo)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Estado: %s, Regiões - Esquerdo: %s, Direito: %s, Tempos: %s / %s, Sincronizados: %s",
+                         self.estado, regiao_esquerdo, regiao_direito,
+                         self.tempo_regiao_esquerdo.get(regiao_esquerdo),
+                         self.tempo_regiao_direito.get(regiao_direito), sincronizados)
+
+        # Lógica de transição de estado
+        if regiao_esquerdo == regiao_direito:
+            if regiao_esquerdo == 'abaixo_vermelha':
+                if self.estado in ['esperando_levantar', 'esperando_baixar', 'erro']:
+                    self.estado = 'braços_abaixados'
+                    self.erro_ocorrido = False  # Resetar o erro
+                    self.acerto_recentemente_contabilizado = False  # Resetar a flag de acerto
+                    logger.info("Braços abaixados - Pronto para levantar")
+            elif regiao_esquerdo == 'acima_verde':
+                if self.estado == 'braços_abaixados' and sincronizados:
+                    eventos.append(Evento('A', tempo_atual, 'acerto'))
+                    self.estado = 'esperando_baixar'
+                    self.erro_ocorrido = False
+                    self.acerto_recentemente_contabilizado = True  # Indica que um acerto foi contabilizado
+                    logger.info("Repetição correta contabilizada")
+                elif self.estado == 'esperando_baixar' and not self.erro_ocorrido:
+                    eventos.append(Evento('B', tempo_atual, 'levantou_sem_abaixar'))
+                    self.erro_ocorrido = True
+                    self.estado = 'esperando_baixar'
+                    logger.info("Levantou sem abaixar - Erro contabilizado")
+        else:
+            # Verificar se os braços entraram na mesma região dentro da tolerância de tempo
+            if regiao_esquerdo in REGIOES_MONITORADAS and regiao_direito in REGIOES_MONITORADAS:
+                sincronizados = self.braços_sincronizados(regiao_esquerdo)
+            else:
+                sincronizados = False
+
+            if not sincronizados and self.estado == 'esperando_baixar' and not self.erro_ocorrido:
+                eventos.append(Evento('B', tempo_atual, 'desincronizados'))
+                self.erro_ocorrido = True
+                self.estado = 'esperando_baixar'
+                logger.info("Braços desincronizados - Erro contabilizado")
+
+        return eventos
+
+
+def _extrair_alturas(landmarks, tempos, regra):
+    # Coordenadas y dos landmarks da regra (quadros, k) dos quadros com pose detectada
+    alturas = np.asarray(landmarks)[:, regra.indices, 1].astype(np.float64)
+    validos = ~np.isnan(alturas).any(axis=1)
+    return alturas[validos], np.asarray(tempos, dtype=np.float64)[validos]
+
+
+def _tempo_na_regiao(regioes, tempos, regiao):
+    # Último instante em que cada braço esteve na região sem passar por 'entre_linhas' depois
+    indices = np.arange(len(regioes))[:, None]
+    ultimo = np.maximum.accumulate(np.where(regioes == regiao, indices, -1), axis=0)
+    ultimo_entre = np.maximum.accumulate(np.where(regioes == ENTRE_LINHAS, indices, -1), axis=0)
+    return np.where(ultimo > ultimo_entre, tempos[np.maximum(ultimo, 0)], np.nan)
+
+
+def _sincronizados(tempo_regiao, tolerancia_tempo):
+    with np.errstate(invalid='ignore'):
+        return np.abs(tempo_regiao[:, 0] - tempo_regiao[:, 1]) <= tolerancia_tempo
+
+
+def pontuar_lote(landmarks, tempos, offset_verde, offset_vermelho, filtro=FILTRO_PADRAO, regra=REGRA_PADRAO,
+                 reinicios=(), repeticoes=None):
+    """Contagem vetorizada de uma sessão inteira.
+
+    `landmarks` é um array (quadros, 33, 4) e `tempos` os instantes em segundos; quadros sem
+    pose (NaN) são ignorados, como no modo ao vivo. Regiões, filtro e sincronização são
+    calculadas de uma vez; só os quadros em que o estado pode mudar passam pela máquina de
+    estados. O resultado equivale a chamar `ContadorRepeticoes.processar` quadro a quadro.
+
+    Para uma sessão com várias séries, `reinicios` são os instantes em que cada série nova
+    começou (ou a contagem foi zerada): neles a máquina de estados é reiniciada, como em
+    `reiniciar_serie`. Com `repeticoes`, a série para de contar ao atingir esse número de
+    acertos (o descanso) até o próximo reinício.
+    """
+    regra = criar_regra(regra)
+    alturas, tempos = _extrair_alturas(landmarks, tempos, regra)
+    return _pontuar_alturas(filtrar_lote(filtro, alturas, tempos), tempos, offset_verde, offset_vermelho, regra,
+                            reinicios, repeticoes)
+
+
+def _pontuar_alturas(alturas, tempos, offset_verde, offset_vermelho, regra, reinicios=(), repeticoes=None):
+    # `alturas` já filtradas, nas colunas de `regra.indices`
+    limites = regra.limites(alturas, np.array([offset_verde, offset_vermelho], dtype=np.float64))
+    tolerancia_tempo = regra.tolerancia
+
+    # Região de cada alvo: coluna 0 esquerdo, coluna 1 direito
+    regioes = regra.regioes(alturas, limites)
+    esquerdo, direito = regioes[:, 0], regioes[:, 1]
+
+    sinc_acima = _sincronizados(_tempo_na_regiao(regioes, tempos, ACIMA_VERDE), tolerancia_tempo)
+    sinc_abaixo = _sincronizados(_tempo_na_regiao(regioes, tempos, ABAIXO_VERMELHA), tolerancia_tempo)
+    monitorados = (esquerdo != ENTRE_LINHAS) & (direito != ENTRE_LINHAS)
+    sinc_esquerdo = np.where(esquerdo == ACIMA_VERDE, sinc_acima, sinc_abaixo)
+
+    # Tipo de cada quadro: 0 nada a fazer, 1 ambos abaixo, 2 ambos acima, 3 desincronizados
+    iguais = esquerdo == direito
+    tipo = np.zeros(len(regioes), dtype=np.int8)
+    tipo[iguais & (esquerdo == ABAIXO_VERMELHA)] = 1
+    tipo[iguais & (esquerdo == ACIMA_VERDE)] = 2
+    tipo[~iguais & ~(monitorados & sinc_esquerdo)] = 3
+
+    # Dentro de uma sequência do mesmo tipo o estado se estabiliza após o primeiro quadro
+    # (após o segundo, para 'ambos acima'), então só esses quadros precisam ser visitados
+    anterior = np.concatenate(([0], tipo[:-1]))
+    anterior2 = np.concatenate(([0, 0], tipo[:-2]))[:len(tipo)]
+    visitar = (tipo != 0) & ((tipo != anterior) | ((tipo == 2) & (anterior2 != 2)))
+
+    # Série de cada quadro; o primeiro quadro de cada série é visitado para reiniciar o estado
+    series = np.searchsorted(np.asarray(reinicios, dtype=np.float64), tempos, side='right')
+    visitar[1:] |= series[1:] != series[:-1]
+
+    estado = 'esperando_levantar'
+    erro_ocorrido = False
+    eventos = []
+    serie_atual = 0
+    acertos_serie = 0
+    for i in np.flatnonzero(visitar):
+        if series[i] != serie_atual:
+            serie_atual = series[i]
+            acertos_serie = 0
+            estado = 'esperando_levantar'
+            erro_ocorrido = False
+        if repeticoes is not None and acertos_serie >= repeticoes:
+            continue  # Descanso: nada é contado até a próxima série
+        t = tipo[i]
+        if t == 1:
+            if estado in ('esperando_levantar', 'esperando_baixar', 'erro'):
+                estado = 'braços_abaixados'
+                erro_ocorrido = False
+        elif t == 2:
+            if estado == 'braços_abaixados':
+                eventos.append(Evento('A', float(tempos[i]), 'acerto'))
+                estado = 'esperando_baixar'
+                erro_ocorrido = False
+                acertos_serie += 1
+            elif estado == 'esperando_baixar' and not erro_ocorrido:
+                eventos.append(Evento('B', float(tempos[i]), 'levantou_sem_abaixar'))
+                erro_ocorrido = True
+        elif t == 3 and estado == 'esperando_baixar' and not erro_ocorrido:
+            eventos.append(Evento('B', float(tempos[i]), 'desincronizados'))
+            erro_ocorrido = True
+
+    return {
+        'eventos': eventos,
+        'acertos': sum(1 for e in eventos if e.comando == 'A'),
+        'erros': sum(1 for e in eventos if e.comando == 'B'),
+        'repetition_results': [1 if e.comando == 'A' else 0 for e in eventos],
+        'tempos': tempos,
+        'regioes': regioes,
+        'limite_verde': limites[:, 0],
+        'limite_vermelho': limites[:, 1],
+    }
+
+
+def varrer_offsets(landmarks, tempos, offsets_verde, offsets_vermelho, filtro=FILTRO_PADRAO, regra=REGRA_PADRAO,
+                   reinicios=(), repeticoes=None, contar_desde=None):
+    # Repontua a sessão para cada combinação de offsets; filtro e regra são preparados uma só vez.
+    # `reinicios` e `repeticoes` como em pontuar_lote; com `contar_desde`, só os eventos a partir
+    # desse instante entram nos totais (a contagem foi zerada ali)
+    regra = criar_regra(regra)
+    alturas, tempos = _extrair_alturas(landmarks, tempos, regra)
+    alturas = filtrar_lote(filtro, alturas, tempos)
+
+    resultados = []
+    for verde in offsets_verde:
+        for vermelho in offsets_vermelho:
+            r = _pontuar_alturas(alturas, tempos, verde, vermelho, regra, reinicios, repeticoes)
+            eventos = [e for e in r['eventos'] if contar_desde is None or e.tempo >= contar_desde]
+            resultados.append({'offset_verde': float(verde), 'offset_vermelho': float(vermelho),
+                               'acertos': sum(e.comando == 'A' for e in eventos),
+                               'erros': sum(e.comando == 'B' for e in eventos)})
+    return resultados
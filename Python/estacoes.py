@@ -0,0 +1,334 @@
+"""Modo multiestação: várias câmeras em um mesmo computador, uma por processo.
+
+Cada estação roda `run_exercise` em seu próprio processo (com seu próprio modelo de pose,
+aproveitando os vários núcleos) e repete as sessões até o supervisor ser encerrado. Portas
+seriais compartilhadas por várias estações, relatórios e histórico ficam no processo
+supervisor, que recebe comandos, sessões e resumos das estações por uma única fila.
+"""
+import logging
+import multiprocessing
+import os
+import queue
+import time
+
+import numpy as np
+
+from captura import criar_captura, mesclar
+from estimadores import ESTIMADOR_PADRAO, ORCAMENTO_PADRAO, PRECISAO_ONNX_PADRAO
+from painel import EmissorPainel
+from relatorio import gerar_relatorio_pdf
+from runtime import RuntimeExercicio
+from serial_arduino import EscritorSerial
+
+# Formato do log nas estações: o nome do processo é o nome da estação
+FORMATO_LOG = '%(asctime)s %(processName)s %(name)s: %(message)s'
+
+
+def carregar_estacoes(filename='estacoes.txt'):
+    # Nome;Camera;Exercicio;Porta_Serial[;Canal][;chave=valor...] (ver estacoes.txt)
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    file_path = os.path.join(script_dir, filename)
+    estacoes = []
+    with open(file_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith('#'):
+                parts = [p.strip() for p in line.split(';')]
+                if len(parts) >= 4:
+                    nome, camera, exercicio, porta = parts[:4]
+                    # Campos opcionais: o canal e a configuração da câmera em chave=valor (ver captura.py)
+                    canal = None
+                    captura = {}
+                    for campo in parts[4:]:
+                        if '=' in campo:
+                            chave, valor = (c.strip() for c in campo.split('=', 1))
+                            captura[chave] = valor
+                        elif campo:
+                            canal = int(campo)
+                    try:
+                        captura = criar_captura(captura)
+                    except ValueError as e:
+                        print(f"Estação '{nome}': {e}. Usando a configuração de câmera do exercício.")
+                        captura = {}
+                    estacoes.append({
+                        'nome': nome,
+                        'camera': int(camera) if camera.isdigit() else camera,
+                        'exercicio': exercicio,
+                        'porta': porta,
+                        'canal': canal,
+                        'captura': captura,
+                    })
+    return estacoes
+
+
+class SerialCompartilhada:
+    # Canal de uma porta aberta pelo supervisor; mesma interface usada por run_exercise do EscritorSerial
+    protocolo = 'canal'
+
+    def __init__(self, fila, estacao, porta, canal):
+        self._fila = fila
+        self._estacao = estacao
+        self.porta = porta
+        self.canal = canal
+        self.metricas = None
+        self.comandos = 0
+
+    def enviar(self, comando, origem=None):
+        self._fila.put(('serial', self._estacao, self.porta, self.canal, comando))
+        self.comandos += 1
+
+    def definir_serie(self, serie):
+        self._fila.put(('serie', self._estacao, self.porta, self.canal, serie))
+
+    def fechar(self):
+        pass
+
+    def resumo(self):
+        return f"serial (canal {self.canal} de {self.porta}, via supervisor): {self.comandos} comandos"
+
+
+class PainelRemoto:
+    # Destino do EmissorPainel de uma estação: quadros JPEG e eventos vão ao painel do supervisor pela fila
+    def __init__(self, fila, estacao, espectadores):
+        self._fila = fila
+        self._estacao = estacao
+        self._espectadores = espectadores  # Evento ligado pelo supervisor enquanto alguém assiste esta estação
+
+    def publicar_quadro(self, jpeg, tempo):
+        self._fila.put(('quadro', self._estacao, jpeg, tempo))
+
+    def publicar_evento(self, tipo, dados):
+        self._fila.put(('painel', self._estacao, tipo, dados))
+
+    def tem_espectadores(self):
+        return self._espectadores.is_set()
+
+
+class RelatoriosRemotos:
+    # Mesma interface de relatorio.GeradorRelatorios; o PDF é gerado pelo supervisor
+    def __init__(self, fila, estacao):
+        self._fila = fila
+        self._estacao = estacao
+
+    def enviar(self, *args, **kwargs):
+        self._fila.put(('relatorio', self._estacao, args, kwargs))
+
+
+class HistoricoRemoto:
+    # Mesma interface de historico.Historico usada por run_exercise
+    def __init__(self, fila, estacao):
+        self._fila = fila
+        self._estacao = estacao
+
+    def nova_sessao(self, exercicio, parametros):
+        return GravadorRemoto(self._fila, self._estacao, exercicio, {**parametros, 'estacao': self._estacao})
+
+
+class GravadorRemoto:
+    # Acumula a sessão em arrays que dobram de tamanho quando cheios e a envia inteira em finalizar()
+    def __init__(self, fila, estacao, exercicio, parametros, capacidade=4096):
+        self._fila = fila
+        self._estacao = estacao
+        self.exercicio = exercicio
+        self.parametros = parametros
+        self.inicio = time.time()
+        self.quadros = 0
+        self._tempos = np.empty(capacidade)
+        self._landmarks = np.empty((capacidade, 33, 4), dtype=np.float32)
+        self._eventos = []
+
+    def gravar_quadro(self, tempo, landmarks):
+        if self.quadros == len(self._tempos):
+            self._tempos = np.concatenate((self._tempos, np.empty_like(self._tempos)))
+            self._landmarks = np.concatenate((self._landmarks, np.empty_like(self._landmarks)))
+        self._tempos[self.quadros] = tempo
+        self._landmarks[self.quadros] = np.nan if landmarks is None else landmarks
+        self.quadros += 1
+
+    def gravar_evento(self, tempo, comando, **dados):
+        self._eventos.append({'tempo': tempo, 'comando': comando, **dados})
+
+    def finalizar(self, acertos, erros):
+        self._fila.put(('sessao', self._estacao, {
+            'exercicio': self.exercicio, 'parametros': self.parametros, 'inicio': self.inicio,
+            'tempos': self._tempos[:self.quadros], 'landmarks': self._landmarks[:self.quadros],
+            'eventos': self._eventos, 'acertos': acertos, 'erros': erros,
+        }))
+        return None
+
+
+def executar_estacao(estacao, params, fila, parar, opcoes, espectadores=None):
+    # Ponto de entrada do processo de cada estação
+    logging.basicConfig(level=opcoes['nivel_log'], format=FORMATO_LOG)
+    from ElevLateralComSup import run_exercise  # O script principal importa este módulo
+
+    nome = estacao['nome']
+    # Configuração da câmera: a global (--captura), sobreposta pela do exercício e pela da estação
+    captura = mesclar(opcoes['captura'], params.get('captura'), estacao['captura'])
+    # Com canal, a porta é do supervisor e a estação escreve nela pela fila
+    serial = None
+    protocolo = opcoes['protocolo']
+    if estacao['canal'] is not None:
+        serial = SerialCompartilhada(fila, nome, estacao['porta'], estacao['canal'])
+        protocolo = SerialCompartilhada.protocolo
+    runtime = RuntimeExercicio(estacao['camera'], estimador=opcoes['estimador'], orcamento_ms=opcoes['orcamento_pose'],
+                               modelo_onnx=opcoes['modelo_onnx'], captura=captura,
+                               precisao_onnx=opcoes['precisao_onnx'], serial=serial).preaquecer()
+
+    painel = None
+    if espectadores is not None:
+        painel = EmissorPainel(PainelRemoto(fila, nome, espectadores), fps_maximo=opcoes['fps_painel'])
+
+    def avisar_erro(mensagem):
+        # Sem diálogo no processo da estação (bloquearia sem ninguém para fechá-lo): o supervisor mostra o aviso
+        fila.put(('aviso', nome, mensagem))
+
+    desempenho = []
+    try:
+        while not parar.is_set():
+            desempenho = run_exercise(params['repeticoes'], params['series'], params['descanso'],
+                                      params['offset_verde'], params['offset_vermelho'], estacao['porta'],
+                                      estacao['exercicio'], modo_pipeline=opcoes['pipeline'],
+                                      protocolo_serial=protocolo, filtro=params['filtro'],
+                                      gerador_relatorios=RelatoriosRemotos(fila, nome), runtime=runtime,
+                                      historico=HistoricoRemoto(fila, nome) if opcoes['historico'] else None,
+                                      regra=params['regra'], nome_janela=f"Exercicio - {nome}",
+                                      agendar_inferencia=opcoes['agendador'], roi_ativo=opcoes['roi'],
+                                      lado_inferencia=opcoes['lado_inferencia'], fps_exibicao=opcoes['fps_exibicao'],
+                                      captura=captura, painel=painel, avisar_erro=avisar_erro)
+            # Um arquivo de vídeo termina; uma câmera atende a próxima sessão
+            if isinstance(estacao['camera'], str):
+                break
+    except KeyboardInterrupt:
+        pass
+    finally:
+        runtime.encerrar()
+        if painel:
+            painel.fechar()
+        fila.put(('fim', nome, desempenho))
+
+
+class Supervisor:
+    """Inicia um processo por estação e atende as mensagens delas.
+
+    Portas indicadas com canal em estacoes.txt são abertas uma única vez aqui, no protocolo
+    'canal'; as demais são abertas pela própria estação. Relatórios vão para o gerador em
+    segundo plano e sessões para o histórico compartilhado. Com `painel` (um painel.PainelWeb já
+    iniciado), cada estação envia ao supervisor os eventos da contagem e, só enquanto alguém
+    assiste a ela, os quadros já codificados em JPEG.
+    """
+
+    def __init__(self, estacoes, exercicios, protocolo='legado', modo_pipeline=False, nivel_log='INFO',
+                 agendar_inferencia=True, roi_ativo=False, lado_inferencia=None, fps_exibicao=30,
+                 estimador=ESTIMADOR_PADRAO, orcamento_pose=ORCAMENTO_PADRAO, modelo_onnx=None, captura=None,
+                 historico=None, gerador_relatorios=None, painel=None, fps_painel=15,
+                 precisao_onnx=PRECISAO_ONNX_PADRAO):
+        self.estacoes = estacoes
+        self.exercicios = exercicios
+        self.historico = historico
+        self.gerador_relatorios = gerador_relatorios
+        self.painel = painel
+        self.espectadores = {}
+        self.opcoes = {'protocolo': protocolo, 'pipeline': modo_pipeline, 'nivel_log': nivel_log,
+                       'agendador': agendar_inferencia, 'roi': roi_ativo, 'lado_inferencia': lado_inferencia,
+                       'fps_exibicao': fps_exibicao, 'estimador': estimador, 'orcamento_pose': orcamento_pose,
+                       'modelo_onnx': modelo_onnx, 'precisao_onnx': precisao_onnx, 'captura': captura or {},
+                       'historico': historico is not None, 'fps_painel': fps_painel}
+        self.escritores = {}
+        self.resumos = {}
+
+    def _mudar_espectadores(self, estacao, quantidade):
+        evento = self.espectadores.get(estacao)
+        if evento is None:
+            return
+        if quantidade:
+            evento.set()
+        else:
+            evento.clear()
+
+    def _tratar(self, mensagem):
+        tipo, estacao, *dados = mensagem
+        if tipo == 'serial':
+            porta, canal, comando = dados
+            self.escritores[porta].enviar(comando, canal=canal)
+        elif tipo == 'serie':
+            porta, canal, serie = dados
+            self.escritores[porta].definir_serie(serie, canal=canal)
+        elif tipo == 'relatorio':
+            args, kwargs = dados
+            if self.gerador_relatorios:
+                self.gerador_relatorios.enviar(*args, **kwargs)
+            else:
+                gerar_relatorio_pdf(*args, **kwargs)
+        elif tipo == 'sessao':
+            sessao_id = self.historico.importar_sessao(**dados[0])
+            print(f"[{estacao}] Sessão gravada no histórico: {sessao_id} ({len(dados[0]['tempos'])} quadros)")
+        elif tipo == 'aviso':
+            print(f"[{estacao}] {' '.join(dados[0].split())}")
+        elif tipo == 'quadro':
+            self.painel.publicar_quadro(estacao, *dados)
+        elif tipo == 'painel':
+            self.painel.publicar_evento(estacao, *dados)
+        elif tipo == 'fim':
+            self.resumos[estacao] = dados[0]
+
+    def executar(self):
+        contexto = multiprocessing.get_context('spawn')
+        fila = contexto.Queue()
+        parar = contexto.Event()
+
+        for porta in sorted({e['porta'] for e in self.estacoes if e['canal'] is not None}):
+            escritor = EscritorSerial(porta, 9600, protocolo='canal')
+            erro = escritor.iniciar()
+            if erro is not None:
+                print(f"Erro ao abrir a porta serial compartilhada {porta}: {erro}. Novas tentativas em segundo plano.")
+            self.escritores[porta] = escritor
+
+        # Um evento por estação, ligado enquanto o painel tem alguém assistindo a ela
+        self.espectadores = {e['nome']: contexto.Event() for e in self.estacoes} if self.painel else {}
+        if self.painel:
+            self.painel.ao_mudar_espectadores = self._mudar_espectadores
+
+        processos = [contexto.Process(target=executar_estacao, name=e['nome'],
+                                      args=(e, self.exercicios[e['exercicio']], fila, parar, self.opcoes,
+                                            self.espectadores.get(e['nome'])))
+                     for e in self.estacoes]
+        for processo in processos:
+            processo.start()
+        print(f"{len(processos)} estações iniciadas em {os.cpu_count()} núcleos. Ctrl+C encerra todas.")
+
+        try:
+            self._atender(fila, processos)
+        except KeyboardInterrupt:
+            print("Encerrando as estações...")
+        finally:
+            parar.set()
+            # Continua esvaziando a fila: um processo só termina depois de entregar o que enviou
+            self._atender(fila, processos, timeout=10.0)
+            for processo in processos:
+                if processo.is_alive():
+                    processo.terminate()
+            for escritor in self.escritores.values():
+                print(escritor.resumo())
+                escritor.fechar()
+        self._imprimir_resumo()
+
+    def _atender(self, fila, processos, timeout=None):
+        limite = None if timeout is None else time.perf_counter() + timeout
+        while limite is None or time.perf_counter() < limite:
+            try:
+                self._tratar(fila.get(timeout=0.5))
+            except queue.Empty:
+                if not any(p.is_alive() for p in processos):
+                    return
+            except KeyboardInterrupt:
+                if limite is None:
+                    raise
+
+    def _imprimir_resumo(self):
+        # Taxa de quadros e tempos por etapa de cada estação, para dimensionar quantas cabem na máquina
+        print(f"Resumo das estações ({os.cpu_count()} núcleos):")
+        for estacao in self.estacoes:
+            print(f"  {estacao['nome']} ({estacao['camera']}, {estacao['exercicio']}):")
+            for linha in self.resumos.get(estacao['nome']) or ['sem sessão concluída']:
+                print(f"    {linha}")
@@ -0,0 +1,215 @@
+"""Estimadores de pose intercambiáveis e escolha automática pela latência medida na máquina.
+
+Todo estimador tem `processar(rgb)`, que recebe a imagem RGB (uint8) e retorna os 33
+landmarks como um array (33, 4) float32 de x, y, z e visibilidade normalizados pela
+imagem, ou None sem pessoa; `reiniciar()`, que descarta o rastreamento (novo vídeo); e
+`fechar()`. `precisao` ordena os estimadores do menos ao mais preciso.
+"""
+import logging
+import os
+import time
+
+import cv2
+import numpy as np
+
+# Complexidade do modelo do MediaPipe Pose (model_complexity) de cada estimador
+COMPLEXIDADES_MEDIAPIPE = {'mediapipe_lite': 0, 'mediapipe_full': 1, 'mediapipe_heavy': 2}
+ESTIMADORES = tuple(COMPLEXIDADES_MEDIAPIPE) + ('onnx',)
+
+# Precisão declarada do modelo ONNX, na mesma escala da complexidade do MediaPipe. Sem ela o modelo
+# não passa à frente de nenhum MediaPipe que também caiba no orçamento
+PRECISOES_ONNX = {'lite': 0, 'full': 1, 'heavy': 2}
+PRECISAO_ONNX_PADRAO = 'lite'
+
+# Na calibração, estimadores que acham a pose em menos que esta fração dos quadros do melhor são descartados
+FRACAO_DETECCOES = 0.8
+
+# O estimador original: MediaPipe Pose com a complexidade padrão
+ESTIMADOR_PADRAO = 'mediapipe_full'
+
+# Escolha pela calibração; aceito onde um nome de estimador é esperado
+AUTOMATICO = 'auto'
+
+# Orçamento padrão da inferência por quadro (ms), para manter uma câmera de 30 fps
+ORCAMENTO_PADRAO = 30.0
+
+logger = logging.getLogger('estimadores')
+
+
+def landmarks_para_array(pose_landmarks):
+    # Converte o protobuf do MediaPipe em um array (33, 4): x, y, z, visibilidade
+    return np.array([(l.x, l.y, l.z, l.visibility) for l in pose_landmarks.landmark], dtype=np.float32)
+
+
+class EstimadorMediaPipe:
+    # MediaPipe Pose no modo de vídeo (rastreamento entre quadros) com a complexidade indicada
+    def __init__(self, nome=ESTIMADOR_PADRAO):
+        import mediapipe as mp
+        self.nome = nome
+        self.precisao = COMPLEXIDADES_MEDIAPIPE[nome]
+        try:
+            solucao = mp.solutions.pose
+        except AttributeError:
+            # Versões recentes do mediapipe removeram as "solutions" legadas
+            raise ImportError(f"o mediapipe {getattr(mp, '__version__', '')} instalado não tem mp.solutions.pose; "
+                              "instale uma versão que ainda inclua a API solutions") from None
+        # O modelo heavy é baixado pelo MediaPipe no primeiro uso
+        self._pose = solucao.Pose(model_complexity=self.precisao, min_detection_confidence=0.3,
+                                  min_tracking_confidence=0.3)
+
+    def processar(self, rgb):
+        results = self._pose.process(rgb)
+        return landmarks_para_array(results.pose_landmarks) if results.pose_landmarks else None
+
+    def reiniciar(self):
+        self._pose.reset()
+
+    def fechar(self):
+        self._pose.close()
+
+
+class EstimadorONNX:
+    """Modelo de landmarks do BlazePose exportado para ONNX, só na CPU (onnxruntime).
+
+    A entrada é a imagem quadrada (256 px nos modelos do MediaPipe) em RGB float [0, 1],
+    NHWC ou NCHW; as saídas usadas são os 39 pontos × (x, y, z, visibilidade, presença) em
+    pixels da entrada e a probabilidade de haver uma pessoa. O modelo não tem detector:
+    a imagem inteira é reduzida com bordas para o quadrado, então ele funciona melhor com
+    `--roi`, que entrega um recorte em torno da pessoa. A `precisao` (lite, full ou heavy,
+    como as do MediaPipe) é declarada por quem escolhe o modelo (`--precisao-onnx`).
+    """
+
+    def __init__(self, caminho, precisao=PRECISAO_ONNX_PADRAO, limiar_presenca=0.5, threads=None):
+        import onnxruntime as ort
+        if not caminho or not os.path.exists(caminho):
+            raise FileNotFoundError(f"modelo ONNX não encontrado: {caminho}")
+        self.nome = 'onnx'
+        self.precisao = PRECISOES_ONNX[precisao]
+        self.limiar_presenca = limiar_presenca
+
+        opcoes = ort.SessionOptions()
+        if threads:
+            opcoes.intra_op_num_threads = threads
+        self._sessao = ort.InferenceSession(caminho, opcoes, providers=['CPUExecutionProvider'])
+        entrada = self._sessao.get_inputs()[0]
+        self._nome_entrada = entrada.name
+        self._nchw = entrada.shape[1] == 3
+        self.lado = int(entrada.shape[2])
+        self._entrada = np.zeros((1, 3, self.lado, self.lado) if self._nchw else (1, self.lado, self.lado, 3),
+                                 dtype=np.float32)
+        self._quadrado = np.zeros((self.lado, self.lado, 3), dtype=np.uint8)
+        self._reduzida = None
+
+    def processar(self, rgb):
+        # Reduz mantendo a proporção e centraliza no quadrado, com bordas pretas
+        altura, largura = rgb.shape[:2]
+        escala = self.lado / max(altura, largura)
+        nova_largura, nova_altura = max(1, round(largura * escala)), max(1, round(altura * escala))
+        x0, y0 = (self.lado - nova_largura) // 2, (self.lado - nova_altura) // 2
+        if self._reduzida is None or self._reduzida.shape[:2] != (nova_altura, nova_largura):
+            self._reduzida = np.empty((nova_altura, nova_largura, 3), dtype=np.uint8)
+            self._quadrado[:] = 0
+        cv2.resize(rgb, (nova_largura, nova_altura), dst=self._reduzida, interpolation=cv2.INTER_AREA)
+        self._quadrado[y0:y0 + nova_altura, x0:x0 + nova_largura] = self._reduzida
+        np.multiply(self._quadrado.transpose(2, 0, 1) if self._nchw else self._quadrado, 1 / 255,
+                    out=self._entrada[0])
+
+        pontos = presenca = None
+        for saida in self._sessao.run(None, {self._nome_entrada: self._entrada}):
+            if saida.size == 1:
+                presenca = float(saida.ravel()[0])
+            elif saida.size % 5 == 0 and 33 * 5 <= saida.size <= 40 * 5 and pontos is None:
+                pontos = saida.reshape(-1, 5)[:33]
+        if pontos is None or (presenca is not None and presenca < self.limiar_presenca):
+            return None
+
+        landmarks = np.empty((33, 4), dtype=np.float32)
+        landmarks[:, 0] = (pontos[:, 0] - x0) / nova_largura
+        landmarks[:, 1] = (pontos[:, 1] - y0) / nova_altura
+        landmarks[:, 2] = pontos[:, 2] / nova_largura
+        landmarks[:, 3] = 1 / (1 + np.exp(-pontos[:, 3]))  # A visibilidade sai como logit
+        return landmarks
+
+    def reiniciar(self):
+        pass
+
+    def fechar(self):
+        self._sessao = None
+
+
+def criar_estimador(nome=ESTIMADOR_PADRAO, modelo_onnx=None, precisao_onnx=PRECISAO_ONNX_PADRAO):
+    if nome in COMPLEXIDADES_MEDIAPIPE:
+        return EstimadorMediaPipe(nome)
+    if nome == 'onnx':
+        return EstimadorONNX(modelo_onnx, precisao_onnx)
+    raise ValueError(f"estimador de pose desconhecido: '{nome}' (opções: {', '.join(ESTIMADORES)})")
+
+
+def calibrar(imagens, orcamento_ms=ORCAMENTO_PADRAO, modelo_onnx=None, quadros=30, aquecimento=3,
+             precisao_onnx=PRECISAO_ONNX_PADRAO):
+    """Mede cada estimador disponível nas imagens RGB dadas e escolhe o mais preciso que cabe no orçamento.
+
+    Cada estimador processa `quadros` imagens (repetindo a lista) depois de `aquecimento`
+    inferências descartadas. Quem acha a pose em menos de `FRACAO_DETECCOES` dos quadros em
+    que o melhor acha é descartado (um modelo rápido que não detecta nada não pode ganhar);
+    dos restantes, cabe no orçamento quem tem p95 até `orcamento_ms`. Empate em precisão fica
+    com o mais rápido; se nenhum cabe, o mais rápido de todos. Estimadores que não podem ser
+    criados (ONNX sem modelo ou sem onnxruntime, mediapipe sem a API solutions, modelo heavy
+    sem conexão para o download) são listados com o erro. Retorna (nome escolhido, medições).
+    """
+    nomes = tuple(COMPLEXIDADES_MEDIAPIPE) + (('onnx',) if modelo_onnx else ())
+    medicoes = []
+    for nome in nomes:
+        try:
+            estimador = criar_estimador(nome, modelo_onnx, precisao_onnx)
+        except Exception as e:
+            medicoes.append({'nome': nome, 'erro': str(e)})
+            continue
+        try:
+            tempos = []
+            deteccoes = 0
+            for i in range(aquecimento + quadros):
+                inicio = time.perf_counter()
+                landmarks = estimador.processar(imagens[i % len(imagens)])
+                if i >= aquecimento:
+                    tempos.append(time.perf_counter() - inicio)
+                    deteccoes += landmarks is not None
+        finally:
+            estimador.fechar()
+        p50, p95 = 1000 * np.percentile(tempos, [50, 95])
+        medicoes.append({'nome': nome, 'precisao': estimador.precisao, 'p50_ms': p50, 'p95_ms': p95,
+                         'deteccoes': deteccoes / quadros})
+
+    validas = [m for m in medicoes if 'erro' not in m]
+    if not validas:
+        raise RuntimeError("nenhum estimador de pose pôde ser criado: " +
+                           "; ".join(f"{m['nome']}: {m['erro']}" for m in medicoes))
+    melhor = max(m['deteccoes'] for m in validas)
+    if melhor:
+        for m in validas:
+            if m['deteccoes'] < FRACAO_DETECCOES * melhor:
+                m['descartado'] = True
+        validas = [m for m in validas if 'descartado' not in m]
+    else:
+        logger.warning("calibração sem ninguém na imagem: os tempos medidos não incluem o modelo de landmarks")
+    cabem = [m for m in validas if m['p95_ms'] <= orcamento_ms]
+    if cabem:
+        escolhido = max(cabem, key=lambda m: (m['precisao'], -m['p95_ms']))
+    else:
+        escolhido = min(validas, key=lambda m: m['p95_ms'])
+    return escolhido['nome'], medicoes
+
+
+def resumo_calibracao(escolhido, medicoes, orcamento_ms):
+    linhas = [f"estimador de pose: {escolhido} (escolhido pela calibração, orçamento {orcamento_ms:.0f} ms por quadro)"]
+    if all(m['p95_ms'] > orcamento_ms for m in medicoes if 'erro' not in m and 'descartado' not in m):
+        linhas[0] += "; nenhum coube no orçamento, ficou o mais rápido"
+    for m in medicoes:
+        if 'erro' in m:
+            linhas.append(f"  {m['nome']}: indisponível ({m['erro']})")
+        else:
+            linhas.append(f"  {m['nome']}: p50 {m['p50_ms']:.1f} ms, p95 {m['p95_ms']:.1f} ms, "
+                          f"pose em {100 * m['deteccoes']:.0f}% dos quadros")
+            if 'descartado' in m:
+                linhas[-1] += ", descartado por detectar pouco"
+    return linhas
@@ -0,0 +1,259 @@
+"""Desenho e exibição dos quadros sem alocar memória a cada quadro.
+
+Executado diretamente, compara o caminho de desenho original (conversão de cor para um
+array novo, volta para BGR e textos rasterizados a cada quadro) com o atual, em quadros
+sintéticos, medindo milissegundos e memória alocada por quadro:
+
+    python exibicao.py --quadros 600 --largura 1280 --altura 720
+"""
+import argparse
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+FONTE = cv2.FONT_HERSHEY_SIMPLEX
+ESCALA_FONTE = 1
+ESPESSURA_FONTE = 2
+
+# Conexões do esqueleto do MediaPipe Pose (pares de índices dos 33 landmarks)
+CONEXOES_POSE = np.array([
+    (0, 1), (1, 2), (2, 3), (3, 7), (0, 4), (4, 5), (5, 6), (6, 8), (9, 10), (11, 12), (11, 13), (13, 15),
+    (15, 17), (15, 19), (15, 21), (17, 19), (12, 14), (14, 16), (16, 18), (16, 20), (16, 22), (18, 20),
+    (11, 23), (12, 24), (23, 24), (23, 25), (24, 26), (25, 27), (26, 28), (27, 29), (28, 30), (29, 31),
+    (30, 32), (27, 31), (28, 32),
+])
+
+# Cores e limiar de visibilidade padrão do mp_drawing.draw_landmarks
+COR_CONEXAO = (224, 224, 224)
+COR_LANDMARK = (0, 0, 255)
+COR_BORDA = (255, 255, 255)
+VISIBILIDADE_DESENHO = 0.5
+
+
+class ConversorCor:
+    # Conversão de cor em buffers pré-alocados, um por formato de entrada (o recorte do ROI e a
+    # verificação de presença mudam o tamanho); só aloca quando aparece um formato novo
+    def __init__(self, codigo=cv2.COLOR_BGR2RGB, maximo_formatos=4):
+        self.codigo = codigo
+        self.maximo_formatos = maximo_formatos
+        self.alocacoes = 0
+        self._buffers = {}
+
+    def converter(self, imagem):
+        buffer = self._buffers.get(imagem.shape)
+        if buffer is None:
+            if len(self._buffers) >= self.maximo_formatos:
+                self._buffers.clear()
+            buffer = self._buffers[imagem.shape] = np.empty(imagem.shape, dtype=np.uint8)
+            self.alocacoes += 1
+        buffer.flags.writeable = True
+        cv2.cvtColor(imagem, self.codigo, dst=buffer)
+        # O buffer é passado por referência ao modelo de pose
+        buffer.flags.writeable = False
+        return buffer
+
+
+def redimensionar(imagem, fator, buffer):
+    # cv2.resize para um buffer reaproveitado; retorna o buffer (novo se o tamanho mudou)
+    tamanho = (max(1, round(imagem.shape[1] * fator)), max(1, round(imagem.shape[0] * fator)))
+    if buffer is None or buffer.shape[1::-1] != tamanho:
+        buffer = np.empty((tamanho[1], tamanho[0]) + imagem.shape[2:], dtype=imagem.dtype)
+    cv2.resize(imagem, tamanho, dst=buffer, interpolation=cv2.INTER_AREA)
+    return buffer
+
+
+class CamadaTexto:
+    """Textos da tela rasterizados uma vez e copiados para cada quadro.
+
+    Cada linha é identificada pela posição; o texto só é rasterizado de novo (com
+    cv2.putText, em uma máscara do tamanho dele) quando muda, por exemplo quando um contador
+    avança. Nos demais quadros a cor é copiada sob a máscara com cv2.copyTo, direto no
+    quadro, sem alocar.
+    """
+
+    def __init__(self):
+        self.rasterizacoes = 0
+        self._linhas = {}
+
+    def desenhar(self, imagem, texto, posicao, cor):
+        linha = self._linhas.get(posicao)
+        if linha is None or linha[0] != (texto, cor):
+            linha = self._linhas[posicao] = ((texto, cor),) + self._rasterizar(texto, posicao, cor)
+        _, x0, y0, cores, mascara = linha
+
+        # Parte da linha que cabe no quadro
+        altura, largura = imagem.shape[:2]
+        x1, y1 = min(x0 + mascara.shape[1], largura), min(y0 + mascara.shape[0], altura)
+        cx, cy = max(0, -x0), max(0, -y0)
+        if x1 <= x0 + cx or y1 <= y0 + cy:
+            return
+        regiao = imagem[y0 + cy:y1, x0 + cx:x1]
+        cv2.copyTo(cores[cy:y1 - y0, cx:x1 - x0], mascara[cy:y1 - y0, cx:x1 - x0], regiao)
+
+    def _rasterizar(self, texto, posicao, cor):
+        (largura, altura), base = cv2.getTextSize(texto, FONTE, ESCALA_FONTE, ESPESSURA_FONTE)
+        folga = ESPESSURA_FONTE
+        x0, y0 = posicao[0] - folga, posicao[1] - altura - folga
+        alfa = np.zeros((altura + base + 2 * folga, largura + 2 * folga), dtype=np.uint8)
+        cv2.putText(alfa, texto, (folga, altura + folga), FONTE, ESCALA_FONTE, 255, ESPESSURA_FONTE, cv2.LINE_AA)
+        # Sem mistura com o fundo: as bordas suavizadas entram na máscara a partir de meia intensidade
+        mascara = (alfa >= 128).astype(np.uint8)
+        cores = np.empty(alfa.shape + (3,), dtype=np.uint8)
+        cores[:] = cor
+        self.rasterizacoes += 1
+        return x0, y0, cores, mascara
+
+
+def desenhar_pose(imagem, landmarks):
+    # Esqueleto a partir do array (33, 4), igual ao mp_drawing.draw_landmarks, para qualquer estimador
+    altura, largura = imagem.shape[:2]
+    xy = landmarks[:, :2]
+    visiveis = (landmarks[:, 3] >= VISIBILIDADE_DESENHO) & (xy >= 0).all(axis=1) & (xy <= 1).all(axis=1)
+    pontos = np.minimum(xy * (largura, altura), (largura - 1, altura - 1)).astype(np.int32)
+    conexoes = CONEXOES_POSE[visiveis[CONEXOES_POSE].all(axis=1)]
+    if len(conexoes):
+        cv2.polylines(imagem, list(pontos[conexoes]), False, COR_CONEXAO, 2)
+    for x, y in pontos[visiveis].tolist():
+        cv2.circle(imagem, (x, y), 3, COR_BORDA, 2)
+        cv2.circle(imagem, (x, y), 2, COR_LANDMARK, 2)
+
+
+class LimitadorExibicao:
+    """Decide quais quadros são desenhados e mostrados, independente da taxa da câmera.
+
+    No máximo `fps_maximo` quadros por segundo vão para a janela (None ou 0: todos); os
+    demais são contados e enviados ao Arduino normalmente, sem desenho, imshow nem waitKey.
+    Um quadro até 1/4 de intervalo adiantado ainda é exibido, para que a variação na chegada
+    dos quadros de uma câmera na mesma taxa não descarte um a cada dois.
+    """
+
+    def __init__(self, fps_maximo=30):
+        self.fps_maximo = fps_maximo
+        self.intervalo = 1.0 / fps_maximo if fps_maximo else 0.0
+        self.exibidos = 0
+        self.omitidos = 0
+        self._proximo = 0.0
+
+    def devido(self, agora):
+        if agora < self._proximo - self.intervalo / 4:
+            self.omitidos += 1
+            return False
+        self._proximo += self.intervalo
+        if self._proximo <= agora:
+            # Atraso maior que um intervalo: a grade recomeça a partir deste quadro
+            self._proximo = agora + self.intervalo
+        self.exibidos += 1
+        return True
+
+    def resumo(self):
+        limite = f"até {self.fps_maximo} fps" if self.fps_maximo else "sem limite"
+        return f"exibição ({limite}): {self.exibidos} quadros exibidos, {self.omitidos} só processados"
+
+
+class MedidorAlocacoes:
+    # Pico de memória alocada dentro de cada quadro, acima do que já estava alocado no início dele
+    # (tracemalloc; inclui as threads de captura e inferência do modo pipeline e deixa o loop mais lento)
+    def __init__(self):
+        tracemalloc.start()
+        self.quadros = 0
+        self.soma = 0
+        self.maximo = 0
+        self._base = 0
+
+    def iniciar_quadro(self):
+        tracemalloc.reset_peak()
+        self._base = tracemalloc.get_traced_memory()[0]
+
+    def encerrar_quadro(self):
+        alocado = tracemalloc.get_traced_memory()[1] - self._base
+        self.quadros += 1
+        self.soma += alocado
+        self.maximo = max(self.maximo, alocado)
+
+    def parar(self):
+        tracemalloc.stop()
+
+    def resumo(self):
+        if not self.quadros:
+            return "alocações: nenhum quadro"
+        return (f"alocações por quadro: média {self.soma / self.quadros / 1024:.1f} KB, "
+                f"máx. {self.maximo / 1024:.1f} KB ({self.quadros} quadros)")
+
+
+def _quadros_sinteticos(largura, altura, quantidade=8):
+    gerador = np.random.default_rng(0)
+    return [gerador.integers(0, 256, (altura, largura, 3), dtype=np.uint8) for _ in range(quantidade)]
+
+
+def _textos(i):
+    contador = i // 45
+    return [('Exercicio: Elevacao Lateral', (50, 30), (255, 255, 255)),
+            (f'Serie: 1 Repeticao: {contador}', (50, 70), (0, 255, 255)),
+            (f'Erros: {contador // 4}', (50, 110), (0, 0, 255))]
+
+
+def _linhas(imagem):
+    cv2.line(imagem, (0, 150), (imagem.shape[1], 150), (0, 255, 0), 2)
+    cv2.line(imagem, (0, 300), (imagem.shape[1], 300), (0, 0, 255), 2)
+
+
+def _caminho_original(fontes, quadros):
+    # Como o loop fazia: cada leitura gera um array novo, RGB em outro, de volta a BGR em um terceiro
+    for i in range(quadros):
+        frame = fontes[i % len(fontes)].copy()
+        image = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        image.flags.writeable = False
+        image.flags.writeable = True
+        image = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
+        _linhas(image)
+        for texto, posicao, cor in _textos(i):
+            cv2.putText(image, texto, posicao, FONTE, ESCALA_FONTE, cor, ESPESSURA_FONTE, cv2.LINE_AA)
+        yield
+
+
+def _caminho_atual(fontes, quadros):
+    # Leitura para o mesmo buffer, RGB em buffer pré-alocado, desenho no próprio quadro com a camada de texto
+    conversor = ConversorCor()
+    camada = CamadaTexto()
+    frame = np.empty_like(fontes[0])
+    for i in range(quadros):
+        np.copyto(frame, fontes[i % len(fontes)])
+        conversor.converter(frame)
+        _linhas(frame)
+        for texto, posicao, cor in _textos(i):
+            camada.desenhar(frame, texto, posicao, cor)
+        yield
+
+
+def medir(nome, caminho, fontes, quadros):
+    # Primeiro os tempos, depois uma segunda passada com tracemalloc (que tornaria os tempos maiores)
+    tempos = []
+    inicio = time.perf_counter()
+    for _ in caminho(fontes, quadros):
+        agora = time.perf_counter()
+        tempos.append(agora - inicio)
+        inicio = agora
+    tempos.sort()
+
+    medidor = MedidorAlocacoes()
+    medidor.iniciar_quadro()
+    for _ in caminho(fontes, quadros):
+        medidor.encerrar_quadro()
+        medidor.iniciar_quadro()
+    medidor.parar()
+    print(f"{nome:>9}: p50 {1000 * tempos[len(tempos) // 2]:.3f} ms, p95 {1000 * tempos[int(len(tempos) * 0.95)]:.3f} ms "
+          f"por quadro; {medidor.resumo()}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark do caminho de desenho em quadros sintéticos")
+    parser.add_argument('--quadros', type=int, default=600)
+    parser.add_argument('--largura', type=int, default=640)
+    parser.add_argument('--altura', type=int, default=480)
+    args = parser.parse_args()
+
+    fontes = _quadros_sinteticos(args.largura, args.altura)
+    medir('original', _caminho_original, fontes, args.quadros)
+    medir('atual', _caminho_atual, fontes, args.quadros)
@@ -0,0 +1,175 @@
+import math
+
+import numpy as np
+
+# Filtro usado quando o exercício não define um: média dos últimos 10 quadros,
+# o mesmo suavizamento que era aplicado à altura dos ombros
+FILTRO_PADRAO = 'media:10'
+
+FORMA_LANDMARKS = (33, 4)
+
+
+class FiltroMediaMovel:
+    # Média móvel em buffer circular: soma incremental, O(1) por quadro
+    def __init__(self, janela=10, forma=FORMA_LANDMARKS):
+        self.janela = int(janela)
+        if self.janela < 1:
+            raise ValueError(f"janela da média móvel deve ser ao menos 1 (recebido {janela})")
+        self._buffer = np.zeros((self.janela,) + tuple(forma))
+        self._soma = np.zeros(forma)
+        self.saida = np.zeros(forma)
+        self._indice = 0
+        self._preenchidos = 0
+
+    def atualizar(self, valores, tempo=None):
+        posicao = self._buffer[self._indice]
+        if self._preenchidos == self.janela:
+            self._soma -= posicao
+        else:
+            self._preenchidos += 1
+        posicao[...] = valores
+        self._soma += posicao
+        self._indice = (self._indice + 1) % self.janela
+        np.divide(self._soma, self._preenchidos, out=self.saida)
+        return self.saida
+
+    def reiniciar(self):
+        self._soma.fill(0)
+        self._indice = 0
+        self._preenchidos = 0
+
+
+class FiltroEMA:
+    # Média móvel exponencial: saida += alfa * (valor - saida)
+    def __init__(self, alfa=0.5, forma=FORMA_LANDMARKS):
+        self.alfa = float(alfa)
+        if not 0 < self.alfa <= 1:
+            raise ValueError(f"alfa da EMA deve estar em (0, 1] (recebido {alfa})")
+        self.saida = np.zeros(forma)
+        self._diferenca = np.zeros(forma)
+        self._iniciado = False
+
+    def atualizar(self, valores, tempo=None):
+        if not self._iniciado:
+            self.saida[...] = valores
+            self._iniciado = True
+            return self.saida
+        np.subtract(valores, self.saida, out=self._diferenca)
+        self._diferenca *= self.alfa
+        self.saida += self._diferenca
+        return self.saida
+
+    def reiniciar(self):
+        self._iniciado = False
+
+
+class FiltroOneEuro:
+    """Filtro One-Euro (Casiez et al., 2012): corte adaptativo à velocidade.
+
+    Parado, suaviza bastante (`corte_minimo`); em movimento rápido o corte sobe com `beta`,
+    reduzindo o atraso. Usa o instante de cada quadro, então tolera fps variável.
+    """
+
+    def __init__(self, corte_minimo=1.0, beta=0.01, corte_derivada=1.0, forma=FORMA_LANDMARKS):
+        self.corte_minimo = float(corte_minimo)
+        self.beta = float(beta)
+        self.corte_derivada = float(corte_derivada)
+        if self.corte_minimo <= 0 or self.corte_derivada <= 0:
+            raise ValueError(f"frequências de corte do One-Euro devem ser positivas (recebido {corte_minimo}, "
+                             f"{corte_derivada})")
+        if self.beta < 0:
+            raise ValueError(f"beta do One-Euro não pode ser negativo (recebido {beta})")
+        self.saida = np.zeros(forma)
+        self._derivada = np.zeros(forma)
+        self._temp = np.zeros(forma)
+        self._alfa = np.zeros(forma)
+        self._tempo_anterior = None
+
+    @staticmethod
+    def _alfa_corte(corte, dt):
+        tau = 1.0 / (2 * math.pi * corte)
+        return 1.0 / (1.0 + tau / dt)
+
+    def atualizar(self, valores, tempo):
+        if self._tempo_anterior is None:
+            self.saida[...] = valores
+            self._derivada.fill(0)
+            self._tempo_anterior = tempo
+            return self.saida
+        dt = max(tempo - self._tempo_anterior, 1e-6)
+        self._tempo_anterior = tempo
+
+        # Derivada suavizada: _derivada += a_d * ((valores - saida) / dt - _derivada)
+        np.subtract(valores, self.saida, out=self._temp)
+        self._temp /= dt
+        self._temp -= self._derivada
+        self._temp *= self._alfa_corte(self.corte_derivada, dt)
+        self._derivada += self._temp
+
+        # Corte adaptativo por coordenada e alfa correspondente
+        np.abs(self._derivada, out=self._alfa)
+        self._alfa *= self.beta
+        self._alfa += self.corte_minimo
+        self._alfa *= 2 * math.pi * dt
+        np.add(self._alfa, 1.0, out=self._temp)
+        np.divide(self._alfa, self._temp, out=self._alfa)
+
+        np.subtract(valores, self.saida, out=self._temp)
+        self._temp *= self._alfa
+        self.saida += self._temp
+        return self.saida
+
+    def reiniciar(self):
+        self._tempo_anterior = None
+
+
+class SemFiltro:
+    def __init__(self, forma=FORMA_LANDMARKS):
+        self.saida = np.zeros(forma)
+
+    def atualizar(self, valores, tempo=None):
+        self.saida[...] = valores
+        return self.saida
+
+    def reiniciar(self):
+        pass
+
+
+def criar_filtro(especificacao=FILTRO_PADRAO, forma=FORMA_LANDMARKS):
+    """Cria um filtro a partir do texto usado em exercicios.txt.
+
+    Formatos: 'media:<janela>', 'ema:<alfa>', 'oneeuro:<corte_minimo>:<beta>' e 'nenhum'.
+    Janela ao menos 1, alfa em (0, 1] e cortes positivos; fora disso, ValueError.
+    """
+    nome, *args = especificacao.strip().lower().split(':')
+    try:
+        if nome == 'media':
+            return FiltroMediaMovel(*(int(a) for a in args), forma=forma)
+        if nome == 'ema':
+            return FiltroEMA(*(float(a) for a in args), forma=forma)
+        if nome == 'oneeuro':
+            return FiltroOneEuro(*(float(a) for a in args), forma=forma)
+        if nome == 'nenhum':
+            return SemFiltro(forma=forma)
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Parâmetros inválidos para o filtro '{especificacao}': {e}") from None
+    raise ValueError(f"Filtro desconhecido: '{especificacao}'")
+
+
+def filtrar_lote(especificacao, valores, tempos):
+    # Aplica o filtro a uma sessão inteira (quadros, ...); a média móvel é calculada de forma vetorizada
+    valores = np.asarray(valores, dtype=np.float64)
+    nome = especificacao.strip().lower().split(':')[0]
+    if nome == 'media':
+        janela = criar_filtro(especificacao, forma=valores.shape[1:]).janela
+        acumulada = np.concatenate((np.zeros((1,) + valores.shape[1:]), np.cumsum(valores, axis=0)))
+        fim = np.arange(1, len(valores) + 1)
+        inicio = np.maximum(0, fim - janela)
+        divisor = (fim - inicio).reshape((-1,) + (1,) * (valores.ndim - 1))
+        return (acumulada[fim] - acumulada[inicio]) / divisor
+
+    filtro = criar_filtro(especificacao, forma=valores.shape[1:])
+    saida = np.empty_like(valores)
+    for i in range(len(valores)):
+        saida[i] = filtro.atualizar(valores[i], tempos[i])
+    return saida
@@ -0,0 +1,185 @@
+import json
+import os
+import sqlite3
+import time
+
+import numpy as np
+
+# Cada quadro ocupa um registro fixo de 33 x 4 float32 em landmarks.f32 e um float64 em tempos.f64.
+# Quadros sem pose são gravados como NaN, mantendo os dois arquivos alinhados.
+FORMA_QUADRO = (33, 4)
+BYTES_QUADRO = 33 * 4 * 4
+BYTES_TEMPO = 8
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS sessoes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    exercicio TEXT NOT NULL,
+    inicio REAL NOT NULL,
+    fim REAL,
+    parametros TEXT NOT NULL,
+    offset_landmarks INTEGER NOT NULL,
+    offset_tempos INTEGER NOT NULL,
+    quadros INTEGER NOT NULL DEFAULT 0,
+    offset_eventos INTEGER NOT NULL,
+    bytes_eventos INTEGER NOT NULL DEFAULT 0,
+    acertos INTEGER,
+    erros INTEGER
+);
+CREATE INDEX IF NOT EXISTS sessoes_exercicio_inicio ON sessoes (exercicio, inicio);
+CREATE INDEX IF NOT EXISTS sessoes_inicio ON sessoes (inicio);
+"""
+
+
+class Historico:
+    """Armazenamento das sessões: arquivos binários só de acréscimo e um índice SQLite.
+
+    Os landmarks de todas as sessões ficam em um único arquivo; o índice guarda, por sessão,
+    exercício, data, parâmetros e os deslocamentos em bytes, de modo que qualquer sessão (ou
+    intervalo de tempo dentro dela) é lida com `np.memmap`, sem cópia e sem reprocessar vídeo.
+    """
+
+    def __init__(self, diretorio='historico'):
+        self.diretorio = diretorio
+        os.makedirs(diretorio, exist_ok=True)
+        self.caminho_landmarks = os.path.join(diretorio, 'landmarks.f32')
+        self.caminho_tempos = os.path.join(diretorio, 'tempos.f64')
+        self.caminho_eventos = os.path.join(diretorio, 'eventos.jsonl')
+        self._conexao = sqlite3.connect(os.path.join(diretorio, 'indice.sqlite'), check_same_thread=False)
+        self._conexao.row_factory = sqlite3.Row
+        self._conexao.executescript(ESQUEMA)
+
+    def nova_sessao(self, exercicio, parametros, inicio=None):
+        return GravadorSessao(self, exercicio, parametros, inicio)
+
+    def importar_sessao(self, exercicio, parametros, inicio, tempos, landmarks, eventos, acertos, erros):
+        # Grava de uma vez uma sessão registrada em outro processo (modo multiestação)
+        gravador = self.nova_sessao(exercicio, parametros, inicio)
+        gravador.gravar_quadros(tempos, landmarks)
+        for evento in eventos:
+            gravador.gravar_evento(**evento)
+        return gravador.finalizar(acertos, erros)
+
+    def sessoes(self, exercicio=None, desde=None, ate=None):
+        consulta = "SELECT * FROM sessoes WHERE fim IS NOT NULL"
+        args = []
+        if exercicio is not None:
+            consulta += " AND exercicio = ?"
+            args.append(exercicio)
+        if desde is not None:
+            consulta += " AND inicio >= ?"
+            args.append(desde)
+        if ate is not None:
+            consulta += " AND inicio <= ?"
+            args.append(ate)
+        linhas = self._conexao.execute(consulta + " ORDER BY inicio", args).fetchall()
+        return [self._sessao(linha) for linha in linhas]
+
+    def sessao(self, sessao_id):
+        linha = self._conexao.execute("SELECT * FROM sessoes WHERE id = ?", (sessao_id,)).fetchone()
+        if linha is None:
+            raise KeyError(f"Sessão {sessao_id} não encontrada no histórico.")
+        return self._sessao(linha)
+
+    @staticmethod
+    def _sessao(linha):
+        sessao = dict(linha)
+        sessao['parametros'] = json.loads(sessao['parametros'])
+        return sessao
+
+    def carregar(self, sessao_id, inicio=None, fim=None):
+        """Landmarks (quadros, 33, 4) e tempos da sessão, opcionalmente só do intervalo [inicio, fim].
+
+        Os arrays retornados são visões `np.memmap` somente leitura dos arquivos do histórico.
+        """
+        sessao = self.sessao(sessao_id)
+        quadros = sessao['quadros']
+        if quadros == 0:
+            return np.empty((0,) + FORMA_QUADRO, dtype=np.float32), np.empty(0)
+        landmarks = np.memmap(self.caminho_landmarks, dtype=np.float32, mode='r',
+                              offset=sessao['offset_landmarks'], shape=(quadros,) + FORMA_QUADRO)
+        tempos = np.memmap(self.caminho_tempos, dtype=np.float64, mode='r',
+                           offset=sessao['offset_tempos'], shape=(quadros,))
+        a = 0 if inicio is None else int(np.searchsorted(tempos, inicio, side='left'))
+        b = quadros if fim is None else int(np.searchsorted(tempos, fim, side='right'))
+        return landmarks[a:b], tempos[a:b]
+
+    def eventos(self, sessao_id):
+        sessao = self.sessao(sessao_id)
+        if not sessao['bytes_eventos']:
+            return []
+        with open(self.caminho_eventos, 'rb') as f:
+            f.seek(sessao['offset_eventos'])
+            bloco = f.read(sessao['bytes_eventos'])
+        return [json.loads(linha) for linha in bloco.decode('utf-8').splitlines()]
+
+    def _registrar(self, gravador):
+        cursor = self._conexao.execute(
+            "INSERT INTO sessoes (exercicio, inicio, parametros, offset_landmarks, offset_tempos, offset_eventos) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (gravador.exercicio, gravador.inicio, json.dumps(gravador.parametros),
+             gravador.offset_landmarks, gravador.offset_tempos, gravador.offset_eventos))
+        self._conexao.commit()
+        return cursor.lastrowid
+
+    def _finalizar(self, gravador, acertos, erros):
+        self._conexao.execute(
+            "UPDATE sessoes SET fim = ?, quadros = ?, bytes_eventos = ?, acertos = ?, erros = ? WHERE id = ?",
+            (time.time(), gravador.quadros, gravador.bytes_eventos, acertos, erros, gravador.sessao_id))
+        self._conexao.commit()
+
+    def fechar(self):
+        self._conexao.close()
+
+
+class GravadorSessao:
+    # Acrescenta quadros e eventos de uma sessão aos arquivos do histórico
+    def __init__(self, historico, exercicio, parametros, inicio=None):
+        self.historico = historico
+        self.exercicio = exercicio
+        self.parametros = parametros
+        self.inicio = time.time() if inicio is None else inicio
+        self.quadros = 0
+        self.bytes_eventos = 0
+        self._sem_pose = np.full(FORMA_QUADRO, np.nan, dtype=np.float32)
+
+        self._landmarks = open(historico.caminho_landmarks, 'ab')
+        self._tempos = open(historico.caminho_tempos, 'ab')
+        self._eventos = open(historico.caminho_eventos, 'ab')
+        # Registros incompletos de uma sessão interrompida são ignorados: cada sessão começa alinhada
+        self.offset_landmarks = self._alinhar(self._landmarks, BYTES_QUADRO)
+        self.offset_tempos = self._alinhar(self._tempos, BYTES_TEMPO)
+        self.offset_eventos = self._eventos.tell()
+        self.sessao_id = historico._registrar(self)
+
+    @staticmethod
+    def _alinhar(arquivo, tamanho_registro):
+        posicao = arquivo.tell()
+        resto = posicao % tamanho_registro
+        if resto:
+            arquivo.write(b'\0' * (tamanho_registro - resto))
+        return arquivo.tell()
+
+    def gravar_quadro(self, tempo, landmarks):
+        dados = self._sem_pose if landmarks is None else landmarks.astype(np.float32, copy=False)
+        self._landmarks.write(dados.tobytes())
+        self._tempos.write(np.float64(tempo).tobytes())
+        self.quadros += 1
+
+    def gravar_quadros(self, tempos, landmarks):
+        # Vários quadros (n, 33, 4) em uma única escrita; linhas NaN marcam quadros sem pose
+        self._landmarks.write(np.ascontiguousarray(landmarks, dtype=np.float32).tobytes())
+        self._tempos.write(np.ascontiguousarray(tempos, dtype=np.float64).tobytes())
+        self.quadros += len(tempos)
+
+    def gravar_evento(self, tempo, comando, **dados):
+        linha = json.dumps({'tempo': tempo, 'comando': comando, **dados}, ensure_ascii=False) + '\n'
+        bloco = linha.encode('utf-8')
+        self._eventos.write(bloco)
+        self.bytes_eventos += len(bloco)
+
+    def finalizar(self, acertos, erros):
+        for arquivo in (self._landmarks, self._tempos, self._eventos):
+            arquivo.close()
+        self.historico._finalizar(self, acertos, erros)
+        return self.sessao_id
@@ -0,0 +1,249 @@
+import os
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+
+from contador import ContadorRepeticoes, varrer_offsets
+from estimadores import ESTIMADOR_PADRAO, criar_estimador
+from regras import REGRA_PADRAO
+from roi import RecorteROI
+
+EXTENSOES_VIDEO = ('.mp4', '.avi', '.mov', '.mkv', '.webm')
+
+# Um estimador de pose por processo do pool, criado no inicializador
+_pose = None
+
+
+def _inicializar_worker(estimador=ESTIMADOR_PADRAO, modelo_onnx=None):
+    global _pose
+    _pose = criar_estimador(estimador, modelo_onnx)
+
+
+def pontuar_video(caminho, params, salvar_landmarks=False):
+    """Reproduz a contagem de `run_exercise` sobre um vídeo gravado, sem janela.
+
+    O tempo de cada quadro vem do próprio vídeo (índice / fps), de modo que a tolerância
+    de sincronização e o descanso entre séries correspondem ao tempo real da gravação.
+    Com `salvar_landmarks`, os landmarks dos quadros fora do descanso são gravados em
+    `<video>.landmarks.npz`, junto com os eventos 'S' de início de cada série no formato do
+    histórico, para serem repontuados depois com `varrer_arquivo`.
+    """
+    inicio = time.perf_counter()
+    cap = cv2.VideoCapture(caminho)
+    if not cap.isOpened():
+        return {'arquivo': caminho, 'erro': "Não foi possível abrir o vídeo."}
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+
+    # A pose de cada worker é reaproveitada entre vídeos; o rastreamento recomeça a cada arquivo
+    _pose.reiniciar()
+    contador_reps = ContadorRepeticoes(params['offset_verde'], params['offset_vermelho'],
+                                       filtro=params['filtro'], regra=params['regra'])
+
+    contador = 0
+    contador_erro = 0
+    serie = 1
+    inicio_descanso = None
+    repetition_results = []
+    quadros = 0
+    landmarks_video = []
+    tempos_video = []
+    eventos_video = []
+
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        tempo = quadros / fps
+        quadros += 1
+
+        # Descanso entre séries, contado no tempo do vídeo
+        if inicio_descanso is not None:
+            if tempo - inicio_descanso < params['descanso']:
+                continue
+            contador = 0
+            serie += 1
+            inicio_descanso = None
+            contador_reps.reiniciar_serie()
+            eventos_video.append({'tempo': tempo, 'comando': 'S', 'serie': serie})
+        if serie > params['series'] and not salvar_landmarks:
+            break
+
+        image = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        image.flags.writeable = False
+        landmarks = _pose.processar(image)
+        if salvar_landmarks:
+            tempos_video.append(tempo)
+            landmarks_video.append(landmarks if landmarks is not None else np.full((33, 4), np.nan, dtype=np.float32))
+        if landmarks is None or serie > params['series']:
+            continue
+
+        for evento in contador_reps.processar(landmarks, tempo):
+            if evento.comando == 'A':
+                contador += 1
+                repetition_results.append(1)
+            else:
+                contador_erro += 1
+                repetition_results.append(0)
+
+        if contador >= params['repeticoes']:
+            inicio_descanso = tempo
+
+    cap.release()
+    if salvar_landmarks and landmarks_video:
+        np.savez_compressed(caminho + '.landmarks.npz', landmarks=np.stack(landmarks_video),
+                            tempos=np.array(tempos_video), eventos=np.array(json.dumps(eventos_video)))
+    return {
+        'arquivo': caminho,
+        'quadros': quadros,
+        'duracao_video_s': quadros / fps,
+        'tempo_processamento_s': time.perf_counter() - inicio,
+        'series_concluidas': min(serie, params['series'] + 1) - 1,
+        'acertos': repetition_results.count(1),
+        'erros': contador_erro,
+        'repetition_results': repetition_results,
+    }
+
+
+def medir_resolucoes(caminho, lados=(None, 480, 320, 256, 192), quadros_maximos=600, estimador=ESTIMADOR_PADRAO,
+                     modelo_onnx=None):
+    """Latência da inferência em um vídeo, com e sem ROI, para cada limite de resolução.
+
+    Mostra também a fração de quadros com pose e o desvio médio de ombros e cotovelos
+    (coordenadas normalizadas) em relação à inferência no quadro inteiro, para escolher em
+    cada máquina o menor custo que ainda não prejudica a contagem.
+    """
+    _inicializar_worker(estimador, modelo_onnx)
+    referencia = None
+    print("ROI  maior lado  p50 (ms)  p95 (ms)  com pose  desvio ombros/cotovelos")
+    for roi_ativo in (False, True):
+        for lado in lados:
+            _pose.reiniciar()
+            roi = RecorteROI(ativo=roi_ativo, lado_maximo=lado)
+            cap = cv2.VideoCapture(caminho)
+            latencias = []
+            pontos = []
+            while len(latencias) < quadros_maximos:
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                entrada, caixa = roi.recortar(frame)
+                image = cv2.cvtColor(entrada, cv2.COLOR_BGR2RGB)
+                inicio = time.perf_counter()
+                landmarks = _pose.processar(image)
+                latencias.append(time.perf_counter() - inicio)
+                roi.mapear(landmarks, caixa)
+                pontos.append(landmarks[11:15, :2] if landmarks is not None else np.full((4, 2), np.nan, dtype=np.float32))
+            cap.release()
+            if not latencias:
+                print(f"Não foi possível ler quadros de {caminho}.")
+                return
+
+            pontos = np.stack(pontos)
+            if referencia is None:
+                referencia = pontos
+            n = min(len(pontos), len(referencia))
+            with np.errstate(invalid='ignore'):
+                desvio = np.nanmean(np.linalg.norm(pontos[:n] - referencia[:n], axis=-1)) if roi_ativo or lado else 0.0
+            p50, p95 = 1000 * np.percentile(latencias, [50, 95])
+            com_pose = 100 * np.mean(~np.isnan(pontos[:, 0, 0]))
+            print(f"{'sim' if roi_ativo else 'não':>3}  {lado or 'inteiro':>10}  {p50:8.1f}  {p95:8.1f}  "
+                  f"{com_pose:7.0f}%  {desvio:.4f}")
+
+
+def listar_videos(diretorio):
+    return sorted(
+        os.path.join(diretorio, nome) for nome in os.listdir(diretorio)
+        if nome.lower().endswith(EXTENSOES_VIDEO)
+    )
+
+
+def pontuar_diretorio(diretorio, exercicio, params, saida, processos=None, salvar_landmarks=False,
+                      estimador=ESTIMADOR_PADRAO, modelo_onnx=None):
+    # Distribui os vídeos do diretório entre os processos e grava um único resumo em JSON
+    arquivos = listar_videos(diretorio)
+    if not arquivos:
+        print(f"Nenhum vídeo encontrado em '{diretorio}'.")
+        return None
+
+    inicio = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=processos, initializer=_inicializar_worker,
+                             initargs=(estimador, modelo_onnx)) as executor:
+        resultados = list(executor.map(pontuar_video, arquivos, [params] * len(arquivos),
+                                       [salvar_landmarks] * len(arquivos)))
+    duracao = time.perf_counter() - inicio
+
+    resumo = {
+        'exercicio': exercicio,
+        'estimador': estimador,
+        'parametros': params,
+        'tempo_total_s': duracao,
+        'videos': resultados,
+    }
+    with open(saida, 'w', encoding='utf-8') as f:
+        json.dump(resumo, f, ensure_ascii=False, indent=2)
+
+    duracao_videos = sum(r.get('duracao_video_s', 0) for r in resultados)
+    print(f"{len(arquivos)} vídeos ({duracao_videos:.0f} s de gravação) pontuados em {duracao:.1f} s. Resumo: {saida}")
+    return resumo
+
+
+def varrer_arquivo(caminho_npz, params, passos=9, amplitude=0.1, eventos=None):
+    # Repontua landmarks salvos com uma grade de offsets em torno dos valores do exercício, série a série
+    # com os eventos passados ou gravados no arquivo (arquivos antigos não os têm)
+    dados = np.load(caminho_npz)
+    if eventos is None and 'eventos' in dados.files:
+        eventos = json.loads(str(dados['eventos']))
+    if eventos is None:
+        print(f"{caminho_npz} não tem os eventos das séries: pontuado como uma série só.")
+    return varrer_landmarks(dados['landmarks'], dados['tempos'], params, passos, amplitude, eventos=eventos)
+
+
+def series_da_sessao(eventos, series):
+    """Divisão em séries de uma sessão do histórico, a partir dos eventos gravados.
+
+    Retorna (reinícios, contar_desde, fim): os instantes dos eventos 'S' (série nova) e 'C'
+    (contagem zerada), o instante do último 'C' (o que veio antes não entra nos totais) e o
+    do 'S' que concluiu o exercício (None se não houver), depois do qual nada é contado.
+    """
+    reinicios = []
+    contar_desde = fim = None
+    for evento in eventos:
+        if evento['comando'] == 'C':
+            reinicios.append(evento['tempo'])
+            contar_desde = evento['tempo']
+            fim = None
+        elif evento['comando'] == 'S':
+            reinicios.append(evento['tempo'])
+            if evento.get('serie', 0) > series and fim is None:
+                fim = evento['tempo']
+    return reinicios, contar_desde, fim
+
+
+def varrer_landmarks(landmarks, tempos, params, passos=9, amplitude=0.1, eventos=None):
+    # Com os `eventos` da sessão, cada série é repontuada separadamente, como ao vivo
+    offsets_verde = params['offset_verde'] + np.linspace(-amplitude, amplitude, passos)
+    offsets_vermelho = params['offset_vermelho'] + np.linspace(-amplitude, amplitude, passos)
+
+    reinicios, contar_desde, repeticoes = (), None, None
+    if eventos is not None:
+        reinicios, contar_desde, fim = series_da_sessao(eventos, params['series'])
+        repeticoes = params['repeticoes']
+        if fim is not None:
+            quadros = int(np.searchsorted(tempos, fim, side='left'))
+            landmarks, tempos = landmarks[:quadros], tempos[:quadros]
+
+    inicio = time.perf_counter()
+    # Sessões gravadas antes das regras por exercício usam a regra padrão
+    resultados = varrer_offsets(landmarks, tempos, offsets_verde, offsets_vermelho, filtro=params['filtro'],
+                                regra=params.get('regra', REGRA_PADRAO), reinicios=reinicios,
+                                repeticoes=repeticoes, contar_desde=contar_desde)
+    duracao = time.perf_counter() - inicio
+
+    print(f"{len(resultados)} combinações repontuadas em {1000 * duracao:.1f} ms")
+    print("offset_verde  offset_vermelho  acertos  erros")
+    for r in resultados:
+        print(f"{r['offset_verde']:12.3f}  {r['offset_vermelho']:15.3f}  {r['acertos']:7d}  {r['erros']:5d}")
+    return resultados
@@ -0,0 +1,182 @@
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+
+# Etapas cronometradas em cada quadro, na ordem em que acontecem
+ETAPAS = ('captura', 'conversao', 'inferencia', 'contagem', 'desenho', 'serial', 'exibicao', 'quadro')
+
+# Latência de ponta a ponta: captura do quadro até a escrita do comando na porta serial
+CAPTURA_ATE_ARDUINO = 'captura_ate_arduino'
+
+PERCENTIS = (50, 95, 99)
+
+# Tempo total de cada quadro, do quadro disponível ao fim do loop; o número de amostras dela é o
+# número de quadros processados (a exibição pode ser limitada a uma taxa menor)
+ETAPA_QUADRO = 'quadro'
+
+# Quadros por segundo e uso de CPU registrados a cada exportação periódica
+logger = logging.getLogger('metricas')
+
+# Energia acumulada do pacote da CPU (Intel RAPL, Linux; a leitura pode exigir permissão)
+ARQUIVO_RAPL = '/sys/class/powercap/intel-rapl:0/energy_uj'
+ARQUIVO_RAPL_MAXIMO = '/sys/class/powercap/intel-rapl:0/max_energy_range_uj'
+
+
+def ler_energia_rapl(arquivo=ARQUIVO_RAPL):
+    # Microjoules, ou None se o contador não existir ou não puder ser lido
+    try:
+        with open(arquivo) as f:
+            return int(f.read())
+    except (OSError, ValueError):
+        return None
+
+
+class Metricas:
+    """Tempos por etapa em buffers circulares pré-alocados (milissegundos).
+
+    Registrar uma amostra é só uma escrita em um array NumPy; percentis são calculados apenas
+    na exportação periódica e no relatório final. Várias threads registram ao mesmo tempo (no
+    modo pipeline a de captura, a de inferência, a do escritor serial e a principal), mas cada
+    etapa tem um único escritor, então a escrita da amostra dispensa trava. Só a criação de uma
+    etapa nova (as de resolução e de idade do quadro surgem no primeiro registro) e a cópia da
+    lista de etapas na exportação usam a trava.
+
+    A cada intervalo a taxa de quadros e o uso de CPU recentes são registrados no log (nível
+    INFO); o resumo final inclui a CPU média do processo e, com RAPL, a energia gasta. A
+    exportação gera um CSV (uma linha por etapa a cada instantâneo) ou, se o arquivo terminar
+    em '.prom', um arquivo de texto no formato do Prometheus, reescrito a cada vez.
+    """
+
+    def __init__(self, capacidade=4096, arquivo=None, intervalo_exportacao=5.0):
+        self.capacidade = capacidade
+        self._amostras = {}
+        self._totais = {}
+        self._lock = threading.Lock()
+        for etapa in ETAPAS + (CAPTURA_ATE_ARDUINO,):
+            self._criar(etapa)
+        self.arquivo = arquivo
+        self.intervalo_exportacao = intervalo_exportacao
+        self._inicio = time.perf_counter()
+        self._proxima_exportacao = self._inicio + intervalo_exportacao
+        self._quadros_anteriores = 0
+        self._instante_anterior = self._inicio
+        self._cpu_inicio = self._cpu_anterior = time.process_time()
+        self._energia_inicio = ler_energia_rapl()
+
+    def _criar(self, etapa):
+        # O total entra antes do buffer: quem encontra a etapa em _amostras já encontra o total
+        self._totais[etapa] = 0
+        self._amostras[etapa] = np.zeros(self.capacidade)
+
+    def etapas(self):
+        with self._lock:
+            return list(self._amostras)
+
+    def registrar(self, etapa, inicio):
+        # Registra o tempo decorrido desde `inicio` (time.perf_counter) e retorna o instante atual
+        agora = time.perf_counter()
+        self.registrar_duracao(etapa, agora - inicio)
+        return agora
+
+    def registrar_duracao(self, etapa, segundos):
+        if etapa not in self._amostras:
+            with self._lock:
+                if etapa not in self._amostras:
+                    self._criar(etapa)
+        total = self._totais[etapa]
+        self._amostras[etapa][total % self.capacidade] = 1000 * segundos
+        self._totais[etapa] = total + 1
+
+    def amostras(self, etapa):
+        total = self._totais.get(etapa, 0)
+        return self._amostras[etapa][:min(total, self.capacidade)] if total else np.empty(0)
+
+    def percentis(self, etapa):
+        valores = self.amostras(etapa)
+        if not len(valores):
+            return None
+        return dict(zip(PERCENTIS, np.percentile(valores, PERCENTIS)))
+
+    def fps(self):
+        # Média de quadros por segundo desde a criação
+        return self._totais[ETAPA_QUADRO] / max(time.perf_counter() - self._inicio, 1e-9)
+
+    def exportar_periodico(self):
+        agora = time.perf_counter()
+        if agora < self._proxima_exportacao:
+            return
+        quadros = self._totais[ETAPA_QUADRO]
+        cpu = time.process_time()
+        decorrido = agora - self._instante_anterior
+        logger.info("%.1f fps, CPU %.0f%%", (quadros - self._quadros_anteriores) / decorrido,
+                    100 * (cpu - self._cpu_anterior) / decorrido)
+        self._quadros_anteriores = quadros
+        self._instante_anterior = agora
+        self._cpu_anterior = cpu
+        self.exportar()
+        self._proxima_exportacao = time.perf_counter() + self.intervalo_exportacao
+
+    def exportar(self):
+        if not self.arquivo:
+            return
+        if self.arquivo.endswith('.prom'):
+            self._exportar_prometheus()
+        else:
+            self._exportar_csv()
+
+    def _exportar_csv(self):
+        novo = not os.path.exists(self.arquivo)
+        instante = time.time()
+        with open(self.arquivo, 'a', encoding='utf-8') as f:
+            if novo:
+                f.write('instante,etapa,amostras,p50_ms,p95_ms,p99_ms\n')
+            for etapa in self.etapas():
+                p = self.percentis(etapa)
+                if p:
+                    f.write(f"{instante:.3f},{etapa},{self._totais[etapa]},{p[50]:.3f},{p[95]:.3f},{p[99]:.3f}\n")
+
+    def _exportar_prometheus(self):
+        linhas = [
+            '# HELP exercicio_etapa_ms Tempo por etapa do loop de exercício (ms)',
+            '# TYPE exercicio_etapa_ms summary',
+        ]
+        for etapa in self.etapas():
+            p = self.percentis(etapa)
+            if not p:
+                continue
+            for percentil, valor in p.items():
+                linhas.append(f'exercicio_etapa_ms{{etapa="{etapa}",quantile="{percentil / 100}"}} {valor:.3f}')
+            linhas.append(f'exercicio_etapa_ms_count{{etapa="{etapa}"}} {self._totais[etapa]}')
+        # Escreve em um arquivo temporário e substitui, para o coletor nunca ler um arquivo pela metade
+        temporario = self.arquivo + '.tmp'
+        with open(temporario, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(linhas) + '\n')
+        os.replace(temporario, self.arquivo)
+
+    def resumo(self):
+        linhas = []
+        for etapa in self.etapas():
+            p = self.percentis(etapa)
+            if p:
+                linhas.append(f"{etapa}: p50 {p[50]:.2f} ms, p95 {p[95]:.2f} ms, p99 {p[99]:.2f} ms "
+                              f"({self._totais[etapa]} amostras)")
+        if self._totais[ETAPA_QUADRO]:
+            linhas.append(f"taxa média: {self.fps():.1f} fps ({self._totais[ETAPA_QUADRO]} quadros)")
+        return linhas + self.consumo()
+
+    def consumo(self):
+        # CPU do processo (todas as threads) e energia do pacote desde a criação
+        duracao = max(time.perf_counter() - self._inicio, 1e-9)
+        cpu = time.process_time() - self._cpu_inicio
+        linhas = [f"CPU do processo: {100 * cpu / duracao:.0f}% de um núcleo ({cpu:.1f} s em {duracao:.1f} s)"]
+        energia = ler_energia_rapl()
+        if energia is not None and self._energia_inicio is not None:
+            microjoules = energia - self._energia_inicio
+            if microjoules < 0:  # O contador dá a volta ao atingir o máximo
+                microjoules += ler_energia_rapl(ARQUIVO_RAPL_MAXIMO) or 0
+            linhas.append(f"energia do pacote da CPU (RAPL): {microjoules / 1e6:.1f} J, "
+                          f"potência média {microjoules / 1e6 / duracao:.1f} W")
+        return linhas
@@ -0,0 +1,572 @@
+"""Painel web ao vivo: vídeo anotado e eventos da contagem de cada estação, pela rede local.
+
+`PainelWeb` roda um servidor HTTP em segundo plano (http.server, uma thread por conexão):
+
+    /                   página com o vídeo e os contadores de todas as estações
+    /video/<estacao>    MJPEG (multipart/x-mixed-replace) com o quadro anotado
+    /quadro/<estacao>   o último quadro, em JPEG
+    /eventos            eventos da contagem em server-sent events
+    /estado             o último estado de cada estação, em JSON
+
+Cada quadro é codificado em JPEG uma única vez, pelo `EmissorPainel` da estação, em uma
+thread própria e só enquanto alguém assiste; os mesmos bytes vão para todas as conexões.
+Cada conexão envia sempre o quadro mais recente: um cliente lento recebe menos quadros,
+sem atrasar os demais nem o loop da contagem, que só copia o quadro para um buffer.
+
+Executado diretamente, faz um teste de carga em localhost com clientes simulados em outro
+processo e mede a latência de cada espectador, os quadros descartados e a CPU do servidor:
+
+    python painel.py --clientes 20 --lentos 5 --segundos 10
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import socket
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import quote, unquote, urlparse
+
+import cv2
+import numpy as np
+
+from exibicao import LimitadorExibicao
+
+PORTA_PADRAO = 8080
+QUALIDADE_JPEG = 70
+
+# Tipos de evento enviados por run_exercise
+TIPOS_EVENTO = ('inicio', 'repeticao', 'erro', 'descanso', 'serie', 'concluido', 'reinicio', 'fim')
+
+# Buffer de envio de cada conexão de vídeo (o sistema pode dobrar): cerca de um quadro na fila para um
+# cliente lento, que assim recebe sempre um quadro recente; 32 KB a 20 ms de ida e volta ainda passam 1,6 MB/s
+BUFFER_ENVIO = 16 * 1024
+
+# Uma conexão que não aceita dados por este tempo é encerrada
+TEMPO_LIMITE_ENVIO = 10.0
+
+# Intervalo dos comentários que mantêm a conexão de eventos aberta em proxies e tablets
+INTERVALO_HEARTBEAT = 15.0
+
+logger = logging.getLogger('painel')
+
+PAGINA = """<!doctype html>
+<html lang="pt-br"><head><meta charset="utf-8"><meta name="viewport" content="width=device-width, initial-scale=1">
+<title>Estações</title>
+<style>
+body { font-family: sans-serif; background: #111; color: #eee; margin: 0; display: flex; flex-wrap: wrap; }
+.estacao { margin: 8px; width: 480px; max-width: 100%; }
+.estacao img { width: 100%; background: #000; }
+.estado { font-size: 20px; } .aviso { font-size: 18px; color: #ff5; min-height: 1.2em; }
+</style></head><body>
+<script>
+const TIPOS = __TIPOS__;
+const estacoes = {};
+function estacao(nome) {
+  if (!estacoes[nome]) {
+    const div = document.createElement('div');
+    div.className = 'estacao';
+    div.innerHTML = '<h3></h3><img><div class="estado"></div><div class="aviso"></div>';
+    div.querySelector('h3').textContent = nome;
+    div.querySelector('img').src = '/video/' + encodeURIComponent(nome);
+    document.body.appendChild(div);
+    estacoes[nome] = div;
+  }
+  return estacoes[nome];
+}
+function mostrar(d) {
+  const div = estacao(d.estacao);
+  div.querySelector('h3').textContent = d.estacao + (d.exercicio ? ' - ' + d.exercicio : '');
+  div.querySelector('.estado').textContent = 'Série ' + d.serie + '  Repetições ' + d.contador + '  Erros ' + d.erros;
+  const avisos = {descanso: 'Descanso de ' + d.segundos + ' s', concluido: 'Exercício completo', erro: 'Erro: ' + d.motivo,
+                  fim: 'Sessão encerrada'};
+  div.querySelector('.aviso').textContent = avisos[d.tipo] || '';
+}
+fetch('/estado').then(r => r.json()).then(estado => Object.values(estado).forEach(mostrar));
+const fonte = new EventSource('/eventos');
+for (const tipo of TIPOS) fonte.addEventListener(tipo, e => mostrar(JSON.parse(e.data)));
+</script></body></html>
+""".replace('__TIPOS__', json.dumps(TIPOS_EVENTO))
+
+
+class CanalVideo:
+    # Último JPEG de uma estação; cada conexão espera um número de sequência maior que o último que enviou
+    def __init__(self):
+        self._cond = threading.Condition()
+        self.sequencia = 0
+        self.jpeg = None
+        self.tempo = 0.0
+        self.espectadores = 0
+
+    def publicar(self, jpeg, tempo):
+        with self._cond:
+            self.jpeg, self.tempo = jpeg, tempo
+            self.sequencia += 1
+            self._cond.notify_all()
+
+    def esperar(self, sequencia, timeout):
+        with self._cond:
+            self._cond.wait_for(lambda: self.sequencia > sequencia, timeout)
+            return self.sequencia, self.jpeg, self.tempo
+
+    def acordar(self):
+        with self._cond:
+            self._cond.notify_all()
+
+
+class PainelWeb:
+    """Servidor do painel; quadros e eventos chegam por `publicar_quadro` e `publicar_evento`.
+
+    Os eventos ficam em uma fila circular de `capacidade_eventos`, da qual cada conexão de
+    eventos lê os que ainda não enviou (com o cabeçalho Last-Event-ID, uma reconexão retoma
+    de onde parou). `ao_mudar_espectadores(estacao, quantidade)` é chamado quando o número de
+    conexões de vídeo de uma estação muda, para as estações só codificarem com alguém assistindo.
+    """
+
+    def __init__(self, porta=PORTA_PADRAO, endereco='0.0.0.0', capacidade_eventos=256, ao_mudar_espectadores=None):
+        self.endereco = endereco
+        self.porta = porta
+        self.ao_mudar_espectadores = ao_mudar_espectadores
+        self.canais = {}
+        self.estado = {}
+        self.parando = threading.Event()
+        self.quadros_enviados = 0
+        self.quadros_descartados = 0
+        self.conexoes = 0
+        self._eventos = deque(maxlen=capacidade_eventos)
+        self._id_evento = 0
+        self._cond_eventos = threading.Condition()
+        self._lock = threading.Lock()
+        self._servidor = None
+        self._thread = None
+
+    def iniciar(self):
+        self._servidor = _Servidor((self.endereco, self.porta), _Requisicao)
+        self._servidor.painel = self
+        self.porta = self._servidor.server_address[1]  # Com porta 0, a escolhida pelo sistema
+        self._thread = threading.Thread(target=self._servidor.serve_forever, name='painel', daemon=True)
+        self._thread.start()
+        return self
+
+    def parar(self):
+        self.parando.set()
+        for canal in list(self.canais.values()):
+            canal.acordar()
+        with self._cond_eventos:
+            self._cond_eventos.notify_all()
+        if self._servidor:
+            self._servidor.shutdown()
+            self._servidor.server_close()
+
+    def endereco_local(self):
+        endereco = self.endereco
+        if endereco in ('', '0.0.0.0'):
+            # Endereço pelo qual a máquina sai para a rede local (nenhum pacote é enviado)
+            with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+                try:
+                    s.connect(('10.255.255.255', 1))
+                    endereco = s.getsockname()[0]
+                except OSError:
+                    endereco = '127.0.0.1'
+        return f"http://{endereco}:{self.porta}/"
+
+    def canal(self, estacao):
+        with self._lock:
+            return self.canais.setdefault(estacao, CanalVideo())
+
+    def publicar_quadro(self, estacao, jpeg, tempo=None):
+        self.canal(estacao).publicar(jpeg, time.time() if tempo is None else tempo)
+
+    def publicar_evento(self, estacao, tipo, dados):
+        with self._cond_eventos:
+            self._id_evento += 1
+            dados = {'estacao': estacao, 'tipo': tipo, 'tempo': time.time(), **dados}
+            self.estado.setdefault(estacao, {}).update(dados)
+            self._eventos.append((self._id_evento, tipo, json.dumps(dados, ensure_ascii=False)))
+            self._cond_eventos.notify_all()
+
+    def eventos_desde(self, ultimo_id, timeout):
+        with self._cond_eventos:
+            self._cond_eventos.wait_for(lambda: self._id_evento > ultimo_id or self.parando.is_set(), timeout)
+            return [evento for evento in self._eventos if evento[0] > ultimo_id]
+
+    def estado_json(self):
+        # Serializa sob o mesmo lock de publicar_evento, que altera os dicionários de cada estação
+        with self._cond_eventos:
+            return json.dumps(self.estado, ensure_ascii=False)
+
+    def ultimo_evento(self):
+        with self._cond_eventos:
+            return self._id_evento
+
+    def tem_espectadores(self, estacao):
+        canal = self.canais.get(estacao)
+        return canal is not None and canal.espectadores > 0
+
+    def _mudar_espectadores(self, estacao, delta):
+        canal = self.canal(estacao)
+        with self._lock:
+            canal.espectadores += delta
+            self.conexoes += max(delta, 0)
+            quantidade = canal.espectadores
+        if self.ao_mudar_espectadores:
+            self.ao_mudar_espectadores(estacao, quantidade)
+
+    def _contar_envio(self, descartados):
+        with self._lock:
+            self.quadros_enviados += 1
+            self.quadros_descartados += descartados
+
+    def resumo(self):
+        return (f"painel ({self.endereco_local()}): {self.conexoes} conexões de vídeo, {self.quadros_enviados} quadros "
+                f"enviados, {self.quadros_descartados} descartados por clientes lentos")
+
+
+class _Servidor(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 64  # Vários tablets abrindo a página de uma vez (o padrão é 5)
+
+
+class _Requisicao(BaseHTTPRequestHandler):
+    server_version = 'PainelExercicio'
+
+    def log_message(self, formato, *args):
+        logger.debug("%s %s", self.address_string(), formato % args)
+
+    def do_GET(self):
+        painel = self.server.painel
+        caminho = unquote(urlparse(self.path).path)
+        try:
+            if caminho == '/':
+                self._responder('text/html; charset=utf-8', PAGINA.encode('utf-8'))
+            elif caminho == '/estado':
+                self._responder('application/json', painel.estado_json().encode('utf-8'))
+            elif caminho == '/eventos':
+                self._eventos(painel)
+            elif caminho.startswith('/video/'):
+                self._video(painel, caminho[len('/video/'):])
+            elif caminho.startswith('/quadro/'):
+                canal = painel.canais.get(caminho[len('/quadro/'):])
+                if canal is None or canal.jpeg is None:
+                    self.send_error(404, "Nenhum quadro desta estação")
+                else:
+                    self._responder('image/jpeg', canal.jpeg)
+            else:
+                self.send_error(404)
+        except (BrokenPipeError, ConnectionResetError, socket.timeout):
+            pass  # O cliente fechou a página ou parou de ler
+
+    def _responder(self, tipo, corpo):
+        self.send_response(200)
+        self.send_header('Content-Type', tipo)
+        self.send_header('Content-Length', str(len(corpo)))
+        self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def _video(self, painel, estacao):
+        self.connection.settimeout(TEMPO_LIMITE_ENVIO)
+        self.connection.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, BUFFER_ENVIO)
+        self.send_response(200)
+        self.send_header('Content-Type', 'multipart/x-mixed-replace; boundary=quadro')
+        self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+        canal = painel.canal(estacao)
+        painel._mudar_espectadores(estacao, 1)
+        try:
+            sequencia = 0
+            while not painel.parando.is_set():
+                nova, jpeg, tempo = canal.esperar(sequencia, timeout=1.0)
+                if nova == sequencia or jpeg is None:
+                    continue
+                # Sempre o quadro mais recente: os publicados durante o envio anterior são pulados
+                descartados = nova - sequencia - 1 if sequencia else 0
+                sequencia = nova
+                self.wfile.write(b'--quadro\r\nContent-Type: image/jpeg\r\nContent-Length: %d\r\nX-Tempo: %.6f\r\n\r\n'
+                                 % (len(jpeg), tempo))
+                self.wfile.write(jpeg)
+                self.wfile.write(b'\r\n')
+                painel._contar_envio(descartados)
+        finally:
+            painel._mudar_espectadores(estacao, -1)
+
+    def _eventos(self, painel):
+        self.connection.settimeout(TEMPO_LIMITE_ENVIO)
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream; charset=utf-8')
+        self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+        # Sem Last-Event-ID, só os eventos novos (o estado atual vem de /estado)
+        ultimo = self.headers.get('Last-Event-ID')
+        ultimo = int(ultimo) if ultimo and ultimo.isdigit() else painel.ultimo_evento()
+        while not painel.parando.is_set():
+            eventos = painel.eventos_desde(ultimo, INTERVALO_HEARTBEAT)
+            if not eventos:
+                self.wfile.write(b': \n\n')
+            for ultimo, tipo, dados in eventos:
+                self.wfile.write(f"id: {ultimo}\nevent: {tipo}\ndata: {dados}\n\n".encode('utf-8'))
+            self.wfile.flush()
+
+
+class DestinoPainel:
+    # Destino de um EmissorPainel no mesmo processo do PainelWeb
+    def __init__(self, painel, estacao):
+        self.painel = painel
+        self.estacao = estacao
+
+    def publicar_quadro(self, jpeg, tempo):
+        self.painel.publicar_quadro(self.estacao, jpeg, tempo)
+
+    def publicar_evento(self, tipo, dados):
+        self.painel.publicar_evento(self.estacao, tipo, dados)
+
+    def tem_espectadores(self):
+        return self.painel.tem_espectadores(self.estacao)
+
+
+class EmissorPainel:
+    """Lado da estação: entrega quadros e eventos ao painel sem bloquear o loop da contagem.
+
+    `quadro(imagem)` copia o quadro anotado para um buffer e acorda a thread de codificação,
+    no máximo `fps_maximo` vezes por segundo e só se o destino tem espectadores; um quadro
+    ainda não codificado é substituído pelo novo. A thread codifica em JPEG e entrega ao
+    `destino` (`DestinoPainel`, ou o painel do supervisor no modo multiestação), que também
+    recebe os eventos de `evento(tipo, **dados)`.
+    """
+
+    def __init__(self, destino, fps_maximo=15, qualidade=QUALIDADE_JPEG):
+        self.destino = destino
+        self.parametros = [cv2.IMWRITE_JPEG_QUALITY, qualidade]
+        self.limitador = LimitadorExibicao(fps_maximo)
+        self.codificados = 0
+        self.substituidos = 0
+        self.tempo_codificacao = 0.0
+        self._pendente = None
+        self._codificando = None
+        self._tempo_pendente = 0.0
+        self._tem_pendente = False
+        self._cond = threading.Condition()
+        self._rodando = True
+        self._thread = threading.Thread(target=self._loop, name='codificacao_painel', daemon=True)
+        self._thread.start()
+
+    def quadro(self, imagem):
+        if not self.destino.tem_espectadores() or not self.limitador.devido(time.perf_counter()):
+            return
+        with self._cond:
+            if self._pendente is None or self._pendente.shape != imagem.shape:
+                self._pendente = np.empty_like(imagem)
+            np.copyto(self._pendente, imagem)
+            self.substituidos += self._tem_pendente
+            self._tem_pendente = True
+            self._tempo_pendente = time.time()
+            self._cond.notify()
+
+    def evento(self, tipo, **dados):
+        self.destino.publicar_evento(tipo, dados)
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._tem_pendente or not self._rodando)
+                if not self._rodando:
+                    return
+                # Troca os buffers: o loop já pode copiar o próximo quadro enquanto este é codificado
+                self._pendente, self._codificando = self._codificando, self._pendente
+                self._tem_pendente = False
+                tempo = self._tempo_pendente
+            inicio = time.perf_counter()
+            ok, jpeg = cv2.imencode('.jpg', self._codificando, self.parametros)
+            self.tempo_codificacao += time.perf_counter() - inicio
+            if ok:
+                self.codificados += 1
+                self.destino.publicar_quadro(jpeg.tobytes(), tempo)
+
+    def fechar(self):
+        with self._cond:
+            self._rodando = False
+            self._cond.notify()
+        self._thread.join(timeout=2)
+
+    def resumo(self):
+        media = 1000 * self.tempo_codificacao / self.codificados if self.codificados else 0.0
+        return (f"painel: {self.codificados} quadros codificados ({media:.1f} ms cada), "
+                f"{self.substituidos} substituídos antes da codificação")
+
+
+def _quadro_sintetico(largura, altura, i, textura):
+    # Degradê com textura, uma figura em movimento e texto: perto do tamanho em JPEG de um quadro de câmera
+    quadro = np.empty((altura, largura, 3), dtype=np.uint8)
+    quadro[:] = np.linspace(40, 160, largura, dtype=np.uint8)[None, :, None]
+    quadro += textura
+    x = int(largura / 2 + largura / 4 * np.sin(i / 15))
+    cv2.circle(quadro, (x, altura // 2), altura // 8, (0, 0, 255), -1)
+    cv2.line(quadro, (0, altura // 3), (largura, altura // 3), (0, 255, 0), 2)
+    cv2.putText(quadro, f'Repeticao: {i // 30}', (50, 70), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 255), 2)
+    return quadro
+
+
+def _ler_cabecalhos(arquivo):
+    cabecalhos = {}
+    while True:
+        linha = arquivo.readline()
+        if not linha:
+            raise ConnectionError("conexão encerrada pelo servidor")
+        linha = linha.strip()
+        if not linha:
+            if cabecalhos:
+                return cabecalhos
+            continue  # Linha em branco depois do corpo do quadro anterior
+        if b':' in linha:
+            chave, valor = linha.split(b':', 1)
+            cabecalhos[chave.strip().lower().decode()] = valor.strip().decode()
+
+
+def _cliente_video(porta, estacao, segundos, banda, resultados):
+    # Espectador simulado: lê o MJPEG e mede a idade de cada quadro (cliente e servidor no mesmo relógio).
+    # Com `banda` (bytes/s), simula um tablet em um Wi-Fi lento: lê cada quadro e espera o tempo que ele
+    # levaria para chegar, com um buffer de recepção mínimo, como um enlace que não acumula dados
+    latencias = []
+    erro = None
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        if banda:
+            s.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+        s.connect(('127.0.0.1', porta))
+        s.sendall(f"GET /video/{quote(estacao)} HTTP/1.0\r\n\r\n".encode())
+        arquivo = s.makefile('rb')
+        while arquivo.readline().strip():
+            pass  # Linha de status e cabeçalhos da resposta
+        fim = time.time() + segundos
+        while time.time() < fim and not erro:
+            try:
+                cabecalhos = _ler_cabecalhos(arquivo)
+            except OSError as e:
+                erro = str(e)
+                break
+            tamanho = int(cabecalhos['content-length'])
+            arquivo.read(tamanho)
+            if banda:
+                time.sleep(tamanho / banda)
+            latencias.append(time.time() - float(cabecalhos['x-tempo']))
+    resultados.append({'lento': bool(banda), 'quadros': len(latencias), 'segundos': segundos,
+                       'latencias': latencias, 'erro': erro})
+
+
+def _cliente_eventos(porta, segundos, resultados):
+    # O loop simulado publica um evento por segundo, então a leitura não fica presa depois do fim
+    latencias = []
+    with socket.create_connection(('127.0.0.1', porta)) as s:
+        s.sendall(b"GET /eventos HTTP/1.0\r\n\r\n")
+        arquivo = s.makefile('rb')
+        fim = time.time() + segundos
+        while time.time() < fim:
+            linha = arquivo.readline()
+            if not linha:
+                break
+            if linha.startswith(b'data: '):
+                latencias.append(time.time() - json.loads(linha[6:])['tempo'])
+    resultados.append({'eventos': True, 'quadros': len(latencias), 'latencias': latencias})
+
+
+def _simular_clientes(porta, estacao, clientes, lentos, banda_lenta, segundos, fila):
+    # Processo separado, para que a CPU medida no servidor não inclua os clientes
+    resultados = []
+    threads = [threading.Thread(target=_cliente_video,
+                                args=(porta, estacao, segundos, banda_lenta if i < lentos else 0, resultados))
+               for i in range(clientes)]
+    threads.append(threading.Thread(target=_cliente_eventos, args=(porta, segundos, resultados)))
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    fila.put(resultados)
+
+
+def _produzir(emissor, quadros, segundos, fps):
+    # Loop de "contagem" sintético: um quadro a cada 1/fps s e um evento por segundo; retorna o custo de quadro()
+    custos = []
+    inicio = time.perf_counter()
+    i = 0
+    while time.perf_counter() - inicio < segundos:
+        t = time.perf_counter()
+        emissor.quadro(quadros[i % len(quadros)])
+        custos.append(time.perf_counter() - t)
+        if i % int(fps) == 0:
+            emissor.evento('repeticao', serie=1, contador=i // int(fps), erros=0)
+        i += 1
+        time.sleep(max(0.0, inicio + i / fps - time.perf_counter()))
+    return custos
+
+
+def _percentis(valores):
+    if not valores:
+        return "-"
+    p50, p95 = 1000 * np.percentile(valores, [50, 95])
+    return f"p50 {p50:.1f} ms, p95 {p95:.1f} ms"
+
+
+def testar_carga(clientes=10, lentos=2, banda_lenta=200.0, segundos=10.0, fps=30.0, fps_painel=15.0, largura=640,
+                 altura=480):
+    """Painel em localhost com uma estação sintética e espectadores simulados em outro processo.
+
+    Primeiro mede o servidor sem espectadores (nada é codificado), depois com `clientes`
+    conexões de vídeo, das quais `lentos` recebem só `banda_lenta` KB/s, e uma conexão de
+    eventos. Imprime a latência por espectador e a CPU do processo do servidor.
+    """
+    painel = PainelWeb(porta=0, endereco='127.0.0.1').iniciar()
+    emissor = EmissorPainel(DestinoPainel(painel, 'teste'), fps_maximo=fps_painel)
+    textura = np.random.default_rng(0).integers(0, 48, (altura, largura, 1), dtype=np.uint8)
+    quadros = [_quadro_sintetico(largura, altura, i, textura) for i in range(60)]
+    try:
+        cpu, relogio = time.process_time(), time.perf_counter()
+        custos_ociosos = _produzir(emissor, quadros, 2.0, fps)
+        cpu_ocioso = (time.process_time() - cpu) / (time.perf_counter() - relogio)
+
+        fila = multiprocessing.get_context('spawn').Queue()
+        processo = multiprocessing.get_context('spawn').Process(
+            target=_simular_clientes, args=(painel.porta, 'teste', clientes, lentos, 1024 * banda_lenta, segundos, fila))
+        processo.start()
+        cpu, relogio = time.process_time(), time.perf_counter()
+        custos = _produzir(emissor, quadros, segundos + 1.0, fps)
+        cpu_carga = (time.process_time() - cpu) / (time.perf_counter() - relogio)
+        resultados = fila.get(timeout=30)
+        processo.join()
+    finally:
+        emissor.fechar()
+        painel.parar()
+
+    print(f"{clientes} espectadores ({lentos} lentos, {banda_lenta:g} KB/s), quadros {largura}x{altura} a {fps:g} fps, "
+          f"painel até {fps_painel:g} fps")
+    print("espectador   quadros   fps   latência")
+    videos = sorted((r for r in resultados if not r.get('eventos')), key=lambda r: r['lento'])
+    for i, r in enumerate(videos):
+        print(f"{('lento ' if r['lento'] else 'normal ') + str(i):<10} {r['quadros']:9d} "
+              f"{r['quadros'] / r['segundos']:5.1f}   {_percentis(r['latencias'])}"
+              + (f"  (encerrado: {r['erro']})" if r['erro'] else ""))
+    for r in resultados:
+        if r.get('eventos'):
+            print(f"{'eventos':<10} {r['quadros']:9d}     -   {_percentis(r['latencias'])}")
+    normais = [l for r in videos if not r['lento'] for l in r['latencias']]
+    print(f"latência dos espectadores normais: {_percentis(normais)}")
+    print(emissor.resumo())
+    print(painel.resumo())
+    print(f"custo de quadro() no loop: sem espectadores {_percentis(custos_ociosos)}; com espectadores {_percentis(custos)}")
+    print(f"CPU do processo do servidor (inclui gerar os quadros sintéticos): sem espectadores {100 * cpu_ocioso:.0f}%, "
+          f"com espectadores {100 * cpu_carga:.0f}%")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Teste de carga do painel web em localhost com espectadores simulados")
+    parser.add_argument('--clientes', type=int, default=10, help="conexões de vídeo simultâneas")
+    parser.add_argument('--lentos', type=int, default=2, help="quantas delas leem devagar")
+    parser.add_argument('--banda-lenta', type=float, default=200.0, metavar='KB_S', help="banda de um cliente lento")
+    parser.add_argument('--segundos', type=float, default=10.0)
+    parser.add_argument('--fps', type=float, default=30.0, help="quadros por segundo do loop simulado")
+    parser.add_argument('--fps-painel', type=float, default=15.0, help="quadros por segundo enviados ao painel")
+    parser.add_argument('--largura', type=int, default=640)
+    parser.add_argument('--altura', type=int, default=480)
+    args = parser.parse_args()
+    testar_carga(args.clientes, args.lentos, args.banda_lenta, args.segundos, args.fps, args.fps_painel, args.largura,
+                 args.altura)
@@ -0,0 +1,181 @@
+import threading
+import time
+from collections import deque
+
+from captura import ETAPA_IDADE, idade_quadro
+from exibicao import ConversorCor
+from agendador import AgendadorInferencia, COMPLETA, PULAR
+from roi import RecorteROI, etapa_resolucao
+
+
+class FilaDescartavel:
+    # Fila limitada: quando cheia, o item mais antigo é descartado para dar lugar ao novo
+    def __init__(self, tamanho=2):
+        self._itens = deque(maxlen=tamanho)
+        self._cond = threading.Condition()
+        self.descartados = 0
+
+    def colocar(self, item):
+        with self._cond:
+            if len(self._itens) == self._itens.maxlen:
+                self.descartados += 1
+            self._itens.append(item)
+            self._cond.notify()
+
+    def obter_mais_recente(self, timeout=None):
+        # Retorna o item mais novo e descarta os antigos (None se expirar o timeout)
+        with self._cond:
+            if not self._itens and not self._cond.wait_for(lambda: self._itens, timeout):
+                return None
+            item = self._itens.pop()
+            self.descartados += len(self._itens)
+            self._itens.clear()
+            return item
+
+    def __len__(self):
+        return len(self._itens)
+
+
+class EstatisticasEtapa:
+    # Contadores de uma etapa do pipeline: quadros, fps e profundidade média da fila de entrada
+    def __init__(self, nome):
+        self.nome = nome
+        self.quadros = 0
+        self.inicio = None
+        self.soma_fila = 0
+        self.soma_latencia = 0.0
+        self.amostras_latencia = 0
+
+    def registrar(self, profundidade_fila=0, latencia=None):
+        if self.inicio is None:
+            self.inicio = time.perf_counter()
+        self.quadros += 1
+        self.soma_fila += profundidade_fila
+        if latencia is not None:
+            self.soma_latencia += latencia
+            self.amostras_latencia += 1
+
+    def fps(self):
+        if self.inicio is None:
+            return 0.0
+        duracao = time.perf_counter() - self.inicio
+        return self.quadros / duracao if duracao > 0 else 0.0
+
+    def resumo(self):
+        texto = f"{self.nome}: {self.quadros} quadros, {self.fps():.1f} fps"
+        if self.quadros:
+            texto += f", fila média {self.soma_fila / self.quadros:.2f}"
+        if self.amostras_latencia:
+            texto += f", latência média {1000 * self.soma_latencia / self.amostras_latencia:.1f} ms"
+        return texto
+
+
+class PipelinePose:
+    """Captura e inferência em threads próprias, ligadas por filas que descartam quadros antigos.
+
+    A thread de captura esvazia continuamente o buffer do driver; a de inferência sempre
+    processa o quadro mais novo com o estimador `pose`; a etapa de exibição (thread principal,
+    por causa do cv2.imshow) consome o resultado mais recente através de `proximo()`, como
+    (quadro, landmarks, inferido, instante da captura). O `agendador` decide em quais quadros
+    a pose é inferida; nos demais o quadro segue com `inferido` falso e sem landmarks. O `roi`
+    define o recorte e a resolução entregues ao modelo; a conversão para RGB usa buffers
+    pré-alocados da thread de inferência.
+    """
+
+    def __init__(self, cap, pose, tamanho_fila=2, metricas=None, agendador=None, roi=None):
+        self.cap = cap
+        self.pose = pose
+        self.metricas = metricas
+        self.agendador = agendador or AgendadorInferencia(ativo=False)
+        self.roi = roi or RecorteROI(ativo=False)
+        self.conversor = ConversorCor()
+        self.fila_quadros = FilaDescartavel(tamanho_fila)
+        self.fila_resultados = FilaDescartavel(tamanho_fila)
+        self.stats_captura = EstatisticasEtapa('captura')
+        self.stats_inferencia = EstatisticasEtapa('inferência')
+        self.stats_exibicao = EstatisticasEtapa('exibição')
+        self.encerrado = threading.Event()
+        self._rodando = threading.Event()
+        self._threads = []
+
+    def iniciar(self):
+        self._rodando.set()
+        self._threads = [
+            threading.Thread(target=self._loop_captura, name='captura', daemon=True),
+            threading.Thread(target=self._loop_inferencia, name='inferencia', daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def parar(self):
+        self._rodando.clear()
+        for thread in self._threads:
+            thread.join(timeout=2)
+        self._threads = []
+
+    def _loop_captura(self):
+        while self._rodando.is_set():
+            inicio = time.perf_counter()
+            ret, frame = self.cap.read()
+            if self.metricas:
+                self.metricas.registrar('captura', inicio)
+                idade = idade_quadro(self.cap)
+                if idade is not None:
+                    self.metricas.registrar_duracao(ETAPA_IDADE, idade)
+            if not ret:
+                print("Falha ao capturar imagem da câmera.")
+                self.encerrado.set()
+                break
+            self.fila_quadros.colocar((frame, time.perf_counter()))
+            self.stats_captura.registrar()
+
+    def _loop_inferencia(self):
+        while self._rodando.is_set():
+            profundidade = len(self.fila_quadros)
+            item = self.fila_quadros.obter_mais_recente(timeout=0.1)
+            if item is None:
+                if self.encerrado.is_set():
+                    break
+                continue
+            frame, t_captura = item
+
+            inicio = time.perf_counter()
+            decisao = self.agendador.decidir(frame, inicio)
+            landmarks = None
+            if decisao != PULAR:
+                if decisao == COMPLETA:
+                    entrada, caixa = self.roi.recortar(frame)
+                else:
+                    entrada, caixa = self.agendador.entrada(frame, decisao), None
+                image = self.conversor.converter(entrada)
+                meio = time.perf_counter()
+                landmarks = self.pose.processar(image)
+                fim = time.perf_counter()
+                self.roi.mapear(landmarks, caixa)
+                self.agendador.registrar(landmarks is not None, fim)
+                if self.metricas:
+                    self.metricas.registrar_duracao('conversao', meio - inicio)
+                    self.metricas.registrar_duracao('inferencia', fim - meio)
+                    self.metricas.registrar_duracao(etapa_resolucao(image), fim - meio)
+
+            # O quadro original (BGR) segue para a exibição, sem conversão de volta
+            self.fila_resultados.colocar((frame, landmarks, decisao != PULAR, t_captura))
+            self.stats_inferencia.registrar(profundidade)
+
+    def proximo(self, timeout=1.0):
+        # Resultado mais recente para a etapa de exibição/contagem (None se nada chegou)
+        profundidade = len(self.fila_resultados)
+        item = self.fila_resultados.obter_mais_recente(timeout)
+        if item is not None:
+            self.stats_exibicao.registrar(profundidade, time.perf_counter() - item[-1])
+        return item
+
+    def resumo(self):
+        return [
+            self.stats_captura.resumo(),
+            self.stats_inferencia.resumo(),
+            self.stats_exibicao.resumo(),
+            f"quadros descartados: captura→inferência {self.fila_quadros.descartados}, "
+            f"inferência→exibição {self.fila_resultados.descartados}",
+        ]
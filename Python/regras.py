@@ -0,0 +1,101 @@
+import numpy as np
+
+# Landmarks do MediaPipe Pose pelo nome usado em exercicios.txt: (esquerdo, direito)
+LANDMARKS = {
+    'nariz': (0,),
+    'ombro': (11, 12),
+    'cotovelo': (13, 14),
+    'punho': (15, 16),
+    'quadril': (23, 24),
+    'joelho': (25, 26),
+    'tornozelo': (27, 28),
+}
+
+# 'subir': a repetição conta quando o alvo passa acima da linha verde (elevação lateral);
+# 'descer': quando passa abaixo dela (agachamento, flexão)
+SENTIDOS = ('subir', 'descer')
+
+# Regra usada quando o exercício não define uma: cotovelos em relação à linha dos ombros
+REGRA_PADRAO = {'alvo': 'cotovelo', 'referencia': 'ombro', 'sentido': 'subir', 'tolerancia': 1.0}
+
+# Códigos das regiões de cada alvo. Com sentido 'descer', 'acima_verde' significa além da
+# linha verde no sentido do movimento (abaixo dela na imagem), e 'abaixo_vermelha' o oposto.
+ACIMA_VERDE, ENTRE_LINHAS, ABAIXO_VERMELHA = 0, 1, 2
+NOMES_REGIOES = ('acima_verde', 'entre_linhas', 'abaixo_vermelha')
+
+
+def _indices(nome):
+    # Nome de LANDMARKS ou índices separados por vírgula ("23,24")
+    nome = str(nome).strip().lower()
+    if nome in LANDMARKS:
+        return LANDMARKS[nome]
+    try:
+        indices = tuple(int(i) for i in nome.split(','))
+    except ValueError:
+        raise ValueError(f"Landmark desconhecido: '{nome}'") from None
+    if not all(0 <= i < 33 for i in indices):
+        raise ValueError(f"Índices de landmark fora de 0-32: '{nome}'")
+    return indices
+
+
+class RegraExercicio:
+    """Definição de um exercício compilada em arrays de índices e limites.
+
+    `indices` seleciona de uma vez os landmarks de referência seguidos dos alvos esquerdo e
+    direito; a linha de referência é a média dos primeiros. `sinal` espelha as coordenadas no
+    sentido 'descer', de modo que as duas comparações com as linhas são sempre '<' (verde) e
+    '>' (vermelha), e `minimos`/`maximos` limitam cada linha à borda da imagem do lado certo.
+    Tudo funciona tanto para um quadro (k,) quanto para uma sessão inteira (quadros, k).
+    """
+
+    def __init__(self, alvo='cotovelo', referencia='ombro', sentido='subir', tolerancia=1.0):
+        alvos = _indices(alvo)
+        referencias = _indices(referencia)
+        sentido = str(sentido).strip().lower()
+        if len(alvos) != 2:
+            raise ValueError(f"O alvo deve ter dois landmarks (esquerdo e direito): '{alvo}'")
+        if sentido not in SENTIDOS:
+            raise ValueError(f"Sentido desconhecido: '{sentido}' (use {' ou '.join(SENTIDOS)})")
+
+        self.definicao = {'alvo': alvo, 'referencia': referencia, 'sentido': sentido, 'tolerancia': float(tolerancia)}
+        self.tolerancia = float(tolerancia)
+        self.indices = np.array(referencias + alvos, dtype=np.intp)
+        self.n_referencias = len(referencias)
+        self.sinal = 1.0 if sentido == 'subir' else -1.0
+
+        # Colunas [verde, vermelha]; ao subir a verde não passa do topo e a vermelha da base
+        if sentido == 'subir':
+            self.minimos = np.array([0.0, -np.inf])
+            self.maximos = np.array([np.inf, 1.0])
+        else:
+            self.minimos = np.array([-np.inf, 0.0])
+            self.maximos = np.array([1.0, np.inf])
+
+    def limites(self, alturas, offsets):
+        # Linhas verde e vermelha (..., 2) a partir das coordenadas y em `indices` (..., k)
+        referencia = alturas[..., :self.n_referencias].mean(axis=-1)
+        return np.clip(referencia[..., None] + offsets, self.minimos, self.maximos)
+
+    def regioes(self, alturas, limites):
+        # Código da região (..., 2) dos alvos esquerdo e direito
+        alvos = self.sinal * alturas[..., self.n_referencias:]
+        linhas = self.sinal * limites
+        return np.where(alvos < linhas[..., :1], ACIMA_VERDE,
+                        np.where(alvos > linhas[..., 1:], ABAIXO_VERMELHA, ENTRE_LINHAS))
+
+
+def criar_regra(definicao=None):
+    """Compila a regra de um exercício a partir dos campos chave=valor de exercicios.txt.
+
+    Chaves: alvo, referencia (nomes de LANDMARKS ou índices), sentido ('subir' ou 'descer') e
+    tolerancia (segundos entre os lados). As ausentes vêm de REGRA_PADRAO.
+    """
+    if isinstance(definicao, RegraExercicio):
+        return definicao
+    desconhecidas = set(definicao or {}) - set(REGRA_PADRAO)
+    if desconhecidas:
+        raise ValueError(f"Campos desconhecidos na regra: {', '.join(sorted(desconhecidas))}")
+    try:
+        return RegraExercicio(**{**REGRA_PADRAO, **(definicao or {})})
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Regra inválida {definicao}: {e}") from None
@@ -0,0 +1,235 @@
+import io
+import json
+import queue
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+
+def _grafico_png(repetition_results):
+    # Renderiza o gráfico em memória com o backend Agg, sem pyplot nem arquivo temporário
+    import matplotlib
+    matplotlib.use('Agg')
+    from matplotlib.figure import Figure
+
+    # Calcular resultados cumulativos
+    acumulado_acertos = []
+    acumulado_erros = []
+    acertos = 0
+    erros = 0
+    for resultado in repetition_results:
+        if resultado == 1:
+            acertos += 1
+        else:
+            erros += 1
+        acumulado_acertos.append(acertos)
+        acumulado_erros.append(erros)
+
+    fig = Figure(figsize=(10, 6))
+    ax = fig.subplots()
+    ax.plot(range(1, len(acumulado_acertos) + 1), acumulado_acertos, label='Acertos', marker='o')
+    ax.plot(range(1, len(acumulado_erros) + 1), acumulado_erros, label='Erros', marker='x')
+    ax.set_title('Acertos e Erros por Repetição')
+    ax.set_xlabel('Número de Repetições')
+    ax.set_ylabel('Quantidade')
+    ax.legend()
+    ax.grid(True)
+
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png')
+    buffer.seek(0)
+    return buffer
+
+
+def _grafico_cinematica_png(repeticoes):
+    # Amplitude de cada lado e tempos de ida, volta e entre as linhas por repetição (ver cinematica.py)
+    import matplotlib
+    matplotlib.use('Agg')
+    from matplotlib.figure import Figure
+    from matplotlib.ticker import MaxNLocator
+
+    numeros = [r.get('numero', n) for n, r in enumerate(repeticoes, 1)]
+    fig = Figure(figsize=(10, 7))
+    ax_amplitude, ax_tempos = fig.subplots(2, 1, sharex=True)
+    ax_amplitude.plot(numeros, [r['amplitude'][0] for r in repeticoes], label='Esquerdo', marker='o')
+    ax_amplitude.plot(numeros, [r['amplitude'][1] for r in repeticoes], label='Direito', marker='o')
+    erros = [n for n, r in zip(numeros, repeticoes) if not r['resultado']]
+    for n in erros:
+        ax_amplitude.axvspan(n - 0.4, n + 0.4, color='red', alpha=0.1)
+    ax_amplitude.set_title('Amplitude por Repetição' + (' (erros em vermelho)' if erros else ''))
+    ax_amplitude.set_ylabel('Graus')
+    ax_amplitude.legend()
+    ax_amplitude.grid(True)
+
+    largura = 0.27
+    ax_tempos.bar([n - largura for n in numeros], [r['tempo_ida'] for r in repeticoes], largura, label='Ida')
+    ax_tempos.bar(numeros, [r['tempo_volta'] for r in repeticoes], largura, label='Volta')
+    ax_tempos.bar([n + largura for n in numeros], [max(r['entre_linhas']) for r in repeticoes], largura,
+                  label='Entre as linhas')
+    ax_tempos.set_title('Tempos por Repetição')
+    ax_tempos.set_xlabel('Número da Repetição')
+    ax_tempos.xaxis.set_major_locator(MaxNLocator(integer=True))
+    ax_tempos.set_ylabel('Segundos')
+    ax_tempos.legend()
+    ax_tempos.grid(True, axis='y')
+    fig.tight_layout()
+
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png')
+    buffer.seek(0)
+    return buffer
+
+
+def _tabela_cinematica(pdf, repeticoes):
+    colunas = (('Nº', 10), ('Result.', 16), ('Duração (s)', 22), ('Amplitude E/D (°)', 30), ('Média±dp (°)', 26),
+               ('Ida/Volta (s)', 24), ('Vel. pico (°/s)', 24), ('Assim. (°)', 18), ('Entre linhas (s)', 20))
+    pdf.set_font("Arial", 'B', 8)
+    for titulo, largura in colunas:
+        pdf.cell(largura, 6, titulo, border=1, align='C')
+    pdf.ln()
+    pdf.set_font("Arial", size=8)
+    for numero, r in enumerate(repeticoes, 1):
+        valores = (
+            str(r.get('numero', numero)),
+            'Acerto' if r['resultado'] else 'Erro',
+            f"{r['duracao']:.1f}",
+            f"{r['amplitude'][0]:.0f} / {r['amplitude'][1]:.0f}",
+            f"{sum(r['media']) / 2:.0f} ± {max(r['desvio']):.0f}",
+            f"{r['tempo_ida']:.1f} / {r['tempo_volta']:.1f}",
+            f"{r['velocidade_pico']:.0f}",
+            f"{r['assimetria_media']:.0f}",
+            f"{r['entre_linhas'][0]:.1f} / {r['entre_linhas'][1]:.1f}",
+        )
+        for valor, (_, largura) in zip(valores, colunas):
+            pdf.cell(largura, 6, valor, border=1, align='C')
+        pdf.ln()
+
+
+def gerar_relatorio_pdf(exercicio, nSerie, rSerie, tempo_descanso, offset_verde, offset_vermelho, total_acertos, total_erros, repetition_results,
+                        desempenho=None, repeticoes=None):
+    from fpdf import FPDF
+
+    # Criar o PDF
+    pdf = FPDF()
+    pdf.add_page()
+
+    # Título
+    pdf.set_font("Arial", 'B', 16)
+    pdf.cell(0, 10, "Relatório de Exercício", ln=True, align='C')
+
+    pdf.ln(10)
+
+    # Dados do exercício
+    pdf.set_font("Arial", size=12)
+    pdf.cell(0, 10, f"Exercício: {exercicio}", ln=True)
+    pdf.cell(0, 10, f"Número de Repetições por Série: {nSerie}", ln=True)
+    pdf.cell(0, 10, f"Número de Séries: {rSerie}", ln=True)
+    pdf.cell(0, 10, f"Tempo de Descanso entre Séries: {tempo_descanso} segundos", ln=True)
+    pdf.cell(0, 10, f"Offset da Linha Verde: {offset_verde}", ln=True)
+    pdf.cell(0, 10, f"Offset da Linha Vermelha: {offset_vermelho}", ln=True)
+    pdf.cell(0, 10, f"Total de Acertos: {total_acertos}", ln=True)
+    pdf.cell(0, 10, f"Total de Erros: {total_erros}", ln=True)
+
+    pdf.ln(10)
+
+    # Inserir o gráfico
+    pdf.image(_grafico_png(repetition_results), x=10, w=190)
+
+    # Cinemática de cada repetição (amplitude, tempos, velocidade e assimetria)
+    if repeticoes:
+        pdf.add_page()
+        pdf.set_font("Arial", 'B', 12)
+        pdf.cell(0, 10, "Cinemática por repetição", ln=True)
+        pdf.set_font("Arial", size=9)
+        pdf.multi_cell(0, 5, "Ângulo do segmento referência-alvo com a vertical, por lado (E/D). Cada repetição vai do "
+                             "evento anterior até o seu; ida é o movimento no sentido do exercício. Média±dp: média dos "
+                             "dois lados e o maior desvio padrão. Assimetria: diferença média entre os ângulos dos lados."
+                             " Nº é o número da repetição no gráfico de resultados; eventos sem janela completa (o "
+                             "erro logo após um acerto, com os braços ainda no alto) não aparecem na tabela.")
+        pdf.ln(2)
+        _tabela_cinematica(pdf, repeticoes)
+        pdf.ln(5)
+        pdf.image(_grafico_cinematica_png(repeticoes), x=10, w=190)
+
+    # Tempos por etapa do loop (p50/p95/p99)
+    if desempenho:
+        pdf.ln(5)
+        pdf.set_font("Arial", 'B', 12)
+        pdf.cell(0, 10, "Desempenho por etapa", ln=True)
+        pdf.set_font("Arial", size=10)
+        for linha in desempenho:
+            pdf.cell(0, 6, linha, ln=True)
+
+    # Salvar o PDF (sufixo aleatório evita colisão entre sessões no mesmo segundo)
+    report_filename = f"Relatorio_{exercicio}_{int(time.time())}_{uuid.uuid4().hex[:6]}.pdf"
+    pdf.output(report_filename)
+    print(f"Relatório gerado: {report_filename}")
+    return report_filename
+
+
+class GeradorRelatorios:
+    # Gera os PDFs em uma thread de fundo; a interface volta ao diálogo de configuração imediatamente
+    def __init__(self):
+        self._fila = queue.Queue()
+        self._thread = threading.Thread(target=self._loop, name='relatorios', daemon=True)
+        self._thread.start()
+
+    def enviar(self, *args, **kwargs):
+        self._fila.put((args, kwargs))
+
+    def _loop(self):
+        while True:
+            tarefa = self._fila.get()
+            if tarefa is None:
+                break
+            args, kwargs = tarefa
+            try:
+                gerar_relatorio_pdf(*args, **kwargs)
+            except Exception as e:
+                print(f"Erro ao gerar o relatório: {e}")
+            finally:
+                self._fila.task_done()
+
+    def pendentes(self):
+        return self._fila.qsize()
+
+    def encerrar(self):
+        # Aguarda os relatórios pendentes antes de sair do programa
+        if self.pendentes():
+            print(f"Aguardando {self.pendentes()} relatório(s) pendente(s)...")
+        self._fila.put(None)
+        self._thread.join()
+
+
+def _gerar_sessao(sessao):
+    return gerar_relatorio_pdf(**sessao)
+
+
+def gerar_relatorios_lote(sessoes, processos=None):
+    # Gera os relatórios de várias sessões em paralelo; cada sessão é um dict com os argumentos de gerar_relatorio_pdf
+    with ProcessPoolExecutor(max_workers=processos) as executor:
+        return list(executor.map(_gerar_sessao, sessoes))
+
+
+def sessoes_do_resumo_lote(caminho_resumo):
+    # Converte o resumo JSON do modo --lote nas sessões aceitas por gerar_relatorios_lote
+    with open(caminho_resumo, encoding='utf-8') as f:
+        resumo = json.load(f)
+    params = resumo['parametros']
+    sessoes = []
+    for video in resumo['videos']:
+        if 'erro' in video:
+            continue
+        sessoes.append({
+            'exercicio': resumo['exercicio'],
+            'nSerie': params['repeticoes'],
+            'rSerie': params['series'],
+            'tempo_descanso': params['descanso'],
+            'offset_verde': params['offset_verde'],
+            'offset_vermelho': params['offset_vermelho'],
+            'total_acertos': video['acertos'],
+            'total_erros': video['erros'],
+            'repetition_results': video['repetition_results'],
+        })
+    return sessoes
@@ -0,0 +1,116 @@
+import numpy as np
+
+from exibicao import redimensionar
+
+# Landmarks com visibilidade abaixo disto não definem a caixa (a menos que nenhum passe)
+VISIBILIDADE_MINIMA = 0.5
+
+# Lado mínimo da caixa em pixels, para uma pose parcial não gerar um recorte minúsculo
+LADO_MINIMO = 96
+
+
+def etapa_resolucao(imagem):
+    # Nome da etapa de métricas para a resolução de entrada (maior lado, arredondado a 32 px)
+    return f"inferencia_{32 * round(max(imagem.shape[:2]) / 32)}px"
+
+
+class RecorteROI:
+    """Recorte em torno da pessoa e resolução de entrada do modelo de pose.
+
+    `recortar` devolve a imagem entregue ao modelo: com `ativo`, só a caixa em torno dos
+    últimos landmarks (com `margem` de folga em cada lado); em todo caso reduzida para que o
+    maior lado não passe de `lado_maximo`. `mapear` converte o array (33, 4) de landmarks
+    do estimador, no lugar, de coordenadas do recorte para coordenadas do quadro inteiro, e
+    atualiza a caixa.
+    A caixa só é recalculada quando algum landmark sai da sua parte central, para não
+    tremer a cada quadro; quando a pose se perde ela é ampliada por `expansao` a cada quadro
+    até voltar ao quadro inteiro.
+    """
+
+    def __init__(self, ativo=True, lado_maximo=None, margem=0.25, expansao=1.5):
+        self.ativo = ativo
+        self.lado_maximo = lado_maximo
+        self.margem = margem
+        self.expansao = expansao
+        self.caixa = None  # (x0, y0, x1, y1) em pixels; None é o quadro inteiro
+        self._tamanho = None
+        self.perdas = 0
+        self._soma_area = 0.0
+        self._recortes = 0
+        self._reduzida = None  # Buffer da imagem reduzida, reaproveitado enquanto o tamanho não muda
+
+    def recortar(self, frame):
+        altura, largura = frame.shape[:2]
+        self._tamanho = (largura, altura)
+        caixa = self.caixa if self.ativo else None
+        entrada = frame
+        if caixa is not None:
+            x0, y0, x1, y1 = caixa
+            entrada = frame[y0:y1, x0:x1]
+            self._soma_area += (x1 - x0) * (y1 - y0) / (largura * altura)
+        else:
+            self._soma_area += 1.0
+        self._recortes += 1
+        if self.lado_maximo and max(entrada.shape[:2]) > self.lado_maximo:
+            fator = self.lado_maximo / max(entrada.shape[:2])
+            entrada = self._reduzida = redimensionar(entrada, fator, self._reduzida)
+        return entrada, caixa
+
+    def mapear(self, landmarks, caixa):
+        # `caixa` é a devolvida por recortar (None: a imagem era o quadro inteiro, reduzido ou não)
+        if landmarks is None:
+            self._perder()
+            return
+        if caixa is not None:
+            largura, altura = self._tamanho
+            x0, y0, x1, y1 = caixa
+            escala_x = (x1 - x0) / largura
+            landmarks[:, 0] = x0 / largura + landmarks[:, 0] * escala_x
+            landmarks[:, 1] = y0 / altura + landmarks[:, 1] * ((y1 - y0) / altura)
+            landmarks[:, 2] *= escala_x  # z usa a mesma escala de x
+        if self.ativo and self._tamanho is not None:
+            self._atualizar(landmarks)
+
+    def _atualizar(self, landmarks):
+        largura, altura = self._tamanho
+        pontos = landmarks[landmarks[:, 3] >= VISIBILIDADE_MINIMA]
+        if not len(pontos):
+            pontos = landmarks
+        xs = np.clip(pontos[:, 0], 0, 1) * largura
+        ys = np.clip(pontos[:, 1], 0, 1) * altura
+
+        if self.caixa is not None:
+            x0, y0, x1, y1 = self.caixa
+            folga_x = (x1 - x0) * self.margem / 2
+            folga_y = (y1 - y0) * self.margem / 2
+            if (xs.min() >= x0 + folga_x and xs.max() <= x1 - folga_x
+                    and ys.min() >= y0 + folga_y and ys.max() <= y1 - folga_y):
+                return
+
+        lado_x = max((xs.max() - xs.min()) * (1 + 2 * self.margem), LADO_MINIMO)
+        lado_y = max((ys.max() - ys.min()) * (1 + 2 * self.margem), LADO_MINIMO)
+        self._definir((xs.max() + xs.min()) / 2, (ys.max() + ys.min()) / 2, lado_x, lado_y)
+
+    def _perder(self):
+        if self.caixa is None:
+            return
+        self.perdas += 1
+        x0, y0, x1, y1 = self.caixa
+        self._definir((x0 + x1) / 2, (y0 + y1) / 2, (x1 - x0) * self.expansao, (y1 - y0) * self.expansao)
+
+    def _definir(self, centro_x, centro_y, lado_x, lado_y):
+        largura, altura = self._tamanho
+        x0 = max(0, int(centro_x - lado_x / 2))
+        y0 = max(0, int(centro_y - lado_y / 2))
+        x1 = min(largura, int(centro_x + lado_x / 2))
+        y1 = min(altura, int(centro_y + lado_y / 2))
+        # Uma caixa que cobre quase todo o quadro não compensa o recorte
+        if (x1 - x0) * (y1 - y0) >= 0.9 * largura * altura:
+            self.caixa = None
+        else:
+            self.caixa = (x0, y0, x1, y1)
+
+    def resumo(self):
+        area = 100 * self._soma_area / self._recortes if self._recortes else 100.0
+        limite = f", maior lado até {self.lado_maximo} px" if self.lado_maximo else ""
+        return f"ROI: área média {area:.0f}% do quadro{limite}, {self.perdas} perdas de rastreamento"
@@ -0,0 +1,165 @@
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from captura import configurar, descrever, ler_configuracao
+from estimadores import (AUTOMATICO, ESTIMADOR_PADRAO, ORCAMENTO_PADRAO, PRECISAO_ONNX_PADRAO, calibrar, criar_estimador,
+                         resumo_calibracao)
+from serial_arduino import EscritorSerial
+
+# Quadros da câmera usados na calibração dos estimadores
+QUADROS_CALIBRACAO = 10
+
+
+class RuntimeExercicio:
+    """Pose, câmera e porta serial mantidas abertas entre sessões.
+
+    `preaquecer()` abre a câmera e cria o estimador de pose em segundo plano enquanto o diálogo
+    de configuração está aberto; com `estimador='auto'`, antes mede os estimadores disponíveis
+    em quadros da câmera e fica com o mais preciso que cabe em `orcamento_ms` por quadro.
+    `preparar()` é chamado no início de cada sessão e informa se tudo já estava pronto
+    (partida a quente) ou se precisou ser inicializado na hora.
+    `captura` é a configuração pedida ao driver da câmera (ver captura.py), aplicada ao abrir
+    e trocada por `aplicar_captura` quando uma sessão pede outra; vídeos não são configurados.
+    `serial` é um escritor já aberto por quem cria o runtime (o canal de uma porta do
+    supervisor, ver estacoes.py), usado em todas as sessões no lugar da porta de cada uma.
+    """
+
+    def __init__(self, indice_camera=0, estimador=ESTIMADOR_PADRAO, orcamento_ms=ORCAMENTO_PADRAO, modelo_onnx=None,
+                 captura=None, precisao_onnx=PRECISAO_ONNX_PADRAO, serial=None):
+        self.indice_camera = indice_camera
+        self.captura = captura or {}
+        self.captura_aceita = None  # Configuração lida de volta do driver
+        self.estimador = estimador
+        self.orcamento_ms = orcamento_ms
+        self.modelo_onnx = modelo_onnx
+        self.precisao_onnx = precisao_onnx
+        self.calibracao = []  # Linhas do resumo da calibração, para o relatório de cada sessão
+        self.pose = None
+        self.cap = None
+        self.ser = serial
+        self._serial_externo = serial is not None
+        self.tempos_inicializacao = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def preaquecer(self):
+        self._thread = threading.Thread(target=self._inicializar, name='preaquecimento', daemon=True)
+        self._thread.start()
+        return self
+
+    def _inicializar(self):
+        with self._lock:
+            quadros = []
+            if self.cap is None or not self.cap.isOpened():
+                inicio = time.perf_counter()
+                self.cap = cv2.VideoCapture(self.indice_camera)  # Índice da câmera ou caminho/URL de vídeo
+                if self.captura and not isinstance(self.indice_camera, str):
+                    self.captura_aceita = configurar(self.cap, self.captura)
+                ret, frame = self.cap.read()  # O primeiro quadro conclui a negociação com o driver
+                if ret:
+                    quadros.append(frame)
+                self.tempos_inicializacao['camera'] = time.perf_counter() - inicio
+
+            if self.pose is None:
+                nome = self.estimador
+                if nome == AUTOMATICO:
+                    inicio = time.perf_counter()
+                    nome = self._calibrar(quadros)
+                    self.tempos_inicializacao['calibracao_pose'] = time.perf_counter() - inicio
+                else:
+                    self.calibracao = [f"estimador de pose: {nome}"]
+                inicio = time.perf_counter()
+                self.pose = criar_estimador(nome, self.modelo_onnx, self.precisao_onnx)
+                # Uma inferência em imagem vazia conclui a inicialização do modelo antes do primeiro quadro real
+                self.pose.processar(np.zeros((256, 256, 3), dtype=np.uint8))
+                self.tempos_inicializacao['modelo_pose'] = time.perf_counter() - inicio
+
+    def _calibrar(self, quadros):
+        # Quadros reais da câmera (de um vídeo, os primeiros); a imagem vazia só se nada puder ser lido
+        while self.cap.isOpened() and len(quadros) < QUADROS_CALIBRACAO:
+            ret, frame = self.cap.read()
+            if not ret:
+                break
+            quadros.append(frame)
+        if isinstance(self.indice_camera, str):
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+        imagens = [cv2.cvtColor(q, cv2.COLOR_BGR2RGB) for q in quadros] or [np.zeros((480, 640, 3), dtype=np.uint8)]
+        nome, medicoes = calibrar(imagens, self.orcamento_ms, self.modelo_onnx, precisao_onnx=self.precisao_onnx)
+        self.calibracao = resumo_calibracao(nome, medicoes, self.orcamento_ms)
+        for linha in self.calibracao:
+            print(linha)
+        return nome
+
+    def aplicar_captura(self, captura):
+        # Reabre a câmera se a sessão pede outra configuração, para que as chaves omitidas voltem
+        # ao padrão do driver em vez de ficarem como a sessão anterior deixou
+        captura = captura or {}
+        if captura == self.captura or isinstance(self.indice_camera, str):
+            return
+        with self._lock:
+            self.captura = captura
+            self.captura_aceita = None
+            inicio = time.perf_counter()
+            if self.cap is not None:
+                self.cap.release()
+            self.cap = cv2.VideoCapture(self.indice_camera)
+            if captura:
+                self.captura_aceita = configurar(self.cap, captura)
+            self.cap.read()  # O primeiro quadro conclui a negociação do modo novo
+            self.tempos_inicializacao['camera'] = time.perf_counter() - inicio
+
+    def resumo_captura(self):
+        if self.cap is None or isinstance(self.indice_camera, str):
+            return []
+        aceita = self.captura_aceita or ler_configuracao(self.cap)
+        pedido = f" (pedido: {descrever(self.captura)})" if self.captura else ""
+        return [f"câmera: {descrever(aceita)}{pedido}"]
+
+    def _pronto(self):
+        return self.pose is not None and self.cap is not None and self.cap.isOpened()
+
+    def preparar(self):
+        # Garante os recursos prontos; retorna True se já estavam prontos antes desta chamada
+        quente = self._pronto() and (self._thread is None or not self._thread.is_alive())
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if not self._pronto():
+            self._inicializar()
+        if quente:
+            self.descartar_buffer()
+        return quente
+
+    def descartar_buffer(self, maximo=10, limite=0.005):
+        # Quadros acumulados no driver entre sessões retornam imediatamente; descarta-os
+        for _ in range(maximo):
+            inicio = time.perf_counter()
+            if not self.cap.grab() or time.perf_counter() - inicio > limite:
+                break
+
+    def obter_serial(self, porta, protocolo, metricas=None):
+        # Reutiliza a conexão se a porta e o protocolo não mudaram; retorna (escritor, erro de conexão)
+        if self._serial_externo or (self.ser and self.ser.porta == porta and self.ser.protocolo == protocolo):
+            self.ser.metricas = metricas
+            return self.ser, None
+        if self.ser:
+            self.ser.fechar()
+        self.ser = EscritorSerial(porta, 9600, protocolo=protocolo, metricas=metricas)
+        return self.ser, self.ser.iniciar()
+
+    def encerrar(self):
+        if self._thread is not None:
+            self._thread.join()
+        if self.cap is not None:
+            self.cap.release()
+        if self.pose is not None:
+            self.pose.fechar()
+        if self.ser:
+            self.ser.fechar()
+        self.cap = self.pose = self.ser = None
+
+    def resumo_inicializacao(self):
+        return [f"inicialização {etapa}: {1000 * segundos:.0f} ms" for etapa, segundos in self.tempos_inicializacao.items()]
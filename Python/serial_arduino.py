@@ -0,0 +1,234 @@
+import threading
+import time
+from collections import deque
+
+import serial
+
+from metricas import CAPTURA_ATE_ARDUINO
+
+# Protocolo em quadros: 0xAA, válidos (uint16), inválidos (uint16), série (uint8), XOR do conteúdo.
+# Os contadores são absolutos, então um quadro perdido é corrigido pelo seguinte.
+QUADRO_INICIO = 0xAA
+TAMANHO_QUADRO = 7
+
+# Protocolo com canais (várias estações em uma só porta): 0xAB, canal (uint8), válidos, inválidos,
+# série e XOR do conteúdo. O Arduino mostra cada canal em seu próprio conjunto de variáveis do display.
+QUADRO_CANAL_INICIO = 0xAB
+TAMANHO_QUADRO_CANAL = 8
+
+PROTOCOLOS = ('legado', 'quadro', 'canal')
+
+# Abrir a porta reinicia a placa (auto-reset do Arduino); o que chega durante o bootloader se perde
+ESPERA_REINICIO = 2.0
+
+
+def _conteudo(validos, invalidos, serie):
+    return bytes([
+        (validos >> 8) & 0xFF, validos & 0xFF,
+        (invalidos >> 8) & 0xFF, invalidos & 0xFF,
+        serie & 0xFF,
+    ])
+
+
+def _com_checksum(inicio, conteudo):
+    checksum = 0
+    for byte in conteudo:
+        checksum ^= byte
+    return bytes([inicio]) + conteudo + bytes([checksum])
+
+
+def montar_quadro(validos, invalidos, serie):
+    return _com_checksum(QUADRO_INICIO, _conteudo(validos, invalidos, serie))
+
+
+def montar_quadro_canal(canal, validos, invalidos, serie):
+    return _com_checksum(QUADRO_CANAL_INICIO, bytes([canal & 0xFF]) + _conteudo(validos, invalidos, serie))
+
+
+class EscritorSerial:
+    """Envio para o Arduino em uma thread própria, sem bloquear o loop da câmera.
+
+    No protocolo 'legado' cada comando ('A', 'B', 'C') entra em uma fila limitada; quando
+    cheia, o comando mais antigo é descartado. No protocolo 'quadro' o escritor mantém os
+    contadores absolutos e envia apenas o estado mais recente. No protocolo 'canal' há um
+    conjunto de contadores por canal (`enviar(..., canal=n)`), e só os canais alterados são
+    enviados. Em todos os casos o que estiver pendente é enviado em uma única escrita, e a
+    porta é reaberta com espera crescente quando o adaptador USB cai.
+
+    Reabrir a porta reinicia a placa e zera o display. Por isso, depois de reconectar, o
+    escritor espera `espera_reinicio` e reenvia o estado absoluto: nos protocolos em quadros,
+    um quadro por canal; no legado, que só tem incrementos, 'C' seguido de um 'A' por acerto
+    e um 'B' por erro contados até ali (no lugar dos comandos que estavam na fila).
+
+    Se `metricas` for informado, cada comando enviado com `origem` (instante da captura do
+    quadro, em time.perf_counter) registra a latência captura→Arduino.
+    """
+
+    def __init__(self, porta, baudrate=9600, protocolo='legado', tamanho_fila=64,
+                 espera_inicial=0.5, espera_maxima=5.0, espera_reinicio=ESPERA_REINICIO, metricas=None):
+        if protocolo not in PROTOCOLOS:
+            raise ValueError(f"Protocolo serial desconhecido: {protocolo}")
+        self.porta = porta
+        self.baudrate = baudrate
+        self.protocolo = protocolo
+        self.espera_inicial = espera_inicial
+        self.espera_maxima = espera_maxima
+        self.espera_reinicio = espera_reinicio
+        self.metricas = metricas
+
+        self._ser = None
+        self._pendentes = deque(maxlen=tamanho_fila)
+        self._cond = threading.Condition()
+        self._rodando = False
+        self._thread = None
+
+        # Estado absoluto: canal -> [válidos, inválidos, série]. Enviado nos protocolos em quadros;
+        # no legado (só o canal 0) serve para restaurar o display depois de uma reconexão
+        self.contadores = {}
+        self._alterados = set()
+
+        # Estatísticas
+        self.descartados = 0
+        self.escritas = 0
+        self.bytes_escritos = 0
+        self.reconexoes = 0
+        self.latencia_total = 0.0
+        self.latencia_maxima = 0.0
+        self.comandos_escritos = 0
+
+    def conectar(self):
+        # Abre a porta; retorna None em caso de sucesso ou a exceção ocorrida
+        try:
+            self._ser = serial.Serial(self.porta, self.baudrate, timeout=1, write_timeout=1)
+            return None
+        except serial.SerialException as e:
+            self._ser = None
+            return e
+
+    def iniciar(self):
+        # A primeira conexão é síncrona para que o chamador possa avisar o usuário do erro
+        erro = self.conectar()
+        self._rodando = True
+        self._thread = threading.Thread(target=self._loop, name='serial', daemon=True)
+        self._thread.start()
+        return erro
+
+    def _estado(self, canal):
+        # Contadores do canal (o protocolo 'quadro' usa só o canal 0), marcados para envio
+        self._alterados.add(canal)
+        return self.contadores.setdefault(canal, [0, 0, 1])
+
+    def enviar(self, comando, origem=None, canal=0):
+        agora = time.perf_counter()
+        with self._cond:
+            estado = self._estado(canal)
+            if comando == 'A':
+                estado[0] += 1
+            elif comando == 'B':
+                estado[1] += 1
+            elif comando == 'C':
+                estado[0] = 0
+                estado[1] = 0
+            if self.protocolo == 'legado':
+                if len(self._pendentes) == self._pendentes.maxlen:
+                    self.descartados += 1
+                self._pendentes.append((comando.encode(), agora, origem))
+            else:
+                self._pendentes.append((None, agora, origem))
+            self._cond.notify()
+
+    def definir_serie(self, serie, canal=0):
+        # Só é transmitida nos protocolos em quadros; o protocolo legado não tem a série
+        with self._cond:
+            self._estado(canal)[2] = serie
+            if self.protocolo != 'legado':
+                self._pendentes.append((None, time.perf_counter(), None))
+                self._cond.notify()
+
+    def _retirar_lote(self):
+        # Junta tudo o que está pendente em um único bloco de bytes
+        with self._cond:
+            self._cond.wait_for(lambda: self._pendentes or not self._rodando, timeout=0.1)
+            if not self._pendentes:
+                return None, []
+            itens = list(self._pendentes)
+            self._pendentes.clear()
+            if self.protocolo == 'legado':
+                dados = b''.join(item[0] for item in itens)
+            elif self.protocolo == 'quadro':
+                dados = montar_quadro(*self._estado(0))
+            else:
+                dados = b''.join(montar_quadro_canal(canal, *self.contadores[canal]) for canal in sorted(self._alterados))
+            self._alterados.clear()
+            return dados, itens
+
+    def _reconectar(self):
+        espera = self.espera_inicial
+        while self._rodando:
+            erro = self.conectar()
+            if erro is None:
+                self.reconexoes += 1
+                print(f"Reconectado ao Arduino na porta {self.porta}")
+                time.sleep(self.espera_reinicio)
+                # A placa reiniciou com o display zerado: o estado atual de todos os canais é reenviado
+                with self._cond:
+                    if self.protocolo == 'legado':
+                        validos, invalidos, _ = self.contadores.get(0, (0, 0, 1))
+                        self._pendentes.clear()
+                        self._pendentes.append((b'C' + b'A' * validos + b'B' * invalidos, time.perf_counter(), None))
+                    else:
+                        self._alterados.update(self.contadores)
+                        self._pendentes.append((None, time.perf_counter(), None))
+                return
+            time.sleep(espera)
+            espera = min(espera * 2, self.espera_maxima)
+
+    def _fechar_porta(self):
+        if self._ser:
+            try:
+                self._ser.close()
+            except serial.SerialException:
+                pass
+        self._ser = None
+
+    def _loop(self):
+        while self._rodando or self._pendentes:
+            if self._ser is None:
+                self._reconectar()
+                if self._ser is None:
+                    break
+            dados, itens = self._retirar_lote()
+            if dados is None:
+                continue
+            try:
+                self._ser.write(dados)
+            except (serial.SerialException, OSError) as e:
+                print(f"Erro ao escrever na porta serial: {e}")
+                # Os comandos não enviados já estão no estado absoluto, reenviado após a reconexão
+                self._fechar_porta()
+                continue
+            fim = time.perf_counter()
+            self.escritas += 1
+            self.bytes_escritos += len(dados)
+            self.comandos_escritos += len(itens)
+            for _, instante, origem in itens:
+                latencia = fim - instante
+                self.latencia_total += latencia
+                self.latencia_maxima = max(self.latencia_maxima, latencia)
+                if self.metricas and origem is not None:
+                    self.metricas.registrar_duracao(CAPTURA_ATE_ARDUINO, fim - origem)
+
+    def fechar(self, timeout=2.0):
+        # Encerra a thread após enviar o que estiver pendente (até o timeout) e fecha a porta
+        with self._cond:
+            self._rodando = False
+            self._cond.notify()
+        if self._thread:
+            self._thread.join(timeout)
+        self._fechar_porta()
+
+    def resumo(self):
+        media = 1000 * self.latencia_total / self.comandos_escritos if self.comandos_escritos else 0.0
+        return (f"serial ({self.protocolo}): {self.comandos_escritos} comandos em {self.escritas} escritas, "
+                f"{self.bytes_escritos} bytes, latência média {media:.2f} ms (máx. {1000 * self.latencia_maxima:.2f} ms), "
+                f"{self.descartados} descartados, {self.reconexoes} reconexões")